@@ -0,0 +1,238 @@
+import json
+import queue
+import threading
+import time
+import requests
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from requests.adapters import HTTPAdapter
+
+# --- 🚀 設定區 🚀 ---
+BOT_NAME = "台股監控管家"
+QUEUE_SIZE = 100          # 佇列上限，滿了就丟掉最舊的通知 (監控迴圈永遠不會被卡住)
+FLUSH_INTERVAL = 5        # 秒：同一段時間內的通知合併成一則訊息
+REQUEST_TIMEOUT = 10      # 秒
+MAX_RETRIES = 5
+MAX_CONTENT = 2000        # Discord 單則訊息字數上限
+
+class AlertDispatcher:
+    """
+    Discord 通知派送器：
+    - 通知放進有上限的佇列，由背景執行緒送出，webhook 再慢也不影響監控
+    - 共用 requests.Session (連線池)，每次請求都有 timeout
+    - 同一段 flush_interval 內的通知合併成一則 (coalesce=False 時每則通知各自送出)
+    - 遇到 429 依 Retry-After / retry_after 等待後重送，其他錯誤指數退避
+    - notify_change() 只有在狀態 (趨勢 / RSI) 改變時才發送；狀態在 webhook 確認送達後才記錄，
+      送出失敗或被佇列丟掉時，下次同樣的狀態會再通知
+    """
+
+    def __init__(self, webhook_url, username=BOT_NAME, flush_interval=FLUSH_INTERVAL,
+                 queue_size=QUEUE_SIZE, timeout=REQUEST_TIMEOUT, max_retries=MAX_RETRIES, coalesce=True):
+        self.webhook_url = webhook_url
+        self.username = username
+        self.flush_interval = flush_interval
+        self.coalesce = coalesce
+        self.timeout = timeout
+        self.max_retries = max_retries
+
+        self.session = requests.Session()
+        self.session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=4))
+        self.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=4))
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._last_state = {}     # 已送達的狀態
+        self._pending = {}        # 已排入佇列、尚未確認送達的最新狀態
+        self._stop = threading.Event()
+        self.stats = {"queued": 0, "dropped": 0, "suppressed": 0, "sent": 0, "failed": 0, "rate_limited": 0}
+        self.on_sent = None   # 測試 / 量測用：每送出一則呼叫 on_sent(messages)
+
+        self._worker = threading.Thread(target=self._run, name="alert-dispatcher", daemon=True)
+        self._worker.start()
+
+    # --- 對外介面 (不會阻塞) ---
+    def send(self, msg):
+        self._enqueue((None, None, msg))
+
+    def notify_change(self, key, state, msg):
+        """ state 與上次送達 (或正在送) 的相同就不發送；回傳是否有排入佇列 """
+        with self._lock:
+            if self._pending.get(key, self._last_state.get(key)) == state:
+                self.stats["suppressed"] += 1
+                return False
+            self._pending[key] = state
+        self._enqueue((key, state, msg))
+        return True
+
+    def last_state(self, key):
+        """ 最後一次確認送達的狀態 """
+        with self._lock:
+            return self._last_state.get(key)
+
+    def restore_state(self, states):
+        """ 還原上次的狀態 (例如雲端模式從 snapshot 讀回)，避免重啟後重複通知 """
+        with self._lock:
+            self._last_state.update(states)
+
+    def close(self, timeout=30):
+        """ 送完佇列中剩下的通知後結束背景執行緒 """
+        self._stop.set()
+        self._worker.join(timeout)
+        self.session.close()
+
+    def _count(self, name, n=1):
+        with self._lock:
+            self.stats[name] += n
+
+    def _enqueue(self, item):
+        """ item = (key, state, msg)；佇列滿了丟掉最舊的一則 """
+        while True:
+            try:
+                self._queue.put_nowait(item)
+                self._count("queued")
+                return
+            except queue.Full:
+                try:
+                    dropped = self._queue.get_nowait()
+                except queue.Empty:
+                    continue
+                self._count("dropped")
+                self._settle([dropped], False)
+
+    def _settle(self, items, delivered):
+        """ 送達的狀態寫入 _last_state；失敗或被丟掉時撤銷 pending，下次同樣的狀態會再通知 """
+        with self._lock:
+            for key, state, _ in items:
+                if key is None:
+                    continue
+                if delivered:
+                    self._last_state[key] = state
+                if self._pending.get(key) == state:
+                    del self._pending[key]
+
+    # --- 背景執行緒 ---
+    def _run(self):
+        while not (self._stop.is_set() and self._queue.empty()):
+            try:
+                first = self._queue.get(timeout=0.2)
+            except queue.Empty:
+                continue
+
+            batch = [first]
+            deadline = time.monotonic() + self.flush_interval
+            while self.coalesce and not self._stop.is_set():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            while self.coalesce:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            for content, items in self._pack(batch):
+                self._settle(items, self._post(content))
+            if self.on_sent:
+                self.on_sent([msg for _, _, msg in batch])
+
+    @staticmethod
+    def _pack(items):
+        """ 合併成不超過 Discord 字數上限的幾則訊息，回傳 [(內容, 包含的 items), ...] """
+        chunks, current, members = [], "", []
+        for item in items:
+            msg = item[2][:MAX_CONTENT]
+            if current and len(current) + len(msg) + 2 > MAX_CONTENT:
+                chunks.append((current, members))
+                current, members = msg, [item]
+            else:
+                current = f"{current}\n\n{msg}" if current else msg
+                members.append(item)
+        if current:
+            chunks.append((current, members))
+        return chunks
+
+    def _post(self, content):
+        data = {"content": content, "username": self.username}
+        delay = 1.0
+        for _ in range(self.max_retries):
+            try:
+                resp = self.session.post(self.webhook_url, json=data, timeout=self.timeout)
+            except requests.RequestException as e:
+                print(f"❌ 發送失敗: {e}")
+            else:
+                if resp.status_code == 429:
+                    self._count("rate_limited")
+                    time.sleep(self._retry_after(resp, delay))
+                    continue
+                if resp.status_code < 400:
+                    self._count("sent")
+                    print("✅ Discord 通知已發送")
+                    return True
+                if resp.status_code < 500:
+                    print(f"❌ 發送失敗: HTTP {resp.status_code}")
+                    break
+            time.sleep(delay)
+            delay = min(delay * 2, 60)
+        self._count("failed")
+        return False
+
+    @staticmethod
+    def _retry_after(resp, default):
+        try:
+            return float(resp.json().get("retry_after"))
+        except (ValueError, TypeError, AttributeError):
+            pass
+        try:
+            return float(resp.headers.get("Retry-After"))
+        except (TypeError, ValueError):
+            return default
+
+# --- 本機 webhook 模擬 (測試 / 量測用) ---
+class WebhookStub:
+    """
+    在 127.0.0.1 開一個假的 Discord webhook，記錄收到的訊息；
+    rate_limit_every=N 時每第 N 次請求回 429，delay 可模擬慢速 webhook。
+    """
+
+    def __init__(self, port=0, delay=0.0, rate_limit_every=0, retry_after=0.05):
+        stub = self
+        self.received = []
+        self.requests = 0
+        self.delay = delay
+        self.rate_limit_every = rate_limit_every
+        self.retry_after = retry_after
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                stub.requests += 1
+                time.sleep(stub.delay)
+                if stub.rate_limit_every and stub.requests % stub.rate_limit_every == 0:
+                    payload = json.dumps({"retry_after": stub.retry_after}).encode()
+                    self.send_response(429)
+                    self.send_header("Retry-After", str(stub.retry_after))
+                else:
+                    stub.received.append(json.loads(body))
+                    payload = b""
+                    self.send_response(204)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/webhook"
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
@@ -1,8 +1,8 @@
 import yfinance as yf
-import pandas as pd
 import matplotlib.pyplot as plt
 import platform
 import numpy as np
+from incremental_backtest import update_backtest, summarize
 
 # --- 🛠️ 字型設定 (解決中文亂碼) 🛠️ ---
 if platform.system() == "Windows":
@@ -112,12 +112,11 @@ def run_backtest():
     # 1. 取得輸入
     stock_id, held_qty, avg_cost = get_user_input()
     
-    # 2. 抓資料
+    # 2. 抓資料 + 3. 計算 (有 checkpoint 時只下載、計算新的 K 線)
     fund_info = get_fundamental_analysis(stock_id)
+    params = {"initial_capital": INITIAL_CAPITAL, "fee_rate": FEE_RATE, "tax_rate": TAX_RATE}
     try:
-        df = yf.download(stock_id, start=START_DATE)
-        if isinstance(df.columns, pd.MultiIndex):
-            df.columns = df.columns.get_level_values(0)
+        df = update_backtest(stock_id, params, start=START_DATE)
     except Exception as e:
         print(f"下載失敗: {e}")
         return
@@ -126,23 +125,10 @@ def run_backtest():
         print("找不到資料。")
         return
 
-    # 3. 計算
-    df['MA20'] = df['Close'].rolling(window=20).mean()
-    df['MA60'] = df['Close'].rolling(window=60).mean()
-    
-    df['Signal'] = 0
-    df.loc[df['MA20'] > df['MA60'], 'Signal'] = 1 
-    df['Position'] = df['Signal'].shift(1) 
-    df['Strategy_Return'] = df['Close'].pct_change() * df['Position']
-    action_mask = df['Position'].diff().abs() > 0
-    df.loc[action_mask, 'Strategy_Return'] -= (FEE_RATE + TAX_RATE/2)
-    df['Equity'] = INITIAL_CAPITAL * (1 + df['Strategy_Return']).cumprod()
-    
-    total_return = (df['Equity'].iloc[-1] - INITIAL_CAPITAL) / INITIAL_CAPITAL
-    df['Peak'] = df['Equity'].cummax()
-    df['Drawdown'] = (df['Equity'] - df['Peak']) / df['Peak']
-    mdd = df['Drawdown'].min()
-    current_dd = df['Drawdown'].iloc[-1]
+    result = summarize(df, params)
+    total_return = result['total_return']
+    mdd = result['mdd']
+    current_dd = result['current_dd']
 
     tech_info = calculate_technical_indicators(df)
     pred_trend, pred_time, box_color = calculate_prediction(df)
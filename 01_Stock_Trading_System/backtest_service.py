@@ -0,0 +1,235 @@
+import json
+import math
+import time
+import hashlib
+import threading
+import datetime
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from incremental_backtest import DEFAULT_PARAMS, START_DATE, update_backtest, summarize
+from market_schedule import TAIPEI, MarketScheduler
+
+# --- 🚀 設定區 🚀 ---
+HOST = "127.0.0.1"        # 只在本機提供服務
+PORT = 8765
+WORKERS = 4               # 每個 worker 是獨立行程 (yfinance 下載不保證執行緒安全)
+CACHE_SIZE = 512          # 保留最近幾個回測結果
+INTRADAY_TTL = 15 * 60    # 秒：盤中資料每 15 分鐘視為新版本
+WAIT_TIMEOUT = 300        # 秒：wait=true 時最多等多久
+
+def normalize_ticker(stock_id):
+    """ 與 get_user_input 相同：純數字補 .TW，其餘轉大寫 """
+    stock_id = str(stock_id).strip()
+    return f"{stock_id}.TW" if stock_id.isdigit() else stock_id.upper()
+
+def data_version(now=None, scheduler=None):
+    """
+    資料版本：收盤後到下次開盤前為「日期」，盤中每 INTRADAY_TTL 秒換一個版本。
+    交易日與交易時段依 market_schedule.MarketScheduler (含休市日)。
+    同一個版本內的相同查詢直接回傳快取結果。
+    """
+    scheduler = scheduler or MarketScheduler()
+    now = (now or datetime.datetime.now(TAIPEI)).astimezone(TAIPEI)
+    day = now.date()
+    if scheduler.is_trading_day(day):
+        open_at, close_at = scheduler.session(day)
+        if open_at <= now < close_at:
+            return f"{now:%Y-%m-%d}@{int(now.timestamp()) // INTRADAY_TTL}"
+        if now >= close_at:
+            return f"{now:%Y-%m-%d}"
+    # 開盤前 / 週末 / 休市日：最新資料是上一個交易日
+    day -= datetime.timedelta(days=1)
+    while not scheduler.is_trading_day(day):
+        day -= datetime.timedelta(days=1)
+    return f"{day:%Y-%m-%d}"
+
+def run_job(stock_id, params, start=START_DATE):
+    """ worker 行程中執行：續算回測並整理成可 JSON 化的結果 """
+    history = update_backtest(stock_id, params, start=start)
+    if history.empty:
+        raise ValueError(f"{stock_id} 找不到資料")
+    result = summarize(history, params)
+    return {
+        "stock_id": stock_id,
+        "last_date": history.index[-1].strftime("%Y-%m-%d"),
+        "bars": len(history),
+        "last_close": float(history['Close'].iloc[-1]),
+        "equity": float(history['Equity'].iloc[-1]),
+        "total_return": float(result['total_return']),
+        "mdd": float(result['mdd']),
+        "current_dd": float(result['current_dd']),
+    }
+
+class BacktestService:
+    """
+    回測工作佇列：
+    - 相同 (股票, 資料版本, 參數) 正在計算時，後來的請求共用同一個 Future
+    - 算完的結果依 (股票, 資料版本, 參數) 快取，重複查詢直接回傳
+    - 失敗的工作不快取結果 (只記錄錯誤訊息供查詢)，下次提交會重新計算
+    - worker 行程異常結束 (BrokenProcessPool) 時重建行程池，再送出一次
+    """
+
+    def __init__(self, workers=WORKERS, cache_size=CACHE_SIZE, runner=run_job, executor=None, scheduler=None):
+        self.runner = runner
+        self.cache_size = cache_size
+        self.scheduler = scheduler or MarketScheduler()
+        self.workers = workers
+        self._executor = executor or self._new_executor()
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self._cache = OrderedDict()
+        self._failed = OrderedDict()
+        self.stats = {"submitted": 0, "cache_hits": 0, "deduplicated": 0, "completed": 0, "failed": 0,
+                      "pool_restarts": 0}
+
+    def _new_executor(self):
+        return ProcessPoolExecutor(max_workers=self.workers)
+
+    @staticmethod
+    def job_key(stock_id, version, params):
+        raw = json.dumps([stock_id, version, params], sort_keys=True)
+        return hashlib.sha1(raw.encode()).hexdigest()[:16]
+
+    def submit(self, stock_id, params=None, now=None):
+        """ 回傳 (job_id, Future, 是否來自快取) """
+        stock_id = normalize_ticker(stock_id)
+        unknown = set(params or {}) - set(DEFAULT_PARAMS)
+        if unknown:
+            raise ValueError(f"未知的參數: {', '.join(sorted(unknown))}")
+        params = {**DEFAULT_PARAMS, **(params or {})}
+        job_id = self.job_key(stock_id, data_version(now, self.scheduler), params)
+
+        with self._lock:
+            self.stats["submitted"] += 1
+            if job_id in self._cache:
+                self._cache.move_to_end(job_id)
+                self.stats["cache_hits"] += 1
+                future = Future()
+                future.set_result(self._cache[job_id])
+                return job_id, future, True
+            running = self._inflight.get(job_id)
+            # 已經失敗 (例如行程池損壞) 但還沒收尾的工作不共用，重新送出
+            if running is not None and not (running.done() and (running.cancelled() or running.exception() is not None)):
+                self.stats["deduplicated"] += 1
+                return job_id, running, False
+
+            try:
+                future = self._executor.submit(self.runner, stock_id, params)
+            except BrokenProcessPool:
+                # 某個 worker 被系統終止 (例如記憶體不足)：舊的行程池不能再用，重建後再送一次
+                self._inflight.pop(job_id, None)
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = self._new_executor()
+                self.stats["pool_restarts"] += 1
+                future = self._executor.submit(self.runner, stock_id, params)
+            self._inflight[job_id] = future
+            self._failed.pop(job_id, None)
+        future.add_done_callback(lambda f: self._finish(job_id, f))
+        return job_id, future, False
+
+    def _finish(self, job_id, future):
+        with self._lock:
+            if self._inflight.get(job_id) is future:
+                del self._inflight[job_id]
+            if future.cancelled() or future.exception() is not None:
+                self.stats["failed"] += 1
+                self._failed[job_id] = "已取消" if future.cancelled() else str(future.exception())
+                while len(self._failed) > self.cache_size:
+                    self._failed.popitem(last=False)
+                return
+            self.stats["completed"] += 1
+            self._cache[job_id] = future.result()
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def status(self, job_id):
+        """ 回傳 ("done", 結果) / ("running", None) / ("failed", 錯誤訊息) / ("unknown", None) """
+        with self._lock:
+            if job_id in self._cache:
+                return "done", self._cache[job_id]
+            if job_id in self._inflight:
+                return "running", None
+            if job_id in self._failed:
+                return "failed", self._failed[job_id]
+        return "unknown", None
+
+    def close(self):
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+def make_server(service, host=HOST, port=PORT):
+    """
+    POST /backtest  {"ticker": "2330", "params": {...}, "wait": true}
+                    wait=true 直接回傳結果；false 回 202 與 job_id，之後用 GET /jobs/<job_id> 查詢
+    GET  /jobs/<id> 查詢工作狀態
+    GET  /stats     快取 / 去重統計
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        def _reply(self, code, payload):
+            body = json.dumps(payload, ensure_ascii=False).encode()
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/stats":
+                return self._reply(200, service.stats)
+            if self.path.startswith("/jobs/"):
+                job_id = self.path[len("/jobs/"):]
+                state, result = service.status(job_id)
+                if state == "failed":
+                    return self._reply(500, {"job_id": job_id, "status": state, "error": result})
+                code = {"done": 200, "running": 202}.get(state, 404)
+                return self._reply(code, {"job_id": job_id, "status": state, "result": result})
+            self._reply(404, {"error": "not found"})
+
+        def do_POST(self):
+            if self.path != "/backtest":
+                return self._reply(404, {"error": "not found"})
+            try:
+                req = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                timeout = float(req.get("timeout", WAIT_TIMEOUT))
+                if not math.isfinite(timeout) or timeout <= 0:
+                    raise ValueError(f"timeout 必須是正數: {req['timeout']}")
+                job_id, future, cached = service.submit(req["ticker"], req.get("params"))
+            except (KeyError, ValueError, TypeError) as e:
+                return self._reply(400, {"error": str(e)})
+            except BrokenProcessPool as e:
+                return self._reply(503, {"error": f"行程池無法使用: {e}"})
+
+            if not req.get("wait", True):
+                if future.done() and future.exception() is None:
+                    return self._reply(200, {"job_id": job_id, "status": "done", "cached": cached, "result": future.result()})
+                return self._reply(202, {"job_id": job_id, "status": "running"})
+
+            started = time.monotonic()
+            try:
+                result = future.result(timeout=timeout)
+            except TimeoutError:
+                return self._reply(202, {"job_id": job_id, "status": "running"})
+            except Exception as e:
+                return self._reply(500, {"job_id": job_id, "status": "failed", "error": str(e)})
+            return self._reply(200, {"job_id": job_id, "status": "done", "cached": cached,
+                                     "seconds": round(time.monotonic() - started, 3), "result": result})
+
+        def log_message(self, *args):
+            pass
+
+    return ThreadingHTTPServer((host, port), Handler)
+
+if __name__ == "__main__":
+    service = BacktestService()
+    server = make_server(service)
+    print(f"🚀 回測服務啟動: http://{HOST}:{server.server_address[1]}")
+    print(f'   範例: curl -X POST http://{HOST}:{server.server_address[1]}/backtest -d \'{{"ticker": "2330"}}\'')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
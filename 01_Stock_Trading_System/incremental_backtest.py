@@ -0,0 +1,207 @@
+import os
+import json
+import pickle
+import hashlib
+import yfinance as yf
+import pandas as pd
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# --- 🚀 參數設定 (與 backfast.py 相同) 🚀 ---
+START_DATE = "2021-01-01"
+CHECKPOINT_DIR = "checkpoints"
+CHECKPOINT_VERSION = 1
+OVERLAP_BARS = 5      # 續算時重新下載並比對的已存 K 線根數 (除權息後 Yahoo 會改寫還原股價)
+DEFAULT_PARAMS = {
+    "short_window": 20,
+    "long_window": 60,
+    "initial_capital": 1_000_000,
+    "fee_rate": 0.001425 * 0.6,
+    "tax_rate": 0.003,
+}
+
+def new_state(params):
+    """ 尚未處理任何 K 線的回測狀態 """
+    return {
+        "closes": [],          # 最近 long_window 根收盤價 (算均線與報酬用)
+        "signal": None,        # 上一根的訊號 = 下一根的部位
+        "position": None,      # 上一根的部位 (判斷是否換手扣成本)
+        "equity": float(params["initial_capital"]),
+        "peak": float(params["initial_capital"]),
+        "mdd": 0.0,
+    }
+
+def _window_mean(buf, window, n_new):
+    """ 最後 n_new 根的移動平均；每個值只由視窗內的收盤價決定，所以分段算與一次算的結果完全相同 """
+    out = np.full(n_new, np.nan)
+    if len(buf) >= window:
+        means = sliding_window_view(buf, window).mean(axis=1)[-n_new:]
+        out[n_new - len(means):] = means
+    return out
+
+def advance(state, closes, params):
+    """
+    從 state 接著處理新的收盤價 (pd.Series)，回傳 (這段的逐日結果, 新的 state)。
+    規則與 backfast.run_backtest 相同：MA20 > MA60 做多，隔日進場，換手扣手續費與半邊稅。
+    """
+    n = len(closes)
+    state = dict(state)
+    if n == 0:
+        return pd.DataFrame(), state
+
+    prev = np.asarray(state["closes"], dtype=np.float64)
+    close = closes.to_numpy(dtype=np.float64)
+    buf = np.concatenate([prev, close])
+
+    ma_short = _window_mean(buf, params["short_window"], n)
+    ma_long = _window_mean(buf, params["long_window"], n)
+    signal = (ma_short > ma_long).astype(np.int64)
+
+    position = np.empty(n)
+    position[0] = np.nan if state["signal"] is None else state["signal"]
+    position[1:] = signal[:-1]
+
+    prev_close = buf[len(prev) - 1:len(buf) - 1] if len(prev) else np.r_[np.nan, close[:-1]]
+    strategy_return = (close / prev_close - 1) * position
+
+    prev_position = np.r_[np.nan if state["position"] is None else state["position"], position[:-1]]
+    action = np.abs(position - prev_position) > 0
+    strategy_return[action] -= params["fee_rate"] + params["tax_rate"] / 2
+
+    # 與 pandas 的 cumprod / cummax 相同：報酬為 NaN 的那根 (第一根) 資產記為 NaN，之後跳過它繼續累積
+    missing = np.isnan(strategy_return)
+    growth = np.where(missing, 1.0, 1 + strategy_return)
+    running = np.cumprod(np.r_[state["equity"], growth])[1:]
+    running_peak = np.maximum.accumulate(np.r_[state["peak"], running])[1:]
+    equity = np.where(missing, np.nan, running)
+    peak = np.where(missing, np.nan, running_peak)
+    drawdown = (equity - peak) / peak
+    valid_dd = drawdown[~missing]
+
+    frame = pd.DataFrame({
+        'Close': close,
+        'MA20': ma_short,
+        'MA60': ma_long,
+        'Signal': signal,
+        'Position': position,
+        'Strategy_Return': strategy_return,
+        'Equity': equity,
+        'Peak': peak,
+        'Drawdown': drawdown,
+    }, index=closes.index)
+
+    state.update({
+        "closes": buf[-params["long_window"]:].tolist(),
+        "signal": int(signal[-1]),
+        "position": float(position[-1]),
+        "equity": float(running[-1]),
+        "peak": float(running_peak[-1]),
+        "mdd": float(min(state["mdd"], valid_dd.min())) if len(valid_dd) else state["mdd"],
+    })
+    return frame, state
+
+def _checkpoint_path(stock_id, params, checkpoint_dir):
+    key = hashlib.sha1(json.dumps(params, sort_keys=True).encode()).hexdigest()[:8]
+    return os.path.join(checkpoint_dir, f"{stock_id}_{key}.pkl")
+
+def _download_closes(stock_id, start):
+    df = yf.download(stock_id, start=start, progress=False)
+    if isinstance(df.columns, pd.MultiIndex):
+        df.columns = df.columns.get_level_values(0)
+    return df['Close'].dropna()
+
+def _load_checkpoint(path, start):
+    """ 讀取 checkpoint；不存在、版本不符或檔案損壞時回傳 None (從頭重算) """
+    try:
+        with open(path, "rb") as f:
+            checkpoint = pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ValueError):
+        return None
+    if not isinstance(checkpoint, dict) or checkpoint.get("version") != CHECKPOINT_VERSION \
+            or checkpoint.get("start") != start:
+        return None
+    return checkpoint
+
+def _history_unchanged(history, new):
+    """
+    重疊區間 (最後一根除外，可能是盤中資料) 的收盤價是否與 checkpoint 相同。
+    yfinance 的 Close 是還原股價，除權息後整段歷史都會被改寫，此時必須從頭重算。
+    """
+    stored = history['Close'].iloc[:-1]
+    overlap = new[new.index.isin(stored.index)]
+    if len(overlap) < min(OVERLAP_BARS - 1, len(stored)):
+        return False
+    return np.allclose(overlap.to_numpy(dtype=np.float64), stored.loc[overlap.index].to_numpy(dtype=np.float64),
+                       rtol=1e-9, atol=0)
+
+def update_backtest(stock_id, params=None, start=START_DATE, checkpoint_dir=CHECKPOINT_DIR):
+    """
+    回傳 stock_id 從 start 起的完整逐日回測結果。
+    有 checkpoint 時只下載最後 OVERLAP_BARS 根起的 K 線接著算 (最後一根可能是盤中資料，會重新計算)；
+    重疊部分的收盤價與 checkpoint 不同 (除權息改寫了還原股價) 時從頭重算，
+    所以結果與從頭重算相同；之後把狀態存回 checkpoint。
+    """
+    params = {**DEFAULT_PARAMS, **(params or {})}
+    path = _checkpoint_path(stock_id, params, checkpoint_dir)
+
+    checkpoint = _load_checkpoint(path, start)
+    if checkpoint is not None:
+        history = checkpoint["history"]
+        first_day = history.index[-min(OVERLAP_BARS, len(history))]
+        new = _download_closes(stock_id, first_day.strftime("%Y-%m-%d"))
+        if new.empty:
+            return history
+        if _history_unchanged(history, new):
+            new = new[new.index >= history.index[-1]]
+        else:
+            checkpoint = None
+
+    if checkpoint is None:
+        history = pd.DataFrame()
+        state = new_state(params)
+        closes = _download_closes(stock_id, start)
+    else:
+        state = checkpoint["state"]
+        if new.empty:
+            return history
+        # checkpoint 的 state 停在倒數第二根，最後一根連同新資料一起重算
+        closes = pd.concat([history['Close'].iloc[-1:][history.index[-1:] < new.index[0]], new])
+        history = history.iloc[:-1]
+
+    if closes.empty:
+        return history
+
+    # 存檔的 state 停在倒數第二根，下次可以覆蓋最後一根 (盤中尚未收盤的 K 線)
+    frame_done, committed = advance(state, closes.iloc[:-1], params)
+    frame_last, _ = advance(committed, closes.iloc[-1:], params)
+    history = pd.concat([df for df in (history, frame_done, frame_last) if not df.empty])
+
+    # 先寫暫存檔再換名，backtest_service 的其他行程不會讀到寫一半的檔案
+    os.makedirs(checkpoint_dir, exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        pickle.dump({"version": CHECKPOINT_VERSION, "start": start, "params": params,
+                     "state": committed, "history": history}, f)
+    os.replace(tmp, path)
+    return history
+
+def summarize(history, params=None):
+    """ 總報酬率、歷史最大回檔與目前回檔 """
+    params = {**DEFAULT_PARAMS, **(params or {})}
+    initial = params["initial_capital"]
+    return {
+        "total_return": (history['Equity'].iloc[-1] - initial) / initial,
+        "mdd": history['Drawdown'].min(),
+        "current_dd": history['Drawdown'].iloc[-1],
+    }
+
+if __name__ == "__main__":
+    ids_str = input("👉 請輸入要更新的股票代號，以逗號分隔 (如 2330,2317): ").strip()
+    for stock_id in [s.strip() for s in ids_str.split(",") if s.strip()]:
+        stock_id = f"{stock_id}.TW" if stock_id.isdigit() else stock_id.upper()
+        history = update_backtest(stock_id)
+        if history.empty:
+            print(f"{stock_id}: 找不到資料")
+            continue
+        result = summarize(history)
+        print(f"{stock_id}: 資料至 {history.index[-1].date()}，總報酬 {result['total_return']*100:.2f}%，最大回檔 {result['mdd']*100:.2f}%")
@@ -0,0 +1,109 @@
+import os
+import json
+import datetime
+import yfinance as yf
+import pandas as pd
+import numpy as np
+
+# --- 🚀 設定區 🚀 ---
+SNAPSHOT_PATH = "monitor_snapshot.json"
+SNAPSHOT_VERSION = 1
+WINDOW = 20            # MA20 需要 20 根收盤價，RSI(14) 需要 15 根，保留 20 根即可
+MAX_AGE_DAYS = 10      # snapshot 太舊 (例如長假後) 就整段重算
+OVERLAP_BARS = 5       # 每次重新下載並比對的已存 K 線根數 (除權息後 Yahoo 會改寫還原股價)
+
+def _download(stock_id, **kwargs):
+    df = yf.download(stock_id, interval="1d", progress=False, **kwargs)
+    if isinstance(df.columns, pd.MultiIndex):
+        df.columns = df.columns.get_level_values(0)
+    if df.index.tz is not None:
+        df.index = df.index.tz_localize(None)
+    return df['Close'].dropna()
+
+def indicators_from_window(closes):
+    """ 用最後 20 根收盤價算出與 get_realtime_data 相同的 Close / MA20 / RSI """
+    delta = closes.diff().iloc[-14:]
+    gain = delta.where(delta > 0, 0).mean()
+    loss = -delta.where(delta < 0, 0).mean()
+    return pd.Series({
+        'Close': closes.iloc[-1],
+        'MA20': closes.iloc[-20:].mean(),
+        'RSI': 100 - (100 / (1 + gain / loss)),
+    }, name=closes.index[-1])
+
+def load_snapshot(stock_id, path=SNAPSHOT_PATH, max_age_days=MAX_AGE_DAYS):
+    """ 讀取 snapshot；檔案不存在、版本 / 股票不符或太舊時回傳 None """
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, encoding="utf-8") as f:
+            snap = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if snap.get("version") != SNAPSHOT_VERSION or snap.get("stock_id") != stock_id:
+        return None
+    if len(snap.get("closes", [])) < WINDOW:
+        return None
+    last_bar = pd.Timestamp(snap["dates"][-1])
+    if pd.Timestamp.now() - last_bar > pd.Timedelta(days=max_age_days):
+        return None
+    return snap
+
+def save_snapshot(snap, path=SNAPSHOT_PATH):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(snap, f, ensure_ascii=False, indent=1)
+    os.replace(tmp, path)
+
+def _window_unchanged(window, new):
+    """
+    重疊區間 (最後一根除外，可能是盤中資料) 的收盤價是否與 snapshot 相同。
+    yfinance 的 Close 是還原股價，除權息後整段歷史都會被改寫，此時 snapshot 不能再用。
+    """
+    stored = window.iloc[:-1]
+    overlap = new[new.index.isin(stored.index)]
+    if len(overlap) < min(OVERLAP_BARS - 1, len(stored)):
+        return False
+    return np.allclose(overlap.to_numpy(dtype=np.float64), stored.loc[overlap.index].to_numpy(dtype=np.float64),
+                       rtol=1e-9, atol=0)
+
+def get_snapshot_data(stock_id, path=SNAPSHOT_PATH):
+    """
+    雲端模式用：有 snapshot 時只下載最後 OVERLAP_BARS 根起的 K 線 (最後一根可能是盤中未收完的，會一起更新)，
+    重疊部分的收盤價與 snapshot 不同 (除權息改寫了還原股價)、沒有 snapshot 或無法銜接時才下載 3 個月重算。
+    回傳 (最新指標, snapshot)；抓不到資料回傳 (None, None)。
+    """
+    try:
+        snap = load_snapshot(stock_id, path)
+        closes = None
+        if snap is not None:
+            window = pd.Series(snap["closes"], index=pd.DatetimeIndex(snap["dates"]))
+            new = _download(stock_id, start=window.index[-OVERLAP_BARS].strftime("%Y-%m-%d"))
+            if new.empty:
+                closes = window
+            elif not _window_unchanged(window, new):
+                print("⚠️ 還原股價與 snapshot 不同 (可能除權息)，改為完整重算")
+            else:
+                # 與 snapshot 的最後一根銜接：覆蓋最後一根、接上新的 K 線
+                new = new[new.index >= window.index[-1]]
+                closes = pd.concat([window[window.index < new.index[0]], new]) if len(new) else window
+        if closes is None:
+            closes = _download(stock_id, period="3mo")
+            # 價格整段重算，但上次通知的狀態仍然有效
+            snap = {"alert_state": snap["alert_state"]} if snap and "alert_state" in snap else {}
+        if len(closes) < WINDOW:
+            return None, None
+    except Exception as e:
+        print(f"⚠️ 讀取資料失敗: {e}")
+        return None, None
+
+    closes = closes.iloc[-WINDOW:]
+    snap.update({
+        "version": SNAPSHOT_VERSION,
+        "stock_id": stock_id,
+        "updated_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        "dates": [d.strftime("%Y-%m-%d") for d in closes.index],
+        "closes": [float(c) for c in closes],
+    })
+    return indicators_from_window(closes), snap
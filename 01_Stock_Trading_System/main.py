@@ -3,10 +3,12 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import platform
 import time
-import requests
 import datetime
 import os
 import sys
+from alert_dispatcher import AlertDispatcher
+from indicator_snapshot import SNAPSHOT_PATH, get_snapshot_data, save_snapshot
+from market_schedule import TAIPEI, MarketScheduler
 
 # --- 🛠️ 字型設定 🛠️ ---
 if platform.system() == "Windows":
@@ -34,7 +36,7 @@ def get_user_input():
     print("      台股全方位系統 (分析 + 監控)")
     print("="*40)
     print("1. 產生策略分析報告 (畫圖)")
-    print("2. 啟動定時監控機器人 (每30分通知)")
+    print("2. 啟動定時監控機器人 (盤中輪詢，狀態改變才通知)")
     mode = input("👉 請選擇模式 (輸入 1 或 2): ").strip()
     
     stock_id = input("👉 請輸入股票代號 (如 2330): ").strip()
@@ -61,17 +63,6 @@ def get_user_input():
         
     return mode, stock_id, held_qty, avg_cost
 
-def send_discord_msg(webhook_url, msg):
-    if not webhook_url:
-        print("⚠️ 未設定 Webhook，無法發送 Discord。")
-        return
-    data = {"content": msg, "username": "台股監控管家"}
-    try:
-        requests.post(webhook_url, json=data)
-        print(f"✅ Discord 通知已發送")
-    except Exception as e:
-        print(f"❌ 發送失敗: {e}")
-
 def get_realtime_data(stock_id):
     try:
         # 雲端有時候抓取會失敗，增加 retry 機制
@@ -86,26 +77,52 @@ def get_realtime_data(stock_id):
     except:
         return None
 
-def start_monitoring(stock_id):
-    # 優先從 GitHub Secrets 讀取 Webhook
-    webhook = os.environ.get("DISCORD_WEBHOOK_URL")
-    
-    # 如果不是雲端，且沒設定變數，才詢問使用者
-    if not webhook and os.environ.get("GITHUB_ACTIONS") != "true":
-        webhook = input("👉 請輸入 Discord Webhook 網址: ").strip()
-    
-    if not webhook:
-        print("❌ 無法取得 Webhook，監控中止")
-        return
+class SystemClock:
+    """ 真實時間 (台北時間)；回放測試時換成 replay_harness.VirtualClock """
+    @staticmethod
+    def now():
+        return datetime.datetime.now(TAIPEI)
+    sleep = staticmethod(time.sleep)
+
+def start_monitoring(stock_id, clock=None, fetch=None, dispatcher=None, max_cycles=None, scheduler=None):
+    """
+    clock / fetch / dispatcher / max_cycles 供回放測試使用 (見 replay_harness.py)：
+    fetch(stock_id) 取代下載資料，max_cycles 為最多檢查幾次。
+    scheduler 決定本機模式每次等待多久 (預設依台股交易時段，見 market_schedule.py)。
+    """
+    clock = clock or SystemClock()
+    scheduler = scheduler or MarketScheduler()
+    if dispatcher is None:
+        # 優先從 GitHub Secrets 讀取 Webhook
+        webhook = os.environ.get("DISCORD_WEBHOOK_URL")
+
+        # 如果不是雲端，且沒設定變數，才詢問使用者
+        if not webhook and os.environ.get("GITHUB_ACTIONS") != "true":
+            webhook = input("👉 請輸入 Discord Webhook 網址: ").strip()
+
+        if not webhook:
+            print("❌ 無法取得 Webhook，監控中止")
+            return
+        dispatcher = AlertDispatcher(webhook)
 
     print(f"\n🚀 監控啟動！目標: {stock_id}")
 
     # 如果是雲端，只執行一次就結束 (由 GitHub 排程控制頻率)
-    is_cloud = os.environ.get("GITHUB_ACTIONS") == "true"
+    is_cloud = os.environ.get("GITHUB_ACTIONS") == "true" and fetch is None
+    # 雲端每次都是冷啟動：靠 snapshot 只抓新的 K 線，並記住上次通知的狀態
+    snapshot_path = os.environ.get("MONITOR_SNAPSHOT", SNAPSHOT_PATH)
+    snapshot = None
+    cycles = 0
     
-    while True:
+    while max_cycles is None or cycles < max_cycles:
+        cycles += 1
         try:
-            data = get_realtime_data(stock_id)
+            if is_cloud:
+                data, snapshot = get_snapshot_data(stock_id, snapshot_path)
+                if snapshot and snapshot.get("alert_state"):
+                    dispatcher.restore_state({stock_id: tuple(snapshot["alert_state"])})
+            else:
+                data = (fetch or get_realtime_data)(stock_id)
             if data is not None:
                 price = data['Close']
                 rsi = data['RSI']
@@ -113,7 +130,7 @@ def start_monitoring(stock_id):
                 
                 trend = "多頭 📈" if price > ma20 else "空頭 📉"
                 rsi_stat = "過熱 🔥" if rsi > 70 else "超賣 ❄️" if rsi < 30 else "中性"
-                now_time = datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
+                now_time = clock.now().strftime("%Y-%m-%d %H:%M")
                 
                 msg = (
                     f"📊 **【{stock_id} 定時快報】**\n"
@@ -122,7 +139,11 @@ def start_monitoring(stock_id):
                     f"趨勢: {trend}\n"
                     f"RSI: `{rsi:.1f}` ({rsi_stat})"
                 )
-                send_discord_msg(webhook, msg)
+                # 趨勢或 RSI 狀態有變化才通知，由背景執行緒送出
+                if not dispatcher.notify_change(stock_id, (trend, rsi_stat), msg):
+                    print("ℹ️ 狀態未改變，不發送通知")
+                if snapshot is not None:
+                    save_snapshot(snapshot, snapshot_path)
             else:
                 print("⚠️ 暫時抓不到資料")
 
@@ -130,16 +151,23 @@ def start_monitoring(stock_id):
                 print("☁️ 雲端任務執行完畢，結束程序。")
                 break # 雲端跑一次就收工
             
-            # 本機模式：等待 30 分鐘
-            print("⏳ 等待 30 分鐘後檢查...")
-            time.sleep(1800) 
+            # 本機模式：休市時睡到開盤，盤中依開收盤 / 訊號門檻 / 資料是否更新調整間隔
+            delay = scheduler.next_delay(clock.now(), data)
+            print(f"⏳ 等待 {delay / 60:.0f} 分鐘後檢查...")
+            clock.sleep(delay)
 
         except KeyboardInterrupt:
             break
         except Exception as e:
             print(f"錯誤: {e}")
             if is_cloud: break
-            time.sleep(60)
+            clock.sleep(60)
+
+    dispatcher.close()
+    # 通知確認送達後才記錄狀態 (送出失敗時下次執行會再通知)
+    if snapshot is not None and dispatcher.last_state(stock_id) is not None:
+        snapshot["alert_state"] = list(dispatcher.last_state(stock_id))
+        save_snapshot(snapshot, snapshot_path)
 
 # --- 原本的分析函式 (保持不變) ---
 def run_analysis_report(stock_id, held_qty, avg_cost):
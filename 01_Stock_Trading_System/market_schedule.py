@@ -0,0 +1,112 @@
+import os
+import csv
+import datetime
+from zoneinfo import ZoneInfo
+
+# --- 🚀 設定區 🚀 ---
+TAIPEI = ZoneInfo("Asia/Taipei")
+HOLIDAY_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "twse_holidays.csv")
+MARKET_OPEN = datetime.time(9, 0)
+MARKET_CLOSE = datetime.time(13, 30)
+BASE_INTERVAL = 1800      # 秒：盤中一般輪詢間隔 (同原本的 30 分鐘)
+FAST_INTERVAL = 300       # 秒：開收盤前後或接近訊號門檻時
+EDGE_MINUTES = 30         # 開盤後 / 收盤前幾分鐘算「開收盤附近」
+POST_CLOSE_MINUTES = 20   # 收盤後再抓一次，拿到當天最終的日 K
+NEAR_RSI = 3.0            # RSI 距離 70 / 30 幾點內算接近門檻
+NEAR_MA_PCT = 0.005       # 股價距離 MA20 幾 % 內算接近多空切換
+MAX_BACKOFF = 3           # 資料連續沒變時，間隔最多放大 2**3 倍
+
+def load_holidays(path=HOLIDAY_FILE):
+    """ 讀取休市日 CSV (欄位 date,name)；檔案不存在時只排除週末 """
+    if not os.path.exists(path):
+        print(f"⚠️ 找不到休市日檔案 {path}，只排除週末")
+        return set()
+    with open(path, encoding="utf-8") as f:
+        return {datetime.date.fromisoformat(row["date"]) for row in csv.DictReader(f)}
+
+class MarketScheduler:
+    """
+    依台股交易時段決定下一次輪詢要等多久：
+    - 休市 (夜間、週末、休市日) 直接睡到下一次開盤，收盤後多抓一次當天的最終 K 線
+    - 開收盤附近、股價接近 MA20 或 RSI 接近 70 / 30 時縮短為 FAST_INTERVAL
+    - 上游資料連續沒有變化時指數拉長間隔，有變化就恢復
+    """
+
+    def __init__(self, holidays=None, base_interval=BASE_INTERVAL, fast_interval=FAST_INTERVAL):
+        self.holidays = load_holidays() if holidays is None else set(holidays)
+        self.base_interval = base_interval
+        self.fast_interval = fast_interval
+        self._last_bar = None
+        self._unchanged = 0
+
+    # --- 交易日曆 ---
+    def is_trading_day(self, day):
+        return day.weekday() < 5 and day not in self.holidays
+
+    def session(self, day):
+        return (datetime.datetime.combine(day, MARKET_OPEN, TAIPEI),
+                datetime.datetime.combine(day, MARKET_CLOSE, TAIPEI))
+
+    def is_open(self, now):
+        now = self._local(now)
+        open_at, close_at = self.session(now.date())
+        return self.is_trading_day(now.date()) and open_at <= now < close_at
+
+    def next_open(self, now):
+        now = self._local(now)
+        day = now.date()
+        if self.is_trading_day(day) and now < self.session(day)[0]:
+            return self.session(day)[0]
+        day += datetime.timedelta(days=1)
+        while not self.is_trading_day(day):
+            day += datetime.timedelta(days=1)
+        return self.session(day)[0]
+
+    # --- 輪詢間隔 ---
+    def observe(self, data):
+        """ 記錄這次抓到的資料，回傳是否與上次不同 (日期或收盤價改變) """
+        bar = None if data is None else (str(getattr(data, "name", "")), float(data['Close']))
+        changed = bar is not None and bar != self._last_bar
+        self._last_bar = bar if bar is not None else self._last_bar
+        self._unchanged = 0 if changed else self._unchanged + 1
+        return changed
+
+    def near_trigger(self, data):
+        if data is None:
+            return False
+        price, ma20, rsi = float(data['Close']), float(data['MA20']), float(data['RSI'])
+        near_ma = ma20 > 0 and abs(price / ma20 - 1) < NEAR_MA_PCT
+        near_rsi = abs(rsi - 70) < NEAR_RSI or abs(rsi - 30) < NEAR_RSI
+        return near_ma or near_rsi
+
+    def next_delay(self, now, data=None):
+        """ 本次抓到 data 之後，距離下一次輪詢的秒數 """
+        self.observe(data)
+        now = self._local(now)
+        open_at, close_at = self.session(now.date())
+        trading_day = self.is_trading_day(now.date())
+
+        if not (trading_day and open_at <= now < close_at):
+            post_close = close_at + datetime.timedelta(minutes=POST_CLOSE_MINUTES)
+            if trading_day and close_at <= now < post_close:
+                return (post_close - now).total_seconds()
+            return (self.next_open(now) - now).total_seconds()
+
+        edge = datetime.timedelta(minutes=EDGE_MINUTES)
+        if now < open_at + edge or now >= close_at - edge or self.near_trigger(data):
+            interval = self.fast_interval
+        else:
+            interval = self.base_interval * 2 ** min(self._unchanged, MAX_BACKOFF)
+
+        # 不要睡過收盤前的密集輪詢時段
+        dense_from = close_at - edge
+        if now < dense_from:
+            interval = min(interval, (dense_from - now).total_seconds())
+        return max(float(interval), 1.0)
+
+    @staticmethod
+    def _local(now):
+        """ 沒有時區的時間視為台北時間 (回放的虛擬時鐘、K 線時間都是台北時間)，不受執行機器的時區影響 """
+        if now.tzinfo is None:
+            return now.replace(tzinfo=TAIPEI)
+        return now.astimezone(TAIPEI)
@@ -0,0 +1,240 @@
+import os
+import math
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from panel_store import STORE_DIR, PanelStore
+from screener import DEFAULT_UNIVERSE, normalize_stock_id, load_price_panel, load_price_panel_from_store
+
+# --- 🚀 設定區 🚀 ---
+WINDOW = 60            # 滾動相關係數視窗 (日報酬筆數)
+STEP = 5               # 每隔幾天評估一次視窗 (最後一個視窗一定對齊最新一天)
+BLOCK = 256            # N×N 相關矩陣切成 BLOCK×BLOCK 的區塊，每個區塊一個工作
+TOP_K = 50
+MIN_WINDOW_FRAC = 0.5  # 至少要有幾成的視窗算得出相關係數才列入排名 (排除剛上市、長期停牌的股票)
+WORKERS = os.cpu_count() or 1
+ADF_LAGS = 1
+ADF_CRITICAL = -3.34   # Engle-Granger 兩變數 (含常數項) 5% 臨界值
+
+# 做法：
+# 報酬率矩陣 R (股票 × 日期) 依股票切成區塊，每對區塊 (bi <= bj) 維護視窗內的
+#   n = Vi·Vjᵀ, Σx = Xi·Vjᵀ, Σy = Vi·Xjᵀ, Σx² = Xi²·Vjᵀ, Σy² = Vi·Xj²ᵀ, Σxy = Xi·Xjᵀ
+# (X 為缺值補 0 的報酬，V 為有值的 0/1 矩陣，每一對股票只用兩者都有值的日子，同 pandas 的 pairwise corr)。
+# 視窗往前移 STEP 天時只加上新進的 STEP 天、減掉移出的 STEP 天 (BLOCK×STEP 乘 STEP×BLOCK 的矩陣乘法)，
+# 不必重算整個視窗；沒有缺值的區塊省略 V 的乘法。每個區塊只回傳自己的前 K 名，最後再合併。
+
+_RETURNS = None
+
+def log_returns(prices):
+    """ (股票 × 日期) 價格矩陣 → (股票 × 日期-1) 對數報酬，float64 """
+    prices = np.asarray(prices, dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.diff(np.log(np.where(prices > 0, prices, np.nan)), axis=1)
+
+def window_ends(n_obs, window, step):
+    """ 每個評估視窗的結束位置 (不含)，由最新一天往回每 step 天一個 """
+    if n_obs < window:
+        return np.zeros(0, dtype=np.int64)
+    return np.arange(n_obs, window - 1, -step)[::-1]
+
+class _BlockSums:
+    """ 一對股票區塊在目前視窗內的計數、和與交叉乘積 """
+
+    def __init__(self, xi, xj, same):
+        self.same = same
+        self.xi, self.xj = xi, xj
+        self.vi, self.vj = ~np.isnan(xi), ~np.isnan(xj)
+        self.dense = self.vi.all() and self.vj.all()
+        self.xi0, self.xj0 = np.where(self.vi, xi, 0.0), np.where(self.vj, xj, 0.0)
+        self.vi, self.vj = self.vi.astype(np.float64), self.vj.astype(np.float64)
+        self.reset()
+
+    def reset(self):
+        shape = (self.xi.shape[0], self.xj.shape[0])
+        self.n, self.sx, self.sy, self.sxx, self.syy, self.sxy = (np.zeros(shape) for _ in range(6))
+
+    def add(self, lo, hi, sign=1.0):
+        if hi <= lo:
+            return
+        a, b = self.xi0[:, lo:hi], self.xj0[:, lo:hi]
+        self.sxy += sign * (a @ b.T)
+        if self.dense:
+            self.n += sign * (hi - lo)
+            self.sx += sign * a.sum(axis=1)[:, None]
+            self.sy += sign * b.sum(axis=1)[None, :]
+            self.sxx += sign * (a * a).sum(axis=1)[:, None]
+            self.syy += sign * (b * b).sum(axis=1)[None, :]
+            return
+        va, vb = self.vi[:, lo:hi], self.vj[:, lo:hi]
+        self.n += sign * (va @ vb.T)
+        self.sx += sign * (a @ vb.T)
+        self.sy += sign * (va @ b.T)
+        self.sxx += sign * ((a * a) @ vb.T)
+        self.syy += sign * (va @ (b * b).T)
+
+    def corr(self, min_periods):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            n = self.n
+            cov = self.sxy - self.sx * self.sy / n
+            var_x = self.sxx - self.sx * self.sx / n
+            var_y = self.syy - self.sy * self.sy / n
+            out = cov / np.sqrt(var_x * var_y)
+        # 交叉乘積逐步加減會累積極小的誤差，夾回 [-1, 1]；常數序列 (變異數 0) 為 NaN
+        out = np.clip(out, -1.0, 1.0)
+        out[(n < min_periods) | (var_x <= 1e-14 * self.sxx) | (var_y <= 1e-14 * self.syy)] = np.nan
+        return out
+
+def _init_worker(returns):
+    global _RETURNS
+    _RETURNS = returns
+
+def _scan_block(task):
+    """ 計算一對區塊的滾動相關，回傳區塊內依平均相關排序的前 top_k 對 """
+    (i0, i1), (j0, j1), window, step, min_periods, min_windows, top_k = task
+    xi = np.ascontiguousarray(_RETURNS[i0:i1], dtype=np.float64)
+    xj = xi if i0 == j0 else np.ascontiguousarray(_RETURNS[j0:j1], dtype=np.float64)
+    sums = _BlockSums(xi, xj, same=(i0 == j0))
+    ends = window_ends(xi.shape[1], window, step)
+
+    corr_sum = np.zeros((i1 - i0, j1 - j0))
+    corr_min = np.full((i1 - i0, j1 - j0), np.inf)
+    n_windows = np.zeros((i1 - i0, j1 - j0), dtype=np.int64)
+    last = None
+    prev = None
+    for end in ends:
+        start = end - window
+        if prev is None or step >= window:
+            sums.reset()
+            sums.add(start, end)
+        else:
+            sums.add(prev, end)                       # 新進視窗的日子
+            sums.add(prev - window, start, sign=-1.0)  # 移出視窗的日子
+        prev = end
+        last = sums.corr(min_periods)
+        ok = ~np.isnan(last)
+        corr_sum[ok] += last[ok]
+        np.minimum(corr_min, np.where(ok, last, np.inf), out=corr_min)
+        n_windows += ok
+
+    if last is None:
+        return None
+    with np.errstate(invalid="ignore"):
+        mean = corr_sum / n_windows
+    keep = n_windows >= max(min_windows, 1)
+    if sums.same:
+        keep &= np.triu(np.ones_like(keep), k=1)     # 對角區塊只取上三角 (i < j)
+    rows, cols = np.nonzero(keep)
+    if len(rows) > top_k:
+        best = np.argpartition(-mean[rows, cols], top_k - 1)[:top_k]
+        rows, cols = rows[best], cols[best]
+    return {
+        "i": rows + i0, "j": cols + j0,
+        "mean_corr": mean[rows, cols], "min_corr": corr_min[rows, cols],
+        "last_corr": last[rows, cols], "windows": n_windows[rows, cols],
+    }
+
+def rolling_corr_top_pairs(returns, window=WINDOW, step=STEP, top_k=TOP_K, block=BLOCK,
+                           workers=WORKERS, min_periods=None, min_windows=None):
+    """
+    returns: (股票 × 日期) 報酬矩陣 (可含 NaN)。
+    每 step 天評估一次長度 window 的滾動相關，依「各視窗相關係數的平均」排序，回傳前 top_k 對
+    (DataFrame 欄位 i / j / mean_corr / min_corr / last_corr / windows，last_corr 為最新視窗)。
+    有效視窗少於 min_windows 的股票對不列入排名 (預設為全部視窗數的 MIN_WINDOW_FRAC)。
+    """
+    returns = np.asarray(returns)
+    n = returns.shape[0]
+    min_periods = window if min_periods is None else min_periods
+    if min_windows is None:
+        min_windows = math.ceil(MIN_WINDOW_FRAC * len(window_ends(returns.shape[1], window, step)))
+    bounds = [(lo, min(lo + block, n)) for lo in range(0, n, block)]
+    tasks = [(bi, bj, window, step, min_periods, min_windows, top_k)
+             for a, bi in enumerate(bounds) for bj in bounds[a:]]
+
+    if workers <= 1 or len(tasks) == 1:
+        _init_worker(returns)
+        parts = list(map(_scan_block, tasks))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(returns,)) as pool:
+            parts = list(pool.map(_scan_block, tasks))
+
+    parts = [p for p in parts if p is not None and len(p["i"])]
+    columns = ["i", "j", "mean_corr", "min_corr", "last_corr", "windows"]
+    if not parts:
+        return pd.DataFrame(columns=columns)
+    result = pd.DataFrame({c: np.concatenate([p[c] for p in parts]) for c in columns})
+    result = result.sort_values(["mean_corr", "i", "j"], ascending=[False, True, True], kind="stable")
+    return result.head(top_k).reset_index(drop=True)
+
+def spread_adf(log_x, log_y, lags=ADF_LAGS):
+    """
+    價差平穩性 (Engle-Granger)：log_x 對 log_y 做 OLS 取得避險比例 beta，
+    對價差 s 做 ADF 迴歸 Δs_t = a + b·s_{t-1} + Σ c_k·Δs_{t-k}，回傳 (beta, b 的 t 值, 半衰期天數)。
+    """
+    ok = ~(np.isnan(log_x) | np.isnan(log_y))
+    x, y = log_x[ok], log_y[ok]
+    if len(x) < lags + 10:
+        return math.nan, math.nan, math.nan
+    beta, alpha = np.polyfit(y, x, 1)
+    s = x - beta * y - alpha
+    ds = np.diff(s)
+    target = ds[lags:]
+    design = [np.ones(len(target)), s[lags:-1]]
+    design += [ds[lags - k:-k] for k in range(1, lags + 1)]
+    design = np.column_stack(design)
+    coef, _, _, _ = np.linalg.lstsq(design, target, rcond=None)
+    resid = target - design @ coef
+    dof = len(target) - design.shape[1]
+    sigma2 = resid @ resid / dof
+    cov = sigma2 * np.linalg.inv(design.T @ design)
+    b = coef[1]
+    t_stat = b / math.sqrt(cov[1, 1])
+    half_life = -math.log(2) / math.log1p(b) if -1 < b < 0 else math.inf
+    return float(beta), float(t_stat), float(half_life)
+
+def scan_pairs(prices, tickers, window=WINDOW, step=STEP, top_k=TOP_K, block=BLOCK, workers=WORKERS,
+               min_periods=None, lags=ADF_LAGS, min_windows=None):
+    """ 價格矩陣 (股票 × 日期) → 前 top_k 對高相關股票，附上對數價差的 ADF 檢定 """
+    prices = np.asarray(prices)
+    pairs = rolling_corr_top_pairs(log_returns(prices), window, step, top_k, block, workers, min_periods,
+                                   min_windows)
+    tickers = np.asarray(tickers, dtype=object)
+    i, j = pairs["i"].to_numpy(dtype=np.int64), pairs["j"].to_numpy(dtype=np.int64)
+
+    stats = []
+    for a, b in zip(i, j):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            log_a = np.log(np.asarray(prices[a], dtype=np.float64))
+            log_b = np.log(np.asarray(prices[b], dtype=np.float64))
+        stats.append(spread_adf(log_a, log_b, lags))
+    stats = np.array(stats, dtype=np.float64).reshape(-1, 3)
+
+    return pd.DataFrame({
+        "股票A": tickers[i], "股票B": tickers[j], "視窗數": pairs["windows"],
+        "平均相關": pairs["mean_corr"], "最低相關": pairs["min_corr"], "最新相關": pairs["last_corr"],
+        "避險比例": stats[:, 0], "ADF t值": stats[:, 1], "半衰期(天)": stats[:, 2],
+        "價差平穩": stats[:, 1] < ADF_CRITICAL,
+    })
+
+if __name__ == "__main__":
+    print("\n" + "="*40)
+    print("      配對掃描 (滾動相關 + 價差平穩性)")
+    print("="*40)
+
+    ids_str = input("👉 請輸入代號，以逗號分隔 (直接 Enter 使用 panel store 全部股票或預設股票池): ").strip()
+    stock_ids = [normalize_stock_id(s) for s in ids_str.split(",") if s.strip()] or None
+    window_str = input(f"👉 滾動視窗天數 (直接 Enter 使用 {WINDOW}): ").strip()
+    window = int(window_str) if window_str else WINDOW
+
+    store = None
+    if os.path.exists(os.path.join(STORE_DIR, "index.json")):
+        store = PanelStore(STORE_DIR)
+    if store is not None and (stock_ids is None or set(stock_ids) <= set(store.tickers)):
+        prices, tickers, dates = load_price_panel_from_store(store, stock_ids)
+    else:
+        prices, tickers, dates = load_price_panel(stock_ids or DEFAULT_UNIVERSE)
+
+    print(f"⏳ 掃描 {len(tickers)} 檔 ({len(tickers) * (len(tickers) - 1) // 2} 對)，{len(dates)} 天...")
+    result = scan_pairs(prices, tickers, window=window)
+
+    pd.set_option('display.unicode.east_asian_width', True)
+    print(result.round(3).to_string())
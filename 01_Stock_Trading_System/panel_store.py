@@ -0,0 +1,132 @@
+import os
+import json
+import yfinance as yf
+import pandas as pd
+import numpy as np
+
+# --- 🚀 設定區 🚀 ---
+STORE_DIR = "panel_store"
+STORE_VERSION = 2
+FIELDS = ("Open", "High", "Low", "Close", "Volume")
+START_DATE = "2021-01-01"
+
+# 檔案格式 (STORE_DIR/)：
+#   panel.<世代>.f32  float32，C order，形狀 (欄位 × 股票 × 日期)，沒有檔頭
+#   index.json        版本、世代、資料檔名、欄位、股票代號、日期 (YYYY-MM-DD) 與形狀
+# 每次寫入都是新的世代檔，最後才換掉 index.json：讀取端依 index.json 指定的檔名開啟，
+# 不會把新資料配上舊索引 (或反過來)。
+# 以欄位為最外層：某個欄位的整個股票池 (例如選股用的收盤價矩陣) 與
+# 單一股票某段期間的收盤價都是連續記憶體，用 np.memmap 開啟後切片不會複製。
+# 多個行程開啟同一個檔案時共用作業系統的 page cache。
+
+def _read_index(path):
+    with open(os.path.join(path, "index.json"), encoding="utf-8") as f:
+        return json.load(f)
+
+def write_store(values, tickers, dates, fields=FIELDS, path=STORE_DIR):
+    """
+    values: (欄位 × 股票 × 日期) 陣列。資料寫成新的世代檔，再以換名更新 index.json，
+    讀取中的行程只會看到完整的舊版或新版；只保留目前與上一個世代的資料檔。
+    """
+    values = np.asarray(values, dtype=np.float32)
+    shape = (len(fields), len(tickers), len(dates))
+    if values.shape != shape:
+        raise ValueError(f"形狀 {values.shape} 與索引 {shape} 不符")
+
+    os.makedirs(path, exist_ok=True)
+    try:
+        previous = _read_index(path).get("generation", 0)
+    except (OSError, ValueError):
+        previous = 0
+    generation = previous + 1
+    data_file = f"panel.{generation}.f32"
+    data_path = os.path.join(path, data_file)
+    index_path = os.path.join(path, "index.json")
+    np.ascontiguousarray(values).tofile(f"{data_path}.tmp")
+    os.replace(f"{data_path}.tmp", data_path)
+    index = {
+        "version": STORE_VERSION,
+        "generation": generation,
+        "data_file": data_file,
+        "fields": list(fields),
+        "tickers": list(tickers),
+        "dates": [d.strftime("%Y-%m-%d") for d in pd.DatetimeIndex(dates)],
+        "shape": list(shape),
+        "dtype": "float32",
+    }
+    with open(f"{index_path}.tmp", "w", encoding="utf-8") as f:
+        json.dump(index, f)
+    os.replace(f"{index_path}.tmp", index_path)
+
+    # 舊世代的資料檔：剛讀到上一版 index.json 的行程可能還要開啟上一個世代，保留它
+    keep = {data_file, f"panel.{previous}.f32"}
+    for name in os.listdir(path):
+        if name.startswith("panel.") and name.endswith(".f32") and name not in keep:
+            os.remove(os.path.join(path, name))
+
+def download_store(stock_ids, start=START_DATE, path=STORE_DIR):
+    """ 一次下載整個股票池的 OHLCV 寫成 panel store，回傳開啟後的 PanelStore """
+    df = yf.download(stock_ids, start=start, progress=False, group_by="column")
+    if not isinstance(df.columns, pd.MultiIndex):
+        df.columns = pd.MultiIndex.from_product([df.columns, stock_ids[:1]])
+    if df.index.tz is not None:
+        df.index = df.index.tz_localize(None)
+    values = np.stack([
+        df[field].reindex(columns=stock_ids).to_numpy(dtype=np.float32).T for field in FIELDS
+    ])
+    write_store(values, stock_ids, df.index, FIELDS, path)
+    return PanelStore(path)
+
+class PanelStore:
+    """ 唯讀開啟 panel store；field / ticker 回傳 memmap 的 view (不複製資料)，frame 與指定多個欄位時才複製 """
+
+    def __init__(self, path=STORE_DIR):
+        index = _read_index(path)
+        if index.get("version") != STORE_VERSION:
+            raise ValueError(f"不支援的 panel store 版本: {index.get('version')}")
+        self.path = path
+        self.generation = index["generation"]
+        self.fields = index["fields"]
+        self.tickers = index["tickers"]
+        self.dates = pd.DatetimeIndex(index["dates"])
+        data_path = os.path.join(path, index["data_file"])
+        shape = tuple(index["shape"])
+        if os.path.getsize(data_path) != int(np.prod(shape)) * 4:
+            raise ValueError(f"{index['data_file']} 與 index.json 的形狀不符")
+        self.values = np.memmap(data_path, dtype=np.float32, mode="r", shape=shape)
+        self._field_pos = {f: i for i, f in enumerate(self.fields)}
+        self._ticker_pos = {t: i for i, t in enumerate(self.tickers)}
+
+    def date_range(self, start=None, end=None):
+        """ 日期區間 [start, end] 對應的切片 """
+        lo = 0 if start is None else self.dates.searchsorted(pd.Timestamp(start), side="left")
+        hi = len(self.dates) if end is None else self.dates.searchsorted(pd.Timestamp(end), side="right")
+        return slice(lo, hi)
+
+    def field(self, field, start=None, end=None):
+        """ 整個股票池某欄位的 (股票 × 日期) 矩陣 """
+        return self.values[self._field_pos[field], :, self.date_range(start, end)]
+
+    def ticker(self, ticker, start=None, end=None, fields=None):
+        """ 單一股票的 (欄位 × 日期) 陣列；fields 只給一個欄位名稱時回傳一維序列 """
+        dates = self.date_range(start, end)
+        t = self._ticker_pos[ticker]
+        if isinstance(fields, str):
+            return self.values[self._field_pos[fields], t, dates]
+        if fields is None:
+            return self.values[:, t, dates]
+        return np.stack([self.values[self._field_pos[f], t, dates] for f in fields])
+
+    def frame(self, ticker, start=None, end=None):
+        """ 與 yf.download 相同欄位的 DataFrame (方便沿用既有程式；會轉成 float64 複本) """
+        dates = self.date_range(start, end)
+        data = self.values[:, self._ticker_pos[ticker], dates]
+        return pd.DataFrame(data.T.astype(np.float64), index=self.dates[dates], columns=self.fields)
+
+if __name__ == "__main__":
+    from screener import DEFAULT_UNIVERSE, normalize_stock_id
+    ids_str = input("👉 請輸入股票代號，以逗號分隔 (直接 Enter 使用預設股票池): ").strip()
+    stock_ids = [normalize_stock_id(s) for s in ids_str.split(",") if s.strip()] or DEFAULT_UNIVERSE
+    store = download_store(stock_ids)
+    size_mb = store.values.nbytes / 1024 / 1024
+    print(f"✅ 已寫入 {STORE_DIR}/：{len(store.tickers)} 檔股票 × {len(store.dates)} 天 × {len(store.fields)} 欄 ({size_mb:.1f} MB)")
@@ -0,0 +1,130 @@
+import io
+import time
+import datetime
+import contextlib
+import numpy as np
+import pandas as pd
+from alert_dispatcher import QUEUE_SIZE, AlertDispatcher, WebhookStub
+from main import start_monitoring
+
+# --- 🚀 設定區 🚀 ---
+SPEED = 0              # 0 = 不等待，盡可能快；例如 3600 代表虛擬 1 小時 = 真實 1 秒
+WEBHOOK_DELAY = 0.0    # 秒：模擬 webhook 回應時間
+COALESCE = False       # 回放時每則通知各自送出 (不合併)，量測的是單則通知的延遲
+
+class VirtualClock:
+    """ 取代 time.sleep / datetime.now：sleep 只推進虛擬時間 (speed > 0 時依比例真的等待) """
+
+    def __init__(self, start, speed=SPEED):
+        self._now = pd.Timestamp(start).to_pydatetime()
+        self.speed = speed
+        self.slept = 0.0
+
+    def now(self):
+        return self._now
+
+    def sleep(self, seconds):
+        self._now += datetime.timedelta(seconds=seconds)
+        self.slept += seconds
+        if self.speed:
+            time.sleep(seconds / self.speed)
+
+    def advance_to(self, when):
+        when = pd.Timestamp(when).to_pydatetime()
+        if when > self._now:
+            self._now = when
+
+def load_bars(path):
+    """ 讀取錄下來的日 K (yfinance 匯出的 CSV：Date, Open, High, Low, Close, Volume)，算出與 get_realtime_data 相同的指標 """
+    df = pd.read_csv(path, index_col=0, parse_dates=True)
+    df.index = pd.DatetimeIndex(df.index).tz_localize(None)
+    df['MA20'] = df['Close'].rolling(window=20).mean()
+    df['RSI'] = 100 - (100 / (1 + (df['Close'].diff().where(lambda x: x>0, 0).rolling(14).mean() / -df['Close'].diff().where(lambda x: x<0, 0).rolling(14).mean())))
+    return df.dropna(subset=['MA20', 'RSI'])
+
+class ReplayFeed:
+    """ 每次被呼叫回傳下一根 K 線 (取代 get_realtime_data)，並把虛擬時鐘推到該 K 線的時間 """
+
+    def __init__(self, bars, clock):
+        self.bars = bars
+        self.clock = clock
+        self.pos = 0
+        self.arrived_at = None   # 最近一根資料交給監控程式的真實時間
+
+    def __call__(self, stock_id):
+        if self.pos >= len(self.bars):
+            return None
+        row = self.bars.iloc[self.pos]
+        self.pos += 1
+        self.clock.advance_to(row.name)
+        self.arrived_at = time.perf_counter()
+        return row
+
+class LatencyDispatcher(AlertDispatcher):
+    """ 記錄每則通知對應的資料到達時間，webhook 送出後算出延遲 """
+
+    def __init__(self, webhook_url, feed, **kwargs):
+        super().__init__(webhook_url, **kwargs)
+        self.feed = feed
+        self.latencies = []
+        self._arrived = {}
+        self.on_sent = self._record
+
+    def _enqueue(self, item):
+        msg = item[2]
+        self._arrived[id(msg)] = (msg, self.feed.arrived_at)
+        super()._enqueue(item)
+
+    def _record(self, batch):
+        done = time.perf_counter()
+        for msg in batch:
+            _, arrived = self._arrived.pop(id(msg), (None, None))
+            if arrived is not None:
+                self.latencies.append(done - arrived)
+
+def _percentiles(values):
+    if not values:
+        return {"p50_ms": float("nan"), "p99_ms": float("nan")}
+    ms = np.asarray(values) * 1000
+    return {"p50_ms": float(np.percentile(ms, 50)), "p99_ms": float(np.percentile(ms, 99))}
+
+def replay_monitor(bars, stock_id="REPLAY", speed=SPEED, webhook_delay=WEBHOOK_DELAY,
+                   coalesce=COALESCE, quiet=True):
+    """
+    把錄好的 K 線依序餵給 main.start_monitoring (虛擬時鐘 + 本機 webhook)，
+    回傳通知延遲 (資料到達 → webhook 收到) 的 p50 / p99 與每秒處理的 K 線數。
+    預設每則通知各自送出，延遲是單則通知的延遲；coalesce=True 時同樣依佇列合併，量到的是合併後整批的延遲。
+    """
+    clock = VirtualClock(bars.index[0], speed)
+    feed = ReplayFeed(bars, clock)
+    out = io.StringIO() if quiet else None
+
+    with WebhookStub(delay=webhook_delay) as stub:
+        dispatcher = LatencyDispatcher(stub.url, feed, flush_interval=0, coalesce=coalesce,
+                                       queue_size=max(QUEUE_SIZE, len(bars)))   # 每根 K 線最多一則，不會丟通知
+        with contextlib.redirect_stdout(out) if quiet else contextlib.nullcontext():
+            started = time.perf_counter()
+            start_monitoring(stock_id, clock=clock, fetch=feed, dispatcher=dispatcher, max_cycles=len(bars))
+            elapsed = time.perf_counter() - started
+
+    return {
+        "bars": feed.pos,
+        "seconds": elapsed,
+        "bars_per_sec": feed.pos / elapsed if elapsed else float("inf"),
+        "virtual_seconds": clock.slept,
+        "alerts": len(dispatcher.latencies),
+        "webhook_messages": len(stub.received),
+        **_percentiles(dispatcher.latencies),
+        **dispatcher.stats,
+    }
+
+if __name__ == "__main__":
+    print("\n" + "="*40)
+    print("      監控回放測試 (虛擬時鐘)")
+    print("="*40)
+    path = input("👉 請輸入錄好的日 K CSV 路徑: ").strip()
+    speed_str = input("👉 回放倍速 (直接 Enter = 盡可能快): ").strip()
+    bars = load_bars(path)
+    result = replay_monitor(bars, speed=float(speed_str) if speed_str else SPEED)
+    print(f"K 線數: {result['bars']}，耗時 {result['seconds']:.2f} 秒 ({result['bars_per_sec']:.0f} 根/秒)")
+    print(f"通知數: {result['alerts']}，延遲 p50 {result['p50_ms']:.1f} ms / p99 {result['p99_ms']:.1f} ms")
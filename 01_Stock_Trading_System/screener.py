@@ -0,0 +1,178 @@
+import os
+import datetime
+import yfinance as yf
+import pandas as pd
+import numpy as np
+from panel_store import STORE_DIR, PanelStore
+from market_schedule import TAIPEI, POST_CLOSE_MINUTES, MarketScheduler
+
+# --- 🚀 參數設定 🚀 ---
+START_DATE = "2021-01-01"
+PANEL_CACHE = "panel_cache.npz"
+DEFAULT_UNIVERSE = ["2330.TW", "2317.TW", "2454.TW", "2308.TW", "2382.TW", "2881.TW", "2882.TW", "2412.TW"]
+
+# 趨勢標籤 (與 backfast.calculate_prediction 相同)
+TREND_LABELS = np.array(["強力多頭", "緩步墊高", "空頭走勢", "盤整震盪"])
+TREND_ADVICE = np.array(["持有 1~3 個月", "持有 1~2 週", "空手觀望", "區間操作"])
+RSI_LABELS = np.array(["中性", "過熱", "超賣"])
+
+def normalize_stock_id(stock_id):
+    stock_id = stock_id.strip()
+    if stock_id.isdigit():
+        return f"{stock_id}.TW"
+    return stock_id.upper()
+
+def download_price_panel(stock_ids, start=START_DATE):
+    """ 一次下載整個股票池，回傳 (股票 × 日期) 的 float32 收盤價矩陣 """
+    df = yf.download(stock_ids, start=start, progress=False)['Close']
+    if isinstance(df, pd.Series):
+        df = df.to_frame(stock_ids[0])
+    df = df.reindex(columns=stock_ids)
+    prices = np.ascontiguousarray(df.to_numpy(dtype=np.float32).T)
+    return prices, list(df.columns), df.index
+
+def last_final_bar_time(now, scheduler):
+    """
+    最近一次「當天日 K 已定案」的時間 (交易日收盤後 POST_CLOSE_MINUTES)；
+    盤中回傳 None (價格一直在變，快取一律視為過期)。
+    """
+    if scheduler.is_open(now):
+        return None
+    day = now.date()
+    while True:
+        if scheduler.is_trading_day(day):
+            final_at = scheduler.session(day)[1] + datetime.timedelta(minutes=POST_CLOSE_MINUTES)
+            if final_at <= now:
+                return final_at
+        day -= datetime.timedelta(days=1)
+
+def cache_is_fresh(fetched_at, now=None, scheduler=None):
+    """ 快取是在最近一次日 K 定案之後下載的才可以沿用 """
+    now = now or datetime.datetime.now(TAIPEI)
+    final_at = last_final_bar_time(now, scheduler or MarketScheduler())
+    return final_at is not None and fetched_at >= final_at
+
+def load_price_panel(stock_ids, start=START_DATE, cache_path=PANEL_CACHE, refresh=False, scheduler=None):
+    """
+    讀取快取的價格矩陣；股票池不同、快取在最近一次日 K 定案前下載 (或現在是盤中)、
+    或 refresh=True 時才重新下載
+    """
+    now = datetime.datetime.now(TAIPEI)
+    if not refresh and os.path.exists(cache_path):
+        cached = np.load(cache_path, allow_pickle=False)
+        if list(cached['tickers']) == list(stock_ids) and 'fetched_at' in cached:
+            fetched_at = datetime.datetime.fromisoformat(str(cached['fetched_at']))
+            if cache_is_fresh(fetched_at, now, scheduler):
+                return cached['prices'], list(cached['tickers']), pd.DatetimeIndex(cached['dates'])
+
+    prices, tickers, dates = download_price_panel(stock_ids, start)
+    np.savez(cache_path, prices=prices, tickers=np.array(tickers), dates=dates.values.astype('datetime64[ns]'),
+             fetched_at=np.array(now.isoformat()))
+    return prices, tickers, dates
+
+def load_price_panel_from_store(store, stock_ids=None, start=None, end=None):
+    """
+    從 panel_store.PanelStore 取收盤價矩陣；stock_ids 為 None 或與 store 順序相同的連續區段時
+    直接回傳 memmap 的 view (不複製)，其餘情況才取出指定的股票。
+    """
+    close = store.field("Close", start, end)
+    dates = store.dates[store.date_range(start, end)]
+    if stock_ids is None or list(stock_ids) == store.tickers:
+        return close, list(store.tickers), dates
+    rows = [store.tickers.index(s) for s in stock_ids]
+    if rows == list(range(rows[0], rows[0] + len(rows))):
+        return close[rows[0]:rows[0] + len(rows)], list(stock_ids), dates
+    return close[rows], list(stock_ids), dates
+
+def rolling_mean(panel, window):
+    """ 沿日期軸計算移動平均；視窗內有缺值時為 NaN (同 pandas rolling) """
+    valid = ~np.isnan(panel)
+    csum = np.cumsum(np.where(valid, panel, 0), axis=1, dtype=np.float64)
+    cnt = np.cumsum(valid, axis=1)
+    csum[:, window:] = csum[:, window:] - csum[:, :-window]
+    cnt[:, window:] = cnt[:, window:] - cnt[:, :-window]
+
+    out = (csum / window).astype(np.float32)
+    out[cnt < window] = np.nan
+    out[:, :window - 1] = np.nan
+    return out
+
+def calculate_panel_indicators(prices):
+    """ 一次算出全部股票的 MA20 / MA60 / 月線斜率 / RSI(14) """
+    ma20 = rolling_mean(prices, 20)
+    ma60 = rolling_mean(prices, 60)
+
+    # 月線 5 日斜率 (同 calculate_prediction: tail(5) 頭尾相比)
+    slope = np.full_like(ma20, np.nan)
+    slope[:, 4:] = (ma20[:, 4:] - ma20[:, :-4]) / ma20[:, :-4]
+
+    delta = np.full_like(prices, np.nan)
+    delta[:, 1:] = prices[:, 1:] - prices[:, :-1]
+    gain = rolling_mean(np.where(delta > 0, delta, 0).astype(np.float32), 14)
+    loss = rolling_mean(np.where(delta < 0, -delta, 0).astype(np.float32), 14)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rsi = 100 - (100 / (1 + gain / loss))
+
+    return {'MA20': ma20, 'MA60': ma60, 'Slope': slope, 'RSI': rsi}
+
+def classify_panel(prices, indicators):
+    """ 回傳每檔股票每一天的趨勢代碼 (對應 TREND_LABELS) 與 RSI 狀態代碼 (對應 RSI_LABELS) """
+    ma20 = indicators['MA20']
+    ma60 = indicators['MA60']
+    bullish = (prices > ma20) & (ma20 > ma60)
+
+    trend = np.select(
+        [bullish & (indicators['Slope'] > 0.015), bullish, prices < ma20],
+        [0, 1, 2],
+        default=3,
+    ).astype(np.int8)
+
+    rsi = indicators['RSI']
+    rsi_state = np.select([rsi > 70, rsi < 30], [1, 2], default=0).astype(np.int8)
+    return trend, rsi_state
+
+def screen_panel(prices, tickers, dates):
+    """ 整個股票池 × 全部日期的趨勢標籤 (DataFrame: index=日期, columns=股票) """
+    indicators = calculate_panel_indicators(prices)
+    trend, _ = classify_panel(prices, indicators)
+    return pd.DataFrame(TREND_LABELS[trend].T, index=dates, columns=tickers)
+
+def screen_latest(prices, tickers, dates):
+    """ 最新一天的選股結果 """
+    indicators = calculate_panel_indicators(prices)
+    trend, rsi_state = classify_panel(prices[:, -1:], {k: v[:, -1:] for k, v in indicators.items()})
+    trend = trend[:, 0]
+    rsi_state = rsi_state[:, 0]
+
+    return pd.DataFrame({
+        '收盤價': prices[:, -1],
+        'MA20': indicators['MA20'][:, -1],
+        'MA60': indicators['MA60'][:, -1],
+        '月線斜率': indicators['Slope'][:, -1],
+        'RSI': indicators['RSI'][:, -1],
+        'RSI狀態': RSI_LABELS[rsi_state],
+        '趨勢': TREND_LABELS[trend],
+        '建議': TREND_ADVICE[trend],
+    }, index=pd.Index(tickers, name=dates[-1].date()))
+
+if __name__ == "__main__":
+    print("\n" + "="*40)
+    print("      台股趨勢選股器 (整體股票池)")
+    print("="*40)
+
+    ids_str = input("👉 請輸入股票代號，以逗號分隔 (直接 Enter 使用預設股票池): ").strip()
+    stock_ids = [normalize_stock_id(s) for s in ids_str.split(",") if s.strip()] or DEFAULT_UNIVERSE
+    refresh = input("👉 是否強制重新下載價格? (y/N): ").strip().lower() == "y"
+
+    # 有 panel_store.py 建好的 panel store 且包含這些股票時直接 memmap 開啟，不需下載
+    store = None
+    if os.path.exists(os.path.join(STORE_DIR, "index.json")):
+        store = PanelStore(STORE_DIR)
+    if not refresh and store is not None and set(stock_ids) <= set(store.tickers):
+        prices, tickers, dates = load_price_panel_from_store(store, stock_ids)
+    else:
+        prices, tickers, dates = load_price_panel(stock_ids, refresh=refresh)
+    result = screen_latest(prices, tickers, dates)
+
+    pd.set_option('display.unicode.east_asian_width', True)
+    print(result.round(2).to_string())
@@ -0,0 +1,66 @@
+import socket
+import time
+import pytest
+
+pytest.importorskip("requests")
+from alert_dispatcher import MAX_CONTENT, AlertDispatcher, WebhookStub
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("等待逾時")
+        time.sleep(0.01)
+
+def closed_port_url():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return f"http://127.0.0.1:{s.getsockname()[1]}/webhook"
+
+def test_messages_in_one_interval_are_coalesced():
+    with WebhookStub() as stub:
+        dispatcher = AlertDispatcher(stub.url, flush_interval=0.3)
+        for k in range(5):
+            dispatcher.send(f"訊息 {k}")
+        dispatcher.close()
+    assert len(stub.received) == 1
+    assert stub.received[0]["content"] == "\n\n".join(f"訊息 {k}" for k in range(5))
+    assert dispatcher.stats["queued"] == 5 and dispatcher.stats["sent"] == 1
+
+def test_long_batches_are_split_under_discord_limit():
+    items = [(None, None, "x" * 900) for _ in range(5)]
+    chunks = AlertDispatcher._pack(items)
+    assert [len(members) for _, members in chunks] == [2, 2, 1]
+    assert all(len(content) <= MAX_CONTENT for content, _ in chunks)
+
+def test_notify_change_only_sends_new_states():
+    with WebhookStub() as stub:
+        dispatcher = AlertDispatcher(stub.url, flush_interval=0, coalesce=False)
+        assert dispatcher.notify_change("2330.TW", ("多頭", "中性"), "多頭")
+        assert not dispatcher.notify_change("2330.TW", ("多頭", "中性"), "多頭")    # 正在送
+        wait_until(lambda: dispatcher.last_state("2330.TW") == ("多頭", "中性"))
+        assert not dispatcher.notify_change("2330.TW", ("多頭", "中性"), "多頭")    # 已送達
+        assert dispatcher.notify_change("2330.TW", ("空頭", "中性"), "空頭")
+        dispatcher.close()
+    assert [m["content"] for m in stub.received] == ["多頭", "空頭"]
+    assert dispatcher.stats["suppressed"] == 2
+
+def test_rate_limited_requests_are_retried():
+    with WebhookStub(rate_limit_every=2, retry_after=0.05) as stub:
+        dispatcher = AlertDispatcher(stub.url, flush_interval=0, coalesce=False)
+        for k in range(4):
+            dispatcher.send(f"訊息 {k}")
+        dispatcher.close()
+    assert sorted(m["content"] for m in stub.received) == [f"訊息 {k}" for k in range(4)]
+    assert dispatcher.stats["rate_limited"] >= 1 and dispatcher.stats["sent"] == 4
+
+def test_failed_delivery_does_not_record_state():
+    dispatcher = AlertDispatcher(closed_port_url(), flush_interval=0, coalesce=False, max_retries=1, timeout=1)
+    dispatcher.notify_change("2330.TW", "多頭", "多頭")
+    wait_until(lambda: dispatcher.stats["failed"] == 1)
+    assert dispatcher.last_state("2330.TW") is None
+    # 沒送達：同樣的狀態下次仍會通知
+    assert dispatcher.notify_change("2330.TW", "多頭", "多頭")
+    dispatcher.restore_state({"2317.TW": "空頭"})
+    assert not dispatcher.notify_change("2317.TW", "空頭", "空頭")
+    dispatcher.close()
@@ -0,0 +1,123 @@
+import datetime
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import pytest
+
+pytest.importorskip("yfinance")
+import backtest_service as bs
+from market_schedule import TAIPEI, MarketScheduler
+
+# 2024-10-10 國慶日休市 (週四)
+SCHEDULER = MarketScheduler(holidays=[datetime.date(2024, 10, 10)])
+AFTER_CLOSE = datetime.datetime(2024, 10, 8, 15, 0, tzinfo=TAIPEI)
+
+def at(day, hour, minute=0):
+    return datetime.datetime(2024, 10, day, hour, minute, tzinfo=TAIPEI)
+
+class CountingRunner:
+    """ 代替 run_job：記錄呼叫次數，release 之前不回傳，fail=True 時丟出例外 """
+    def __init__(self, fail=False):
+        self.calls = 0
+        self.fail = fail
+        self.release = threading.Event()
+        self.release.set()
+
+    def __call__(self, stock_id, params):
+        self.calls += 1
+        self.release.wait(5)
+        if self.fail:
+            raise ValueError(f"{stock_id} 找不到資料")
+        return {"stock_id": stock_id, "equity": params["initial_capital"]}
+
+class BrokenExecutor:
+    """ worker 被系統終止後的行程池：之後每次 submit 都丟出 BrokenProcessPool """
+    def __init__(self):
+        self.shut_down = False
+
+    def submit(self, *args):
+        raise BrokenProcessPool("A child process terminated abruptly")
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        self.shut_down = True
+
+def make_service(runner, executor=None):
+    return bs.BacktestService(runner=runner, executor=executor or ThreadPoolExecutor(2), scheduler=SCHEDULER)
+
+def test_data_version_follows_trading_calendar():
+    assert bs.data_version(AFTER_CLOSE, SCHEDULER) == "2024-10-08"
+    assert bs.data_version(at(9, 8), SCHEDULER) == "2024-10-08"      # 開盤前：上一個交易日
+    assert bs.data_version(at(10, 15), SCHEDULER) == "2024-10-09"    # 休市日
+    assert bs.data_version(at(13, 10), SCHEDULER) == "2024-10-11"    # 週日
+    intraday = bs.data_version(at(9, 10), SCHEDULER)
+    assert intraday.startswith("2024-10-09@")
+    assert bs.data_version(at(9, 10) + datetime.timedelta(seconds=bs.INTRADAY_TTL), SCHEDULER) != intraday
+
+def test_same_request_is_deduplicated_then_cached():
+    runner = CountingRunner()
+    runner.release.clear()
+    service = make_service(runner)
+    job_id, first, _ = service.submit("2330", now=AFTER_CLOSE)
+    same_id, second, cached = service.submit("2330.tw", now=AFTER_CLOSE)
+    assert same_id == job_id and second is first and not cached
+    runner.release.set()
+    first.result(5)
+
+    _, third, cached = service.submit("2330", now=AFTER_CLOSE)
+    assert cached and third.result() == first.result()
+    assert runner.calls == 1
+    assert service.stats["deduplicated"] == 1 and service.stats["cache_hits"] == 1
+    assert service.status(job_id) == ("done", first.result())
+    service.close()
+
+def test_unknown_params_are_rejected():
+    service = make_service(CountingRunner())
+    with pytest.raises(ValueError, match="未知的參數"):
+        service.submit("2330", {"short_windw": 5}, now=AFTER_CLOSE)
+    service.close()
+
+def test_failed_job_is_not_cached_and_reruns():
+    runner = CountingRunner(fail=True)
+    service = make_service(runner)
+    job_id, future, _ = service.submit("9999", now=AFTER_CLOSE)
+    with pytest.raises(ValueError):
+        future.result(5)
+    assert service.status(job_id) == ("failed", "9999.TW 找不到資料")
+
+    runner.fail = False
+    _, retry, cached = service.submit("9999", now=AFTER_CLOSE)
+    assert not cached and retry.result(5)["stock_id"] == "9999.TW"
+    assert runner.calls == 2 and service.status(job_id)[0] == "done"
+    service.close()
+
+def test_broken_pool_is_rebuilt_and_job_resubmitted():
+    runner = CountingRunner()
+    broken = BrokenExecutor()
+    service = make_service(runner, executor=broken)
+    service._new_executor = lambda: ThreadPoolExecutor(2)
+
+    job_id, future, cached = service.submit("2330", now=AFTER_CLOSE)
+    assert not cached and future.result(5)["stock_id"] == "2330.TW"
+    assert broken.shut_down and service.stats["pool_restarts"] == 1
+    assert job_id not in service._inflight and service.status(job_id)[0] == "done"
+
+    # 重建後的行程池繼續使用，不會再重建
+    service.submit("0050", now=AFTER_CLOSE)[1].result(5)
+    assert service.stats["pool_restarts"] == 1
+    service.close()
+
+def test_failed_inflight_future_is_not_shared():
+    # 行程池損壞時，已送出的 Future 會帶著 BrokenProcessPool 結束；
+    # 收尾 callback 執行前同一個查詢進來，不能拿到那個失敗的 Future
+    service = make_service(CountingRunner())
+    job_id = service.job_key("2330.TW", bs.data_version(AFTER_CLOSE, SCHEDULER), bs.DEFAULT_PARAMS)
+    dead = bs.Future()
+    dead.set_exception(BrokenProcessPool("A child process terminated abruptly"))
+    service._inflight[job_id] = dead
+
+    same_id, future, _ = service.submit("2330", now=AFTER_CLOSE)
+    assert same_id == job_id and future is not dead
+    assert future.result(5)["stock_id"] == "2330.TW"
+    service._finish(job_id, dead)
+    assert service.status(job_id)[0] == "done"
+    service.close()
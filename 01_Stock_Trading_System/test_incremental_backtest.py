@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("yfinance")
+import incremental_backtest as ib
+
+COLUMNS = ['Close', 'MA20', 'MA60', 'Signal', 'Position', 'Strategy_Return', 'Equity', 'Peak', 'Drawdown']
+
+def closes(n=400, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.Series(500 * np.exp(np.cumsum(rng.normal(0, 0.02, n))), index=pd.bdate_range("2021-01-04", periods=n))
+
+def original_backtest(close, params=ib.DEFAULT_PARAMS):
+    """ 原本 backfast.run_backtest 的 pandas 計算 """
+    df = pd.DataFrame({'Close': close})
+    df['MA20'] = df['Close'].rolling(window=params["short_window"]).mean()
+    df['MA60'] = df['Close'].rolling(window=params["long_window"]).mean()
+    df['Signal'] = 0
+    df.loc[df['MA20'] > df['MA60'], 'Signal'] = 1
+    df['Position'] = df['Signal'].shift(1)
+    df['Strategy_Return'] = df['Close'].pct_change() * df['Position']
+    action_mask = df['Position'].diff().abs() > 0
+    df.loc[action_mask, 'Strategy_Return'] -= (params["fee_rate"] + params["tax_rate"] / 2)
+    df['Equity'] = params["initial_capital"] * (1 + df['Strategy_Return']).cumprod()
+    df['Peak'] = df['Equity'].cummax()
+    df['Drawdown'] = (df['Equity'] - df['Peak']) / df['Peak']
+    return df
+
+def test_matches_original_pandas_backtest():
+    close = closes()
+    frame, state = ib.advance(ib.new_state(ib.DEFAULT_PARAMS), close, ib.DEFAULT_PARAMS)
+    expected = original_backtest(close)
+    assert np.isnan(frame['Equity'].iloc[0])
+    pd.testing.assert_frame_equal(frame[COLUMNS], expected[COLUMNS], check_dtype=False, rtol=1e-12)
+    assert state["mdd"] == pytest.approx(expected['Drawdown'].min(), rel=1e-12)
+
+@pytest.mark.parametrize("cuts", [[1], [59, 60, 61], [5, 100, 101, 250]])
+def test_chunked_advance_matches_single_pass(cuts):
+    close = closes()
+    params = ib.DEFAULT_PARAMS
+    whole, whole_state = ib.advance(ib.new_state(params), close, params)
+    state, parts = ib.new_state(params), []
+    for a, b in zip([0] + cuts, cuts + [len(close)]):
+        frame, state = ib.advance(state, close.iloc[a:b], params)
+        parts.append(frame)
+    pd.testing.assert_frame_equal(pd.concat(parts), whole)
+    assert state == whole_state
+
+def test_update_backtest_resumes_and_detects_rewritten_history(tmp_path, monkeypatch):
+    full = closes()
+    source = {"close": full.iloc[:300]}
+    monkeypatch.setattr(ib, "_download_closes", lambda stock_id, start: source["close"][source["close"].index >= start])
+
+    ib.update_backtest("TEST", checkpoint_dir=tmp_path)
+    source["close"] = full
+    resumed = ib.update_backtest("TEST", checkpoint_dir=tmp_path)
+    pd.testing.assert_frame_equal(resumed[COLUMNS], original_backtest(full)[COLUMNS], check_dtype=False, rtol=1e-12)
+
+    # 除權息：整段還原股價被改寫，必須從頭重算
+    source["close"] = full * 0.95
+    rebuilt = ib.update_backtest("TEST", checkpoint_dir=tmp_path)
+    pd.testing.assert_frame_equal(rebuilt[COLUMNS], original_backtest(full * 0.95)[COLUMNS], check_dtype=False, rtol=1e-12)
@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("yfinance")
+import indicator_snapshot as snapshot
+
+def daily_closes(n=70, seed=0):
+    rng = np.random.default_rng(seed)
+    end = pd.Timestamp.now().normalize()
+    return pd.Series(100 + np.cumsum(rng.normal(0, 1, n)), index=pd.bdate_range(end=end, periods=n))
+
+class FakeYahoo:
+    """ 代替 _download：period 回傳最後 60 根，start 回傳該日起的 K 線 """
+    def __init__(self, closes):
+        self.closes = closes
+        self.calls = []
+
+    def __call__(self, stock_id, start=None, period=None):
+        self.calls.append("full" if period else "incremental")
+        return self.closes.iloc[-60:] if period else self.closes[self.closes.index >= pd.Timestamp(start)]
+
+def run(monkeypatch, tmp_path, closes):
+    fake = FakeYahoo(closes)
+    monkeypatch.setattr(snapshot, "_download", fake)
+    path = tmp_path / "snap.json"
+    data, snap = snapshot.get_snapshot_data("2330.TW", path)
+    snapshot.save_snapshot(snap, path)
+    return data, snap, fake
+
+def test_incremental_update_matches_full_recompute(monkeypatch, tmp_path):
+    closes = daily_closes()
+    run(monkeypatch, tmp_path, closes.iloc[:-3])
+    data, _, fake = run(monkeypatch, tmp_path, closes)
+    assert fake.calls == ["incremental"]
+    pd.testing.assert_series_equal(data, snapshot.indicators_from_window(closes.iloc[-20:]))
+
+def test_rewritten_adjusted_prices_trigger_rebuild(monkeypatch, tmp_path):
+    closes = daily_closes()
+    _, snap, _ = run(monkeypatch, tmp_path, closes.iloc[:-1])
+    snap["alert_state"] = ["多頭", "正常"]
+    snapshot.save_snapshot(snap, tmp_path / "snap.json")
+    # 除權息：整段還原股價乘上一個係數
+    adjusted = closes * 0.97
+    data, snap, fake = run(monkeypatch, tmp_path, adjusted)
+    assert fake.calls == ["incremental", "full"]
+    pd.testing.assert_series_equal(data, snapshot.indicators_from_window(adjusted.iloc[-20:]))
+    assert snap["alert_state"] == ["多頭", "正常"]
+
+def test_no_new_bars_keeps_window(monkeypatch, tmp_path):
+    closes = daily_closes()
+    first, _, _ = run(monkeypatch, tmp_path, closes)
+    again, _, fake = run(monkeypatch, tmp_path, closes)
+    assert fake.calls == ["incremental"]
+    pd.testing.assert_series_equal(first, again)
@@ -0,0 +1,50 @@
+import datetime
+import pandas as pd
+import pytest
+
+from market_schedule import (BASE_INTERVAL, FAST_INTERVAL, MAX_BACKOFF, POST_CLOSE_MINUTES, TAIPEI,
+                             MarketScheduler)
+
+# 2024-10-10 (週四) 國慶日休市
+HOLIDAY = datetime.date(2024, 10, 10)
+
+def at(day, hour, minute=0):
+    return datetime.datetime(2024, 10, day, hour, minute, tzinfo=TAIPEI)
+
+def bar(close, ma20=100.0, rsi=50.0, date="2024-10-08"):
+    return pd.Series({"Close": close, "MA20": ma20, "RSI": rsi}, name=pd.Timestamp(date))
+
+@pytest.fixture
+def scheduler():
+    return MarketScheduler(holidays=[HOLIDAY])
+
+def test_sleeps_until_next_session_over_holidays_and_weekends(scheduler):
+    assert scheduler.next_open(at(9, 14)) == at(11, 9)          # 週三收盤後 → 週五 (跳過國慶日)
+    assert scheduler.next_open(at(12, 10)) == at(14, 9)         # 週六 → 週一
+    assert scheduler.next_open(at(8, 8)) == at(8, 9)            # 當天開盤前
+    assert scheduler.next_delay(at(10, 11)) == (at(11, 9) - at(10, 11)).total_seconds()
+    assert not scheduler.is_open(at(10, 11)) and scheduler.is_open(at(11, 11))
+
+def test_naive_times_are_taipei(scheduler):
+    assert scheduler.is_open(datetime.datetime(2024, 10, 8, 9, 30))
+    assert scheduler.is_open(datetime.datetime(2024, 10, 8, 1, 30, tzinfo=datetime.timezone.utc))
+
+def test_one_extra_poll_after_close(scheduler):
+    assert scheduler.next_delay(at(8, 13, 35)) == (POST_CLOSE_MINUTES - 5) * 60
+    assert scheduler.next_delay(at(8, 13, 30 + POST_CLOSE_MINUTES)) == (at(9, 9) - at(8, 13, 50)).total_seconds()
+
+def test_fast_polling_near_open_close_and_triggers(scheduler):
+    assert scheduler.next_delay(at(8, 9, 5), bar(100.0)) == FAST_INTERVAL
+    assert scheduler.next_delay(at(8, 13, 10), bar(101.0)) == FAST_INTERVAL
+    assert scheduler.next_delay(at(8, 11), bar(100.2)) == FAST_INTERVAL                # 接近 MA20
+    assert scheduler.next_delay(at(8, 11), bar(110.0, rsi=68.5)) == FAST_INTERVAL     # 接近 RSI 70
+
+def test_backoff_when_data_does_not_change(scheduler):
+    data = bar(110.0)
+    delays = [scheduler.next_delay(at(8, 10), data) for _ in range(MAX_BACKOFF + 3)]
+    until_dense = (at(8, 13) - at(8, 10)).total_seconds()
+    expected = [min(BASE_INTERVAL * 2 ** min(k, MAX_BACKOFF), until_dense) for k in range(MAX_BACKOFF + 3)]
+    assert delays == expected and delays[1] == 2 * BASE_INTERVAL
+    assert scheduler.next_delay(at(8, 10), bar(111.0)) == BASE_INTERVAL
+    # 不會睡過收盤前的密集輪詢時段
+    assert scheduler.next_delay(at(8, 12, 50), data) == 10 * 60
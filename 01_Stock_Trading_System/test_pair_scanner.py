@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("yfinance")
+import pair_scanner as ps
+
+def returns_matrix(n_stocks=10, n_days=300, seed=0, missing=0.05):
+    rng = np.random.default_rng(seed)
+    common = rng.normal(0, 0.01, n_days)
+    returns = common * rng.random((n_stocks, 1)) + rng.normal(0, 0.01, (n_stocks, n_days))
+    returns[rng.random(returns.shape) < missing] = np.nan
+    returns[0, :120] = np.nan                      # 較晚上市
+    return returns
+
+def pandas_rolling_pairs(returns, window, step, min_periods, min_windows):
+    """ 每個視窗直接用 DataFrame.corr (兩兩都有值的日子) 算相關，再取平均 (對照用) """
+    ends = ps.window_ends(returns.shape[1], window, step)
+    corrs = np.stack([pd.DataFrame(returns[:, end - window:end].T).corr(min_periods=min_periods).to_numpy()
+                      for end in ends])
+    ok = ~np.isnan(corrs)
+    with np.errstate(invalid="ignore"):
+        mean = np.where(ok, corrs, 0).sum(axis=0) / ok.sum(axis=0)
+    rows = []
+    for i in range(returns.shape[0]):
+        for j in range(i + 1, returns.shape[0]):
+            if ok[:, i, j].sum() >= min_windows:
+                rows.append((i, j, mean[i, j], corrs[-1, i, j], ok[:, i, j].sum()))
+    return pd.DataFrame(rows, columns=["i", "j", "mean_corr", "last_corr", "windows"])
+
+@pytest.mark.parametrize("block,workers", [(256, 1), (3, 1), (4, 2)])
+@pytest.mark.parametrize("step", [1, 5, 60])
+def test_matches_pandas_pairwise_corr(block, workers, step):
+    returns = returns_matrix()
+    got = ps.rolling_corr_top_pairs(returns, window=60, step=step, top_k=1000, block=block, workers=workers,
+                                    min_periods=40, min_windows=1)
+    expected = pandas_rolling_pairs(returns, 60, step, 40, 1)
+    got = got.sort_values(["i", "j"]).reset_index(drop=True)
+    assert got[["i", "j"]].astype(int).values.tolist() == expected[["i", "j"]].values.tolist()
+    np.testing.assert_allclose(got["mean_corr"].astype(float), expected["mean_corr"], atol=1e-9)
+    np.testing.assert_allclose(got["last_corr"].astype(float), expected["last_corr"], atol=1e-9)
+    np.testing.assert_array_equal(got["windows"].astype(int), expected["windows"])
+
+def test_top_k_is_sorted_by_mean_corr():
+    returns = returns_matrix(seed=1, missing=0)
+    top = ps.rolling_corr_top_pairs(returns, window=60, step=5, top_k=5, block=4, workers=1)
+    assert len(top) == 5 and top["mean_corr"].is_monotonic_decreasing
+    full = ps.rolling_corr_top_pairs(returns, window=60, step=5, top_k=1000, block=4, workers=1)
+    pd.testing.assert_frame_equal(top, full.head(5))
+
+def test_spread_adf_detects_mean_reverting_spread():
+    rng = np.random.default_rng(2)
+    log_y = np.cumsum(rng.normal(0, 0.01, 1000))
+    spread = np.zeros(1000)
+    for t in range(1, 1000):
+        spread[t] = 0.8 * spread[t - 1] + rng.normal(0, 0.005)
+    beta, t_stat, half_life = ps.spread_adf(1.5 * log_y + spread, log_y)
+    assert beta == pytest.approx(1.5, abs=0.05)
+    assert t_stat < ps.ADF_CRITICAL and 1 < half_life < 10
+    _, t_walk, _ = ps.spread_adf(np.cumsum(rng.normal(0, 0.01, 1000)), log_y)
+    assert t_walk > ps.ADF_CRITICAL
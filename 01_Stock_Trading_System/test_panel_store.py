@@ -0,0 +1,46 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("yfinance")
+from panel_store import FIELDS, PanelStore, write_store
+
+TICKERS = ["2330.TW", "2317.TW", "2454.TW"]
+DATES = pd.bdate_range("2024-01-01", periods=50)
+
+def values(seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.random((len(FIELDS), len(TICKERS), len(DATES))).astype(np.float32) * 100
+
+def test_round_trip_and_views(tmp_path):
+    data = values()
+    write_store(data, TICKERS, DATES, path=tmp_path)
+    store = PanelStore(tmp_path)
+    assert store.tickers == TICKERS and store.dates.equals(DATES)
+
+    close = store.field("Close", "2024-01-10", "2024-01-31")
+    sl = store.date_range("2024-01-10", "2024-01-31")
+    np.testing.assert_array_equal(close, data[FIELDS.index("Close"), :, sl])
+    assert np.shares_memory(close, store.values)                    # memmap 的 view，沒有複製
+    np.testing.assert_array_equal(store.ticker("2317.TW", fields="Volume"), data[4, 1])
+    np.testing.assert_array_equal(store.ticker("2454.TW", fields=["Close", "Open"]), data[[3, 0], 2])
+
+    frame = store.frame("2330.TW", end="2024-01-05")
+    assert list(frame.columns) == list(FIELDS) and len(frame) == 5
+    np.testing.assert_array_equal(frame.to_numpy(), data[:, 0, :5].T.astype(np.float64))
+
+def test_rewrite_switches_generation_and_keeps_previous(tmp_path):
+    write_store(values(0), TICKERS, DATES, path=tmp_path)
+    old = PanelStore(tmp_path)
+    write_store(values(1), TICKERS, DATES, path=tmp_path)
+    write_store(values(2), TICKERS, DATES, path=tmp_path)
+    new = PanelStore(tmp_path)
+    assert new.generation == 3
+    np.testing.assert_array_equal(new.values, values(2))
+    assert sorted(f for f in os.listdir(tmp_path) if f.endswith(".f32")) == ["panel.2.f32", "panel.3.f32"]
+    assert old.generation == 1
+
+def test_shape_mismatch_is_rejected(tmp_path):
+    with pytest.raises(ValueError, match="形狀"):
+        write_store(values()[:, :2], TICKERS, DATES, path=tmp_path)
@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("yfinance")
+pytest.importorskip("requests")
+from replay_harness import ReplayFeed, VirtualClock, load_bars, replay_monitor
+
+def raw_bars(n=120, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, n)))
+    index = pd.date_range("2024-01-01", periods=n, tz="Asia/Taipei", name="Date")
+    return pd.DataFrame({"Open": close, "High": close * 1.01, "Low": close * 0.99, "Close": close,
+                         "Volume": rng.integers(1_000, 5_000, n)}, index=index)
+
+def test_virtual_clock_only_moves_forward():
+    clock = VirtualClock("2024-01-01 09:00", speed=0)
+    clock.sleep(90)
+    assert clock.now() == pd.Timestamp("2024-01-01 09:01:30") and clock.slept == 90
+    clock.advance_to("2024-01-01 08:00")                  # 不會倒退
+    assert clock.now() == pd.Timestamp("2024-01-01 09:01:30")
+    clock.advance_to("2024-01-02")
+    assert clock.now() == pd.Timestamp("2024-01-02")
+
+def test_load_bars_and_feed(tmp_path):
+    path = tmp_path / "bars.csv"
+    raw_bars().to_csv(path)
+    bars = load_bars(path)
+    assert bars.index.tz is None and len(bars) == 120 - 19
+    assert not bars[["MA20", "RSI"]].isna().any().any()
+
+    clock = VirtualClock(bars.index[0])
+    feed = ReplayFeed(bars.iloc[:3], clock)
+    rows = [feed("X") for _ in range(4)]
+    assert [r.name for r in rows[:3]] == list(bars.index[:3]) and rows[3] is None
+    assert clock.now() == bars.index[2]
+
+def test_replay_monitor_sends_only_state_changes(tmp_path):
+    path = tmp_path / "bars.csv"
+    raw_bars().to_csv(path)
+    bars = load_bars(path)
+    result = replay_monitor(bars)
+    trend = bars["Close"] > bars["MA20"]
+    rsi = np.where(bars["RSI"] > 70, 1, np.where(bars["RSI"] < 30, -1, 0))
+    states = list(zip(trend, rsi))
+    changes = 1 + sum(a != b for a, b in zip(states, states[1:]))
+    assert result["bars"] == len(bars)
+    assert 1 <= result["alerts"] <= changes
+    assert result["alerts"] == result["webhook_messages"] == result["sent"]
+    assert result["failed"] == 0 and result["p50_ms"] <= result["p99_ms"]
@@ -0,0 +1,53 @@
+import datetime
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("yfinance")
+pytest.importorskip("matplotlib")
+import screener
+from backfast import calculate_prediction
+from market_schedule import TAIPEI, MarketScheduler
+
+def price_panel(n_stocks=12, n_days=200, seed=0):
+    rng = np.random.default_rng(seed)
+    drift = rng.normal(0, 0.003, (n_stocks, 1))
+    prices = 100 * np.exp(np.cumsum(drift + rng.normal(0, 0.015, (n_stocks, n_days)), axis=1))
+    prices[3, :40] = np.nan                      # 較晚上市
+    tickers = [f"{1000 + k}.TW" for k in range(n_stocks)]
+    return prices.astype(np.float32), tickers, pd.bdate_range("2024-01-01", periods=n_days)
+
+def test_rolling_mean_matches_pandas():
+    prices, _, _ = price_panel()
+    prices[5, 100] = np.nan                      # 停牌一天
+    expected = pd.DataFrame(prices.T.astype(np.float64)).rolling(20).mean().to_numpy().T
+    np.testing.assert_allclose(screener.rolling_mean(prices, 20), expected, rtol=1e-5)
+
+@pytest.mark.parametrize("seed", range(3))
+def test_latest_screen_matches_per_stock_prediction(seed):
+    prices, tickers, dates = price_panel(seed=seed)
+    result = screener.screen_latest(prices, tickers, dates)
+    for k, ticker in enumerate(tickers):
+        df = pd.DataFrame({"Close": prices[k].astype(np.float64)}, index=dates)
+        df["MA20"] = df["Close"].rolling(20).mean()
+        df["MA60"] = df["Close"].rolling(60).mean()
+        delta = df["Close"].diff()
+        rsi = 100 - 100 / (1 + delta.where(delta > 0, 0).rolling(14).mean() / (-delta.where(delta < 0, 0)).rolling(14).mean())
+        trend, advice, _ = calculate_prediction(df)
+        row = result.loc[ticker]
+        assert (row["趨勢"], row["建議"]) == (trend, advice), ticker
+        assert row["RSI"] == pytest.approx(rsi.iloc[-1], rel=1e-3)
+
+def test_panel_labels_cover_every_day():
+    prices, tickers, dates = price_panel()
+    labels = screener.screen_panel(prices, tickers, dates)
+    assert labels.shape == (len(dates), len(tickers))
+    assert labels.iloc[-1].tolist() == screener.screen_latest(prices, tickers, dates)["趨勢"].tolist()
+
+def test_cache_is_fresh_only_after_final_bar():
+    scheduler = MarketScheduler(holidays=[])
+    final = datetime.datetime(2024, 10, 8, 13, 50, tzinfo=TAIPEI)
+    assert screener.cache_is_fresh(final, final + datetime.timedelta(hours=10), scheduler)
+    assert not screener.cache_is_fresh(final - datetime.timedelta(minutes=1), final + datetime.timedelta(hours=10), scheduler)
+    # 盤中價格一直在變，快取一律過期
+    assert not screener.cache_is_fresh(final, datetime.datetime(2024, 10, 9, 10, 0, tzinfo=TAIPEI), scheduler)
@@ -2,6 +2,7 @@ import yfinance as yf
 import pandas as pd
 import matplotlib.pyplot as plt
 import matplotlib.font_manager as fm
+from streaming_stats import summarize_csv_files
 
 # 設置中文字體（如果可用）
 try:
@@ -64,6 +65,22 @@ def show_statistics(data):
     print(f"價格波動性 (標準差): ${data['Close'].std():.2f}")
     print(f"總成交量: {data['Volume'].sum():,.0f}")
 
+# 多年 tick 資料等放不進記憶體的 CSV：分檔、分區塊、多行程單次掃描 (分位數與直方圖為近似)
+def show_csv_statistics(paths, chunksize=1_000_000, workers=4, **read_kwargs):
+    stats = summarize_csv_files(paths, ['Close', 'High', 'Low', 'Volume'], chunksize, workers, **read_kwargs)
+    print("=== 黃金價格統計摘要 (CSV) ===")
+    if stats['Close'].count == 0:
+        print("⚠️ CSV 檔案中沒有任何收盤價資料")
+        return stats
+    print(f"資料筆數: {stats['Close'].count}")
+    print(f"平均收盤價: ${stats['Close'].mean:.2f}")
+    print(f"最高價: ${stats['High'].max:.2f} (檔案: {stats['High'].argmax[0]}, 位置: {stats['High'].argmax[1]})")
+    print(f"最低價: ${stats['Low'].min:.2f} (檔案: {stats['Low'].argmin[0]}, 位置: {stats['Low'].argmin[1]})")
+    print(f"價格波動性 (標準差): ${stats['Close'].std:.2f}")
+    print(f"總成交量: {stats['Volume'].sum:,.0f}")
+    print(stats['Close'].describe())
+    return stats
+
 if __name__ == "__main__":
     data = get_gold_data_2024_2025()
     show_statistics(data)
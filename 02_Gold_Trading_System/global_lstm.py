@@ -0,0 +1,181 @@
+import json
+import yfinance as yf
+import pandas as pd
+import numpy as np
+import tensorflow as tf
+from tensorflow.keras import layers, Model
+from lstm_predictor import evaluate_model
+import warnings
+warnings.filterwarnings('ignore')
+
+# 全域多資產 LSTM：一個模型同時學 GC=F、HG=F、GLD… (以資產 embedding 區分)，
+# 所有資產的視窗放在同一個 tf.data 串流裡隨機混合取 batch，一次訓練取代逐一資產訓練。
+ASSETS = ["GC=F", "HG=F", "SI=F", "PL=F", "GLD"]
+FEATURES = ["ret", "range", "body", "vol_chg", "ma_gap", "rsi", "volatility"]
+SEQ_LENGTH = 60          # 與 lstm_predictor 相同：過去 60 天預測下一天
+TRAIN_RATIO = 0.8
+BATCH_SIZE = 256
+EMBED_DIM = 4
+MODEL_PATH = "global_lstm.keras"
+SCALER_PATH = "global_lstm_scalers.json"
+
+# 下載多個資產的 OHLCV
+def get_assets_data(tickers=ASSETS, start_date='2020-01-01', end_date='2025-12-31'):
+    data = {}
+    for ticker in tickers:
+        df = yf.Ticker(ticker).history(start=start_date, end=end_date)
+        if len(df) > SEQ_LENGTH * 2:
+            data[ticker] = df[['Open', 'High', 'Low', 'Close', 'Volume']]
+        else:
+            print(f"⚠️ {ticker} 資料不足，略過")
+    return data
+
+# 由 OHLCV 計算特徵；目標為下一天的對數報酬 (不同價位的資產可共用同一個模型)
+def make_features(df):
+    close = df['Close']
+    delta = close.diff()
+    gain = delta.where(delta > 0, 0).rolling(window=14).mean()
+    loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
+    feat = pd.DataFrame({
+        'ret': np.log(close).diff(),
+        'range': np.log(df['High'] / df['Low']),
+        'body': np.log(close / df['Open']),
+        'vol_chg': np.log1p(df['Volume']).diff(),
+        'ma_gap': close / close.rolling(window=20).mean() - 1,
+        'rsi': (100 - (100 / (1 + gain / loss))) / 100,
+        'volatility': np.log(close).diff().rolling(window=20).std(),
+    }, index=df.index)
+    feat['target'] = feat['ret'].shift(-1)
+    return feat.replace([np.inf, -np.inf], np.nan).dropna(subset=FEATURES)
+
+# 每個資產各自標準化 (只用訓練期間的平均與標準差，避免資料洩漏)
+def fit_scalers(features):
+    scalers = {}
+    for ticker, feat in features.items():
+        train = feat.iloc[:int(len(feat) * TRAIN_RATIO)]
+        cols = FEATURES + ['target']
+        scalers[ticker] = {
+            'mean': train[cols].mean().fillna(0).tolist(),
+            'std': train[cols].std().replace(0, 1).fillna(1).tolist(),
+        }
+    return scalers
+
+def _scale(feat, scaler):
+    cols = FEATURES + ['target']
+    return ((feat[cols] - scaler['mean']) / scaler['std']).to_numpy(np.float32)
+
+# 把所有資產接成一個大陣列，記錄每個視窗的起點 (視窗不跨資產)
+def build_panel(features, scalers, tickers):
+    blocks, asset_ids, train_starts, test_starts = [], [], [], []
+    offset = 0
+    for asset_id, ticker in enumerate(tickers):
+        block = _scale(features[ticker], scalers[ticker])
+        n = len(block)
+        # 視窗 [s, s+SEQ_LENGTH) 預測最後一天的 target (下一天報酬)，最後一天沒有 target
+        starts = np.arange(n - SEQ_LENGTH) + offset
+        split = int(len(starts) * TRAIN_RATIO)
+        train_starts.append(starts[:split])
+        test_starts.append(starts[split:])
+        blocks.append(block)
+        asset_ids.append(np.full(n, asset_id, dtype=np.int32))
+        offset += n
+    return (np.concatenate(blocks), np.concatenate(asset_ids),
+            np.concatenate(train_starts), np.concatenate(test_starts))
+
+# 單一串流資料集：每個 batch 從所有資產的視窗中隨機抽樣，視窗在 map 裡才切出來 (不預先展開成 n × 60 × F)
+def make_dataset(panel, asset_ids, starts, batch_size=BATCH_SIZE, shuffle=True, seed=42):
+    n_feat = len(FEATURES)
+    values = tf.constant(panel[:, :n_feat])
+    targets = tf.constant(panel[:, n_feat])
+    ids = tf.constant(asset_ids)
+    offsets = tf.range(SEQ_LENGTH, dtype=tf.int64)
+
+    def gather(s):
+        window = s[:, None] + offsets[None, :]
+        last = s + SEQ_LENGTH - 1
+        return ({'sequence': tf.gather(values, window), 'asset': tf.gather(ids, last)},
+                tf.gather(targets, last))
+
+    ds = tf.data.Dataset.from_tensor_slices(starts.astype(np.int64))
+    if shuffle:
+        ds = ds.shuffle(len(starts), seed=seed, reshuffle_each_iteration=True)
+    return ds.batch(batch_size).map(gather, num_parallel_calls=tf.data.AUTOTUNE).prefetch(tf.data.AUTOTUNE)
+
+# 構建全域 LSTM：序列特徵 + 資產 embedding (每個時間點都接上)
+def build_global_model(n_assets, seq_length=SEQ_LENGTH, n_features=len(FEATURES)):
+    sequence = layers.Input(shape=(seq_length, n_features), name='sequence')
+    asset = layers.Input(shape=(), dtype='int32', name='asset')
+    embed = layers.Embedding(n_assets, EMBED_DIM)(asset)
+    x = layers.Concatenate()([sequence, layers.RepeatVector(seq_length)(embed)])
+    x = layers.LSTM(100, return_sequences=True)(x)
+    x = layers.Dropout(0.2)(x)
+    x = layers.LSTM(100, return_sequences=False)(x)
+    x = layers.Dropout(0.2)(x)
+    x = layers.Dense(50)(x)
+    output = layers.Dense(1)(x)
+    model = Model([sequence, asset], output)
+    model.compile(optimizer='adam', loss='mean_squared_error')
+    return model
+
+# 訓練：一次訓練涵蓋所有資產
+def train_global_model(data, epochs=50, batch_size=BATCH_SIZE):
+    tickers = list(data)
+    features = {t: make_features(df) for t, df in data.items()}
+    scalers = fit_scalers(features)
+    panel, asset_ids, train_starts, test_starts = build_panel(features, scalers, tickers)
+
+    model = build_global_model(len(tickers))
+    history = model.fit(make_dataset(panel, asset_ids, train_starts, batch_size),
+                        validation_data=make_dataset(panel, asset_ids, test_starts, batch_size, shuffle=False),
+                        epochs=epochs, verbose=1)
+    return model, history, {'tickers': tickers, 'scalers': scalers}
+
+def save_global_model(model, meta, model_path=MODEL_PATH, scaler_path=SCALER_PATH):
+    model.save(model_path)
+    with open(scaler_path, 'w') as f:
+        json.dump(meta, f)
+
+def load_global_model(model_path=MODEL_PATH, scaler_path=SCALER_PATH):
+    with open(scaler_path) as f:
+        meta = json.load(f)
+    return tf.keras.models.load_model(model_path), meta
+
+# 單一資產推論：回傳每個視窗預測的下一天收盤價 (與實際收盤價對齊的 Series)
+def predict_asset(model, meta, ticker, df):
+    asset_id = meta['tickers'].index(ticker)
+    scaler = meta['scalers'][ticker]
+    feat = make_features(df)
+    block = _scale(feat, scaler)[:, :len(FEATURES)]
+    windows = np.lib.stride_tricks.sliding_window_view(block, SEQ_LENGTH, axis=0).transpose(0, 2, 1)
+    pred = model.predict({'sequence': windows, 'asset': np.full(len(windows), asset_id, dtype=np.int32)},
+                         batch_size=BATCH_SIZE, verbose=0).ravel()
+    ret = pred * scaler['std'][-1] + scaler['mean'][-1]
+    last_close = df['Close'].reindex(feat.index).to_numpy()[SEQ_LENGTH - 1:]
+    # 第 i 個視窗結束在 feat 第 i+SEQ_LENGTH-1 天，預測的是下一個交易日
+    dates = feat.index[SEQ_LENGTH - 1:]
+    return pd.Series(last_close * np.exp(ret), index=dates, name=f'{ticker}_pred_next_close')
+
+# 各資產測試期間的誤差 (與 lstm_predictor 相同的 MSE / MAE / RMSE)
+def evaluate_assets(model, meta, data):
+    rows = {}
+    for ticker in meta['tickers']:
+        pred = predict_asset(model, meta, ticker, data[ticker])
+        actual = data[ticker]['Close'].shift(-1).reindex(pred.index)
+        valid = actual.notna()
+        split = int(valid.sum() * TRAIN_RATIO)
+        y_true, y_pred = actual[valid].iloc[split:], pred[valid].iloc[split:]
+        mse, mae, rmse = evaluate_model(y_true, y_pred)
+        rows[ticker] = {'MSE': mse, 'MAE': mae, 'RMSE': rmse, 'Next_Close': pred.iloc[-1]}
+    return pd.DataFrame(rows).T
+
+# 主函數
+if __name__ == "__main__":
+    data = get_assets_data()
+    print(f"資產: {', '.join(data)}")
+
+    model, history, meta = train_global_model(data, epochs=50)
+    save_global_model(model, meta)
+
+    report = evaluate_assets(model, meta, data)
+    print(report.round(2).to_string())
+    print(f"模型已保存為 {MODEL_PATH}，標準化參數保存為 {SCALER_PATH}")
@@ -0,0 +1,135 @@
+import os
+import json
+import pickle
+import hashlib
+from collections import OrderedDict
+import pandas as pd
+
+# 指標快取：以「輸入序列內容 + 指標名稱 + 參數」的雜湊為 key
+# 第一層：記憶體 LRU (同一個程式內重複計算，例如參數掃描)
+# 第二層：硬碟 (indicator_cache/)，超過容量上限時刪除最久沒用到的檔案
+CACHE_DIR = "indicator_cache"
+MEMORY_ITEMS = 256
+DISK_BYTES = 256 * 1024 * 1024
+EVICT_TO = 0.9          # 超過上限時刪到上限的 90%，之後不必每次寫入都重新掃描目錄
+CACHE_VERSION = 1
+
+
+def series_key(name, series, params):
+    """ 序列的值、索引與 dtype 任何一個改變，key 都會不同 """
+    h = hashlib.sha1()
+    h.update(f"{CACHE_VERSION}|{name}|{json.dumps(params, sort_keys=True, default=str)}".encode())
+    h.update(str(getattr(series, "dtypes", "")).encode())
+    h.update(pd.util.hash_pandas_object(series, index=True).to_numpy().tobytes())
+    return h.hexdigest()
+
+
+class IndicatorCache:
+    def __init__(self, cache_dir=CACHE_DIR, memory_items=MEMORY_ITEMS, disk_bytes=DISK_BYTES):
+        self.cache_dir = cache_dir
+        self.memory_items = memory_items
+        self.disk_bytes = disk_bytes
+        self._memory = OrderedDict()
+        self._disk_total = None   # 硬碟層目前的總大小 (估計值)；None 表示還沒掃描過目錄
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evicted": 0}
+
+    def get_or_compute(self, name, series, func, **params):
+        """ 回傳 func(series, **params)；算過的結果直接從快取取出 (回傳複本，呼叫端修改不影響快取) """
+        key = series_key(name, series, params)
+
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            self.stats["memory_hits"] += 1
+            return self._memory[key].copy()
+
+        value = self._load(key)
+        if value is not None:
+            self.stats["disk_hits"] += 1
+        else:
+            self.stats["misses"] += 1
+            value = func(series, **params)
+            self._save(key, value)
+
+        self._remember(key, value)
+        return value.copy()
+
+    def clear(self, disk=False):
+        self._memory.clear()
+        if disk and os.path.isdir(self.cache_dir):
+            for fname in os.listdir(self.cache_dir):
+                if fname.endswith(".pkl"):
+                    os.remove(os.path.join(self.cache_dir, fname))
+            self._disk_total = None
+
+    # --- 記憶體層 ---
+    def _remember(self, key, value):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    # --- 硬碟層 ---
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.pkl")
+
+    def _load(self, key):
+        if not self.disk_bytes:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                value = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+        os.utime(path)   # 更新使用時間，淘汰時以此排序
+        return value
+
+    def _save(self, key, value):
+        if not self.disk_bytes:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._path(key)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            size = f.tell()
+        os.replace(tmp, path)
+        # 總大小記在記憶體，超過上限 (或第一次寫入) 時才掃描整個目錄
+        if self._disk_total is not None:
+            self._disk_total += size
+        if self._disk_total is None or self._disk_total > self.disk_bytes:
+            self._evict()
+
+    def _evict(self):
+        """ 掃描目錄取得實際總大小 (含其他行程寫入的檔案)，超過上限時刪除最久沒用到的檔案到 EVICT_TO """
+        entries = []
+        for fname in os.listdir(self.cache_dir):
+            if not fname.endswith(".pkl"):
+                continue
+            try:
+                st = os.stat(os.path.join(self.cache_dir, fname))
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, fname))
+
+        total = sum(size for _, size, _ in entries)
+        target = self.disk_bytes * EVICT_TO if total > self.disk_bytes else self.disk_bytes
+        for _, size, fname in sorted(entries):
+            if total <= target:
+                break
+            try:
+                os.remove(os.path.join(self.cache_dir, fname))
+            except OSError:
+                continue
+            total -= size
+            self.stats["evicted"] += 1
+        self._disk_total = total
+
+
+# 各腳本共用的預設快取
+CACHE = IndicatorCache()
+
+
+def cached(name, series, func, **params):
+    """ 以預設快取計算指標，例如 cached("ta.RSI", data['Close'], ta.RSI, timeperiod=14) """
+    return CACHE.get_or_compute(name, series, func, **params)
@@ -2,6 +2,7 @@ import yfinance as yf
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
+from indicator_cache import cached
 
 # 設置中文字體（如果可用）
 try:
@@ -21,19 +22,24 @@ def get_gold_data(start_date='2024-01-01', end_date='2025-12-31'):
     return data
 
 # 計算 RSI
-def calculate_rsi(data, window=14):
-    delta = data['Close'].diff()
+def rsi_sma(close, window=14):
+    delta = close.diff()
     gain = (delta.where(delta > 0, 0)).rolling(window=window).mean()
     loss = (-delta.where(delta < 0, 0)).rolling(window=window).mean()
     rs = gain / loss
-    rsi = 100 - (100 / (1 + rs))
-    data['RSI'] = rsi
+    return 100 - (100 / (1 + rs))
+
+def calculate_rsi(data, window=14):
+    data['RSI'] = cached("rsi_sma", data['Close'], rsi_sma, window=window)
     return data
 
 # 計算移動平均線
+def sma(close, window):
+    return close.rolling(window=window).mean()
+
 def calculate_moving_averages(data, short_window=50, long_window=200):
-    data['Short_MA'] = data['Close'].rolling(window=short_window).mean()
-    data['Long_MA'] = data['Close'].rolling(window=long_window).mean()
+    data['Short_MA'] = cached("sma", data['Close'], sma, window=short_window)
+    data['Long_MA'] = cached("sma", data['Close'], sma, window=long_window)
     return data
 
 # 生成交易信號
@@ -49,6 +55,47 @@ def generate_signals(data):
 
 # 模擬交易決策
 def simulate_trading(data, initial_capital=10000):
+    """
+    訊號為 1 且空手時全部資金買入，訊號為 -1 且持倉時全部賣出。
+    只做多、買賣都看訊號，持倉狀態就是「最近一個買賣訊號是不是買」：
+    先向量化找出每筆買賣，再依序計算資本，結果與逐根迴圈 (_simulate_trading_loop) 相同。
+    """
+    close = data['Close'].to_numpy(dtype=np.float64)
+    signal = data['Signal'].to_numpy()
+    last = pd.Series(np.where(signal == 1, 1.0, np.where(signal == -1, -1.0, np.nan))).ffill().to_numpy()
+    holding = last == 1
+    was_holding = np.r_[False, holding[:-1]]
+    buys = np.flatnonzero(holding & ~was_holding)
+    sells = np.flatnonzero(~holding & was_holding)
+
+    n = len(data)
+    capital_col = np.zeros(n)
+    position_col = np.zeros(n)
+    capital = float(initial_capital)
+    position = 0.0
+    flat_from = 0
+    for k, buy in enumerate(buys):
+        capital_col[flat_from:buy] = capital
+        position = capital / close[buy]
+        if not position > 0:            # 資金為 0 或價格異常時迴圈不會視為持倉，改用逐根迴圈
+            return _simulate_trading_loop(data, initial_capital)
+        capital = 0.0
+        sell = sells[k] if k < len(sells) else n
+        position_col[buy:sell] = position
+        if sell == n:
+            flat_from = n
+            break
+        capital = position * close[sell]
+        position = 0.0
+        flat_from = sell
+    capital_col[flat_from:] = capital
+
+    data['Capital'] = capital_col
+    data['Position'] = position_col
+    final_value = capital + position * close[-1]
+    return final_value, data
+
+def _simulate_trading_loop(data, initial_capital=10000):
     capital = float(initial_capital)
     position = 0.0  # 持有黃金盎司數
     data['Capital'] = float(initial_capital)
@@ -0,0 +1,367 @@
+import re
+import numpy as np
+import pandas as pd
+
+# Pine Script v5 子集直譯器
+# 支援：input.int / input.float / input.bool、ta.ema / ta.rsi / ta.valuewhen、
+# 歷史索引 x[n]、四則運算、比較、and / or / not、三元運算 ?:
+# 每個運算式編譯成一個對整段陣列運算的函式，不逐根 K 線執行。
+
+# 畫圖 / 輸出類的敘述不影響訊號，直接略過
+IGNORED_CALLS = {"indicator", "strategy", "plot", "plotshape", "plotchar", "hline", "bgcolor",
+                 "barcolor", "fill", "alertcondition", "label.new"}
+
+TOKEN_RE = re.compile(r"""
+    (?P<number>\d+\.\d*|\.\d+|\d+)
+  | (?P<string>"[^"]*"|'[^']*')
+  | (?P<name>[A-Za-z_][A-Za-z_0-9]*(?:\.[A-Za-z_][A-Za-z_0-9]*)*)
+  | (?P<op>==|!=|>=|<=|:=|[-+*/%<>=?:()\[\],])
+  | (?P<space>\s+)
+""", re.VERBOSE)
+
+BINARY_PRECEDENCE = {
+    "or": 1, "and": 2,
+    "==": 3, "!=": 3,
+    ">": 4, "<": 4, ">=": 4, "<=": 4,
+    "+": 5, "-": 5,
+    "*": 6, "/": 6, "%": 6,
+}
+
+# 內建價格序列 (yfinance 欄位為大寫、ccxt 為小寫，兩者皆可)
+SOURCES = ("open", "high", "low", "close", "volume")
+
+
+def tokenize(line):
+    tokens = []
+    pos = 0
+    while pos < len(line):
+        m = TOKEN_RE.match(line, pos)
+        if not m:
+            raise ValueError(f"無法解析的字元: {line[pos:]!r}")
+        pos = m.end()
+        kind = m.lastgroup
+        if kind == "space":
+            continue
+        value = m.group()
+        if kind == "name" and value in ("and", "or", "not", "true", "false", "na"):
+            kind = "op" if value in ("and", "or", "not") else "const"
+        tokens.append((kind, value))
+    return tokens
+
+
+# =====================
+# 語法分析：產生 AST (tuple)
+# =====================
+class Parser:
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.pos = 0
+
+    def peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else (None, None)
+
+    def take(self, value=None):
+        tok = self.peek()
+        if value is not None and tok[1] != value:
+            raise ValueError(f"預期 {value!r}，得到 {tok[1]!r}")
+        self.pos += 1
+        return tok
+
+    def parse(self):
+        node = self.expression()
+        if self.pos != len(self.tokens):
+            raise ValueError(f"多餘的符號: {self.peek()[1]!r}")
+        return node
+
+    def expression(self):
+        cond = self.binary(1)
+        if self.peek()[1] == "?":
+            self.take("?")
+            a = self.expression()
+            self.take(":")
+            b = self.expression()
+            return ("ternary", cond, a, b)
+        return cond
+
+    def binary(self, min_prec):
+        left = self.unary()
+        while True:
+            kind, op = self.peek()
+            prec = BINARY_PRECEDENCE.get(op) if kind == "op" else None
+            if prec is None or prec < min_prec:
+                return left
+            self.take()
+            right = self.binary(prec + 1)
+            left = ("binop", op, left, right)
+
+    def unary(self):
+        kind, value = self.peek()
+        if value in ("not", "-", "+"):
+            self.take()
+            return ("unary", value, self.unary())
+        return self.postfix()
+
+    def postfix(self):
+        node = self.primary()
+        while self.peek()[1] == "[":
+            self.take("[")
+            offset = self.expression()
+            self.take("]")
+            node = ("history", node, offset)
+        return node
+
+    def primary(self):
+        kind, value = self.take()
+        if kind == "number":
+            return ("const", float(value))
+        if kind == "string":
+            return ("const", value[1:-1])
+        if kind == "const":
+            return ("const", {"true": True, "false": False, "na": np.nan}[value])
+        if value == "(":
+            node = self.expression()
+            self.take(")")
+            return node
+        if kind == "name":
+            if self.peek()[1] == "(":
+                return self.call(value)
+            return ("var", value)
+        raise ValueError(f"無法解析: {value!r}")
+
+    def call(self, name):
+        self.take("(")
+        args, kwargs = [], {}
+        while self.peek()[1] != ")":
+            if self.peek()[0] == "name" and self.pos + 1 < len(self.tokens) and self.tokens[self.pos + 1][1] == "=":
+                key = self.take()[1]
+                self.take("=")
+                kwargs[key] = self.expression()
+            else:
+                args.append(self.expression())
+            if self.peek()[1] == ",":
+                self.take(",")
+        self.take(")")
+        return ("call", name, args, kwargs)
+
+
+# =====================
+# 指標 (與 TradingView 定義相同)
+# =====================
+def shift(x, n):
+    """ x[n]：往前取第 n 根，前面不足的部分為 na """
+    n = int(n)
+    if n == 0:
+        return x
+    out = np.full_like(x, False if x.dtype == bool else np.nan)
+    out[n:] = x[:-n]
+    return out
+
+
+def _seeded_ewm(x, length, alpha):
+    """ 以第一段 length 根的 SMA 當起點的指數平均 (ta.ema / ta.rma 的定義) """
+    x = np.asarray(x, dtype=np.float64)
+    out = np.full(len(x), np.nan)
+    valid = np.flatnonzero(~np.isnan(x))
+    if len(valid) == 0 or len(x) - valid[0] < length:
+        return out
+    first = valid[0]
+    seed_at = first + length - 1
+    seeded = x[seed_at:].copy()
+    seeded[0] = x[first:seed_at + 1].mean()
+    out[seed_at:] = pd.Series(seeded).ewm(alpha=alpha, adjust=False).mean().to_numpy()
+    return out
+
+
+def ta_ema(src, length):
+    length = int(length)
+    return _seeded_ewm(src, length, 2 / (length + 1))
+
+
+def ta_rma(src, length):
+    length = int(length)
+    return _seeded_ewm(src, length, 1 / length)
+
+
+def ta_rsi(src, length):
+    change = src - shift(src, 1)
+    up = ta_rma(np.where(np.isnan(change), np.nan, np.maximum(change, 0)), length)
+    down = ta_rma(np.where(np.isnan(change), np.nan, np.maximum(-change, 0)), length)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rsi = 100 - 100 / (1 + up / down)
+    rsi = np.where(down == 0, 100.0, np.where(up == 0, 0.0, rsi))
+    return np.where(np.isnan(up) | np.isnan(down), np.nan, rsi)
+
+
+def ta_valuewhen(condition, src, occurrence):
+    """ 第 occurrence 次 (0 = 最近一次，含當根) condition 成立時的 src 值 """
+    condition = np.asarray(condition, dtype=bool)
+    src = np.broadcast_to(np.asarray(src, dtype=np.float64), condition.shape)
+    hits = np.flatnonzero(condition)
+    k = np.cumsum(condition) - 1 - int(occurrence)
+    out = np.full(len(condition), np.nan)
+    ok = k >= 0
+    out[ok] = src[hits[k[ok]]]
+    return out
+
+
+FUNCTIONS = {
+    "ta.ema": ta_ema,
+    "ta.rma": ta_rma,
+    "ta.rsi": ta_rsi,
+    "ta.valuewhen": ta_valuewhen,
+}
+
+
+# =====================
+# 編譯：AST → 陣列函式
+# =====================
+def _binop(op, a, b):
+    if op == "and":
+        return np.logical_and(a, b)
+    if op == "or":
+        return np.logical_or(a, b)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return {
+            "+": np.add, "-": np.subtract, "*": np.multiply, "/": np.divide, "%": np.mod,
+            ">": np.greater, "<": np.less, ">=": np.greater_equal, "<=": np.less_equal,
+            "==": np.equal, "!=": np.not_equal,
+        }[op](a, b)
+
+
+def compile_expr(node, inputs):
+    kind = node[0]
+    if kind == "const":
+        value = node[1]
+        return lambda env: value
+    if kind == "var":
+        name = node[1]
+        return lambda env: env[name]
+    if kind == "unary":
+        op, inner = node[1], compile_expr(node[2], inputs)
+        if op == "not":
+            return lambda env: np.logical_not(inner(env))
+        if op == "-":
+            return lambda env: np.negative(inner(env))
+        return inner
+    if kind == "binop":
+        op = node[1]
+        a, b = compile_expr(node[2], inputs), compile_expr(node[3], inputs)
+        return lambda env: _binop(op, a(env), b(env))
+    if kind == "ternary":
+        c, a, b = (compile_expr(n, inputs) for n in node[1:])
+        return lambda env: np.where(c(env), a(env), b(env))
+    if kind == "history":
+        series, offset = compile_expr(node[1], inputs), compile_expr(node[2], inputs)
+        label = node[1][1] if node[1][0] == "var" else "運算式"
+
+        def history(env):
+            value = np.asarray(series(env))
+            if value.ndim == 0:
+                raise ValueError(f"不支援的語法 (歷史索引只能用在序列上，{label} 是常數或 input)")
+            return shift(value, offset(env))
+        return history
+    if kind == "call":
+        name, args, kwargs = node[1], node[2], node[3]
+        if name.startswith("input."):
+            return _compile_input(name, args, kwargs, inputs)
+        if name not in FUNCTIONS:
+            raise ValueError(f"不支援的 Pine 函式: {name}")
+        func = FUNCTIONS[name]
+        compiled = [compile_expr(a, inputs) for a in args]
+        return lambda env: func(*(c(env) for c in compiled))
+    raise ValueError(f"未知的節點: {kind}")
+
+
+def _compile_input(name, args, kwargs, inputs):
+    """ input.*：預設值可被 inputs[title] 或 inputs[變數名稱] 覆寫 (變數名稱在 compile 時帶入) """
+    default = args[0][1] if args else kwargs["defval"][1]
+    title = args[1][1] if len(args) > 1 else kwargs.get("title", ("const", None))[1]
+    cast = {"input.int": int, "input.float": float, "input.bool": bool}.get(name, lambda v: v)
+    value = cast(inputs.get(title, default) if title is not None else default)
+    return lambda env: value
+
+
+def compile_script(source, inputs=None):
+    """
+    把 Pine 腳本編譯成 [(變數名稱, 陣列函式), ...]。
+    inputs 可用 input 的標題或變數名稱覆寫預設參數，例如 {"rsiOverbought": 75}。
+    每個變數只能以 = 宣告一次：var 與 := 的值取決於前一根 K 線的結果 (逐根遞迴)，
+    無法編譯成整段陣列運算，直接報錯而不是算出錯誤的數值。
+    """
+    inputs = dict(inputs or {})
+    program = []
+    declared = set()
+    lines = source.splitlines()
+    for raw in lines:
+        line = raw.split("//", 1)[0].strip()
+        if not line:
+            continue
+        if raw.startswith((" ", "\t")):
+            # if 區塊內容：只支援畫圖 (label.new 等)，其他敘述 (例如 := 重新賦值) 無法向量化，直接報錯
+            call = re.match(r"^([A-Za-z_][\w.]*)\s*\(", line)
+            if call and call.group(1) in IGNORED_CALLS:
+                continue
+            raise ValueError(f"不支援的語法 (縮排區塊內只支援畫圖): {line}")
+        if line.startswith("if "):
+            continue
+
+        m = re.match(r"^(var\s+|varip\s+)?(?:(?:int|float|bool|series|simple)\s+)?([A-Za-z_]\w*)\s*(:?=)\s*(?!=)(.*)$", line)
+        if m is None:
+            call = re.match(r"^([A-Za-z_][\w.]*)\s*\(", line)
+            if call and call.group(1) in IGNORED_CALLS:
+                continue
+            raise ValueError(f"不支援的敘述: {line}")
+
+        keyword, name, assign, expr = m.groups()
+        if keyword:
+            raise ValueError(f"不支援的語法 (var 變數需要逐根 K 線執行): {line}")
+        if assign == ":=":
+            raise ValueError(f"不支援的語法 (:= 重新賦值需要逐根 K 線執行): {line}")
+        if name in declared:
+            raise ValueError(f"變數重複宣告: {name}")
+        declared.add(name)
+        node = Parser(tokenize(expr)).parse()
+        if node[0] == "call" and node[1].startswith("input.") and name in inputs:
+            # 允許用變數名稱覆寫
+            node = ("call", node[1], [("const", inputs[name])] + node[2][1:], node[3])
+        program.append((name, compile_expr(node, inputs)))
+    return program
+
+
+def run_pine(source, data, inputs=None):
+    """
+    對 data (含 Open/High/Low/Close/Volume 欄位的 DataFrame) 執行 Pine 腳本，
+    回傳所有變數的 DataFrame (index 與 data 相同)。
+    """
+    columns = {c.lower(): c for c in data.columns}
+    env = {s: data[columns[s]].to_numpy(dtype=np.float64) for s in SOURCES if s in columns}
+    n = len(data)
+    env["bar_index"] = np.arange(n, dtype=np.float64)
+
+    results = {}
+    for name, func in compile_script(source, inputs):
+        value = func(env)
+        env[name] = value
+        if np.ndim(value) == 1:
+            results[name] = value
+    return pd.DataFrame(results, index=data.index)
+
+
+def run_pine_file(path, data, inputs=None):
+    with open(path, encoding="utf-8") as f:
+        return run_pine(f.read(), data, inputs)
+
+
+if __name__ == "__main__":
+    import yfinance as yf
+
+    gold = yf.Ticker("GC=F")
+    data = gold.history(start='2024-01-01', end='2025-12-31')
+    result = run_pine_file("ema_rsi_strategy.pine", data)
+
+    buy = result.index[result["buyCondition"].astype(bool)]
+    print("=== ema_rsi_strategy.pine (Python 直譯) ===")
+    print(f"數據期間: {data.index.min().date()} 到 {data.index.max().date()}")
+    print(f"買入訊號數量: {len(buy)}")
+    for date in buy[:10]:
+        print(f"- {date.date()}")
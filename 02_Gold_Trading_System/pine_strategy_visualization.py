@@ -3,6 +3,7 @@ import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import talib as ta
+from indicator_cache import cached
 
 # 設置中文字體（如果可用）
 try:
@@ -19,13 +20,13 @@ def get_gold_data(start_date='2024-01-01', end_date='2025-12-31'):
 
 # 計算RSI
 def calculate_rsi(data, period=14):
-    data['RSI'] = ta.RSI(data['Close'], timeperiod=period)
+    data['RSI'] = cached("ta.RSI", data['Close'], ta.RSI, timeperiod=period)
     return data
 
 # 計算EMA
 def calculate_emas(data, fast_period=20, slow_period=50):
-    data['Fast_EMA'] = ta.EMA(data['Close'], timeperiod=fast_period)
-    data['Slow_EMA'] = ta.EMA(data['Close'], timeperiod=slow_period)
+    data['Fast_EMA'] = cached("ta.EMA", data['Close'], ta.EMA, timeperiod=fast_period)
+    data['Slow_EMA'] = cached("ta.EMA", data['Close'], ta.EMA, timeperiod=slow_period)
     return data
 
 # 實現Pine Script策略邏輯
@@ -34,15 +35,12 @@ def apply_pine_strategy(data, rsi_overbought=70, rsi_target_min=45, rsi_target_m
     data['Trend_Condition'] = data['Fast_EMA'] > data['Slow_EMA']
 
     # RSI 從超買區回落至目標區間的條件
-    data['RSI_Was_Overbought'] = False
+    # 檢查RSI是否曾經在超買區：前幾根K線 (不含當根) 的 RSI 最大值 >= overbought
+    # 以累積最大值一次算完 (第一根為 False，RSI 暖機期的 NaN 不影響結果)
+    prev_max = data['RSI'].shift(1).cummax().ffill()
+    data['RSI_Was_Overbought'] = prev_max >= rsi_overbought
     data['RSI_In_Target_Zone'] = (data['RSI'] >= rsi_target_min) & (data['RSI'] <= rsi_target_max)
 
-    # 檢查RSI是否曾經在超買區
-    for i in range(1, len(data)):
-        # 檢查前幾根K線是否有RSI >= overbought
-        prev_overbought = data['RSI'].iloc[:i].max() >= rsi_overbought
-        data.loc[data.index[i], 'RSI_Was_Overbought'] = prev_overbought
-
     data['RSI_Pullback_Condition'] = data['RSI_Was_Overbought'] & data['RSI_In_Target_Zone']
 
     # RSI 勾頭向上的條件 (當前RSI > 前一個RSI)
@@ -0,0 +1,310 @@
+import os
+import math
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+import numpy as np
+import pandas as pd
+from pine_strategy_visualization import get_gold_data, calculate_rsi, calculate_emas, apply_pine_strategy
+
+# EMA 交叉 + RSI 回檔策略的參數最佳化
+# - 取樣器：TPE (Tree-structured Parzen Estimator)、演化 (錦標賽選擇 + 均勻交配 + 高斯突變)、隨機
+# - 候選參數交給行程池評估，同時有 WORKERS 組在跑，跑完一組就再問取樣器要下一組 (ask / tell)
+# - 中位數剪枝：先用前 40%、70% 的資料評分，比同一階段其他參數組的中位數差就提早停止
+# - 最後 HOLDOUT_FRAC 的資料不參與最佳化，只用來回報最佳參數的樣本外表現
+# - RSI / EMA 透過 indicator_cache 計算，同週期的指標在各參數組間共用 (硬碟層跨行程共用)
+
+# 搜尋空間：名稱 -> (下限, 上限, 是否為整數)；預設值為 Pine 腳本的 input
+SPACE = {
+    "fast_period": (5, 60, True),
+    "slow_period": (20, 200, True),
+    "rsi_period": (7, 28, True),
+    "rsi_overbought": (60.0, 85.0, False),
+    "rsi_target_min": (30.0, 55.0, False),
+    "rsi_target_max": (45.0, 70.0, False),
+}
+DEFAULT_PARAMS = {"fast_period": 20, "slow_period": 50, "rsi_period": 14,
+                  "rsi_overbought": 70.0, "rsi_target_min": 45.0, "rsi_target_max": 55.0}
+
+N_TRIALS = 200
+WORKERS = os.cpu_count() or 1
+SEED = 42
+RUNGS = (0.4, 0.7, 1.0)    # 依序用前 40% / 70% / 全部資料評分
+PRUNE_WARMUP = 8           # 某階段至少有幾個分數才開始剪枝
+MIN_TRADES = 3             # 交易次數下限 (資料很短時)
+MIN_TRADES_PER_YEAR = 1.0  # 每年至少幾筆交易，少於此數視為無效 (分數 -inf)，避免靠少數幾筆交易勝出
+BARS_PER_YEAR = 252
+HOLDOUT_FRAC = 0.2         # 最後 20% 的資料保留為樣本外
+START_DATE = '2010-01-01'
+
+# TPE
+TPE_STARTUP = 20           # 前幾組隨機取樣
+TPE_GAMMA = 0.25           # 分數前 25% 視為「好」的參數組
+TPE_CANDIDATES = 24        # 每次從好的分布抽幾個候選，取 l(x)/g(x) 最大者
+TPE_MIN_BANDWIDTH = 0.03   # 正規化空間 [0, 1] 中的最小核寬度
+
+# 演化
+POPULATION = 16
+TOURNAMENT = 3
+MUTATION_SIGMA = 0.1
+
+# =====================
+# 參數空間
+# =====================
+def to_unit(params):
+    """ 參數 dict -> [0, 1]^d 向量 (SPACE 的順序) """
+    return np.array([(params[k] - lo) / (hi - lo) for k, (lo, hi, _) in SPACE.items()])
+
+def from_unit(u):
+    """ [0, 1]^d 向量 -> 合法的參數 dict (整數四捨五入；快線 < 慢線、目標區下限 < 上限 < 超買) """
+    params = {}
+    for x, (k, (lo, hi, is_int)) in zip(np.clip(u, 0, 1), SPACE.items()):
+        v = lo + x * (hi - lo)
+        params[k] = int(round(v)) if is_int else round(float(v), 2)
+    fast, slow = sorted((params["fast_period"], params["slow_period"]))
+    params["fast_period"], params["slow_period"] = fast, max(slow, fast + 1)
+    levels = sorted((params["rsi_target_min"], params["rsi_target_max"], params["rsi_overbought"]))
+    params["rsi_target_min"], params["rsi_target_max"], params["rsi_overbought"] = levels
+    return params
+
+# =====================
+# 評估
+# =====================
+def strategy_signals(data, params, cut=None):
+    """
+    以指定參數計算指標與買入訊號。指標一律以完整收盤價經快取計算再截取前 cut 根
+    (指標只用過去的資料，截取結果與只用前 cut 根計算相同)，各階段與各參數組共用同一份快取。
+    """
+    data = data[['Open', 'High', 'Low', 'Close']].copy()
+    data = calculate_rsi(data, period=params["rsi_period"])
+    data = calculate_emas(data, params["fast_period"], params["slow_period"])
+    if cut is not None:
+        data = data.iloc[:cut].copy()
+    return apply_pine_strategy(data, params["rsi_overbought"], params["rsi_target_min"], params["rsi_target_max"])
+
+def min_trades(n_bars):
+    """ 交易次數下限隨資料長度增加 (每年 MIN_TRADES_PER_YEAR 筆，至少 MIN_TRADES) """
+    return max(MIN_TRADES, math.ceil(MIN_TRADES_PER_YEAR * n_bars / BARS_PER_YEAR))
+
+def split_holdout(data, holdout=HOLDOUT_FRAC):
+    """ 回傳 (樣本內資料, 樣本外起點)；樣本外為最後 holdout 比例的 K 線 """
+    start = len(data) - int(len(data) * holdout)
+    return data.iloc[:start], start
+
+def trade_returns(data, start=0):
+    """
+    Pine 腳本只有進場訊號，評估時以：買入訊號當根收盤進場，趨勢條件 (快線 > 慢線) 消失的那根收盤出場，
+    持倉中的新訊號忽略，最後一根仍持倉則以收盤價平倉。回傳每筆交易的對數報酬。
+    start 之前的訊號不進場 (樣本外評估：指標用完整歷史計算，只計入 start 之後進場的交易)。
+    """
+    close = data['Close'].to_numpy(dtype=np.float64)
+    signal = np.flatnonzero(data['Buy_Signal'].to_numpy(dtype=bool))
+    signal = signal[signal >= start]
+    trend_off = np.flatnonzero(~data['Trend_Condition'].to_numpy(dtype=bool))
+    returns = []
+    i = 0
+    while i < len(signal):
+        entry = signal[i]
+        k = np.searchsorted(trend_off, entry, side="right")
+        exit_ = trend_off[k] if k < len(trend_off) else len(close) - 1
+        returns.append(math.log(close[exit_] / close[entry]))
+        i = np.searchsorted(signal, exit_, side="right")
+    return np.array(returns)
+
+def score(data, params, cut=None):
+    """ 分數 = 前 cut 根內所有交易對數報酬的總和 (= 複利資金的對數成長)；回傳 (分數, 交易次數) """
+    r = trade_returns(strategy_signals(data, params, cut))
+    return float(r.sum()), len(r)
+
+def evaluate_params(data, params, rungs=RUNGS, thresholds=None):
+    """
+    依 rungs 逐步加長資料評分，某階段分數低於 thresholds 的門檻就剪枝。
+    回傳 dict：state (complete / pruned)、value、各階段 values、trades。
+    """
+    values = []
+    trades = 0
+    for r, frac in enumerate(rungs):
+        cut = max(int(len(data) * frac), 1)
+        value, trades = score(data, params, cut)
+        values.append(value)
+        if r < len(rungs) - 1 and thresholds is not None and value < thresholds[r]:
+            return {"state": "pruned", "value": value, "values": values, "trades": trades}
+    if trades < min_trades(cut):
+        values[-1] = -math.inf
+    return {"state": "complete", "value": values[-1], "values": values, "trades": trades}
+
+_DATA = None
+
+def _init_worker(data):
+    global _DATA
+    _DATA = data
+
+def _run_trial(args):
+    params, rungs, thresholds = args
+    return evaluate_params(_DATA, params, rungs, thresholds)
+
+# =====================
+# 取樣器
+# =====================
+class RandomSampler:
+    def __init__(self, seed=SEED):
+        self.rng = np.random.default_rng(seed)
+
+    def ask(self, trials):
+        return from_unit(self.rng.random(len(SPACE)))
+
+class TPESampler(RandomSampler):
+    """ 每個參數各自以 Parzen 估計「好」與「不好」參數組的密度 l(x)、g(x)，取 l/g 最大的候選 """
+
+    def ask(self, trials):
+        done = [t for t in trials if t["state"] in ("complete", "pruned")]
+        if len(done) < TPE_STARTUP:
+            return super().ask(trials)
+        # 剪枝的參數組沒有完整分數，一律歸在不好的那一組
+        done.sort(key=lambda t: (t["state"] == "complete", t["value"]), reverse=True)
+        n_good = max(1, math.ceil(TPE_GAMMA * sum(t["state"] == "complete" for t in done)))
+        x = np.array([to_unit(t["params"]) for t in done])
+        good, bad = x[:n_good], x[n_good:]
+
+        pick = self.rng.integers(0, len(good) + 1, size=TPE_CANDIDATES)
+        prior = pick == len(good)                   # 有 1/(n+1) 機率從整個空間均勻抽
+        bw_good = self._bandwidth(good)
+        cand = good[np.minimum(pick, len(good) - 1)] + self.rng.normal(size=(TPE_CANDIDATES, len(SPACE))) * bw_good
+        cand[prior] = self.rng.random((int(prior.sum()), len(SPACE)))
+        cand = np.abs(cand)                         # 在 [0, 1] 邊界反射
+        cand = 1 - np.abs(1 - cand)
+        gain = self._log_density(cand, good, bw_good) - self._log_density(cand, bad, self._bandwidth(bad))
+        return from_unit(cand[np.argmax(gain)])
+
+    @staticmethod
+    def _bandwidth(points):
+        n = max(len(points), 1)
+        std = points.std(axis=0) if len(points) > 1 else np.full(points.shape[1], 0.5)
+        return np.maximum(1.06 * std * n ** (-1 / 5), TPE_MIN_BANDWIDTH)
+
+    @staticmethod
+    def _log_density(x, points, bw):
+        """ 每個維度：(高斯核混合 + 均勻先驗) / (n + 1)，各維度的 log 密度相加 """
+        if len(points) == 0:
+            return np.zeros(len(x))
+        z = (x[:, None, :] - points[None, :, :]) / bw
+        kernel = np.exp(-0.5 * z ** 2) / (bw * math.sqrt(2 * math.pi))
+        dens = (kernel.sum(axis=1) + 1.0) / (len(points) + 1)
+        return np.log(dens).sum(axis=1)
+
+class EvolutionSampler(RandomSampler):
+    """ 族群為目前最好的 POPULATION 組；錦標賽選雙親、均勻交配、高斯突變 """
+
+    def ask(self, trials):
+        done = [t for t in trials if t["state"] == "complete" and np.isfinite(t["value"])]
+        if len(done) < TOURNAMENT + 1:
+            return super().ask(trials)
+        done.sort(key=lambda t: t["value"], reverse=True)
+        population = np.array([to_unit(t["params"]) for t in done[:POPULATION]])
+
+        def tournament():
+            idx = self.rng.choice(len(population), size=min(TOURNAMENT, len(population)), replace=False)
+            return population[idx.min()]            # 依分數排序過，編號最小的最好
+
+        a, b = tournament(), tournament()
+        child = np.where(self.rng.random(len(SPACE)) < 0.5, a, b)
+        mutate = self.rng.random(len(SPACE)) < max(1 / len(SPACE), 0.3)
+        child = child + mutate * self.rng.normal(scale=MUTATION_SIGMA, size=len(SPACE))
+        return from_unit(child)
+
+SAMPLERS = {"tpe": TPESampler, "evolution": EvolutionSampler, "random": RandomSampler}
+
+# =====================
+# 最佳化迴圈
+# =====================
+def prune_thresholds(trials, rungs=RUNGS):
+    """ 每個中間階段的門檻 = 已回報該階段分數的中位數 (數量不足 PRUNE_WARMUP 時不剪枝) """
+    thresholds = []
+    for r in range(len(rungs) - 1):
+        values = [t["values"][r] for t in trials if len(t.get("values", ())) > r]
+        thresholds.append(float(np.median(values)) if len(values) >= PRUNE_WARMUP else -math.inf)
+    return thresholds
+
+def optimize(data, method="tpe", n_trials=N_TRIALS, workers=WORKERS, seed=SEED, rungs=RUNGS,
+             prune=True, initial=(DEFAULT_PARAMS,), callback=None, holdout=HOLDOUT_FRAC):
+    """
+    回傳 (trials DataFrame, 最佳參數 dict)。只用前 1 - holdout 的資料評分 (樣本外以 summarize 另外回報)；
+    initial 的參數組先評估 (預設含 Pine 預設值)，callback(trial) 在每組完成時呼叫 (可用來印進度)。
+    """
+    data, _ = split_holdout(data, holdout)
+    sampler = SAMPLERS[method](seed)
+    trials = []
+    pending = {}
+    queue = list(initial)
+
+    def submit(pool):
+        params = queue.pop(0) if queue else sampler.ask(trials)
+        thresholds = prune_thresholds(trials, rungs) if prune else None
+        trial = {"number": len(trials) + len(pending), "params": params, "state": "running"}
+        if pool is None:
+            trial.update(_run_trial((params, rungs, thresholds)))
+            return trial
+        pending[pool.submit(_run_trial, (params, rungs, thresholds))] = trial
+        return None
+
+    def finish(trial):
+        trials.append(trial)
+        if callback is not None:
+            callback(trial)
+
+    if workers <= 1:
+        _init_worker(data)
+        while len(trials) < n_trials:
+            finish(submit(None))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(data,)) as pool:
+            while len(trials) + len(pending) < n_trials and len(pending) < workers:
+                submit(pool)
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    trial = pending.pop(future)
+                    trial.update(future.result())
+                    finish(trial)
+                while len(trials) + len(pending) < n_trials and len(pending) < workers:
+                    submit(pool)
+
+    table = pd.DataFrame([{**t["params"], "number": t["number"], "state": t["state"],
+                           "value": t["value"], "trades": t["trades"]} for t in trials])
+    table = table.sort_values("number").reset_index(drop=True)
+    complete = table[table["state"] == "complete"]
+    best = complete.loc[complete["value"].idxmax()] if len(complete) else table.iloc[0]
+    best_params = {k: (int(best[k]) if SPACE[k][2] else float(best[k])) for k in SPACE}
+    return table, best_params
+
+def summarize(data, params, start=0):
+    """ start 之後進場的交易統計 (start = 樣本外起點時即為樣本外表現) """
+    r = trade_returns(strategy_signals(data, params), start)
+    return {
+        "交易次數": len(r),
+        "總報酬": math.exp(r.sum()) - 1 if len(r) else 0.0,
+        "勝率": float((r > 0).mean()) if len(r) else math.nan,
+        "平均每筆": float(np.expm1(r).mean()) if len(r) else math.nan,
+    }
+
+if __name__ == "__main__":
+    method = input("👉 最佳化方法 tpe / evolution / random (直接 Enter 使用 tpe): ").strip().lower() or "tpe"
+    n_str = input(f"👉 評估次數 (直接 Enter 使用 {N_TRIALS}): ").strip()
+    n_trials = int(n_str) if n_str else N_TRIALS
+
+    data = get_gold_data(start_date=START_DATE)
+    in_sample, oos_start = split_holdout(data)
+
+    def report(trial):
+        mark = "✂️" if trial["state"] == "pruned" else "✅"
+        print(f"{mark} #{trial['number']:>4} 分數 {trial['value']:+.4f} 交易 {trial['trades']:>3} {trial['params']}")
+
+    table, best = optimize(data, method=method, n_trials=n_trials, callback=report)
+    pruned = (table["state"] == "pruned").sum()
+    print(f"\n=== {method} 最佳化完成：{len(table)} 組 (剪枝 {pruned} 組) ===")
+    print(f"樣本內 {in_sample.index[0].date()} ~ {in_sample.index[-1].date()}，"
+          f"樣本外 {data.index[oos_start].date()} ~ {data.index[-1].date()} (未參與最佳化)")
+    for label, params in (("Pine 預設", DEFAULT_PARAMS), ("最佳參數", best)):
+        print(f"{label}: {params}")
+        print(f"  樣本內 -> {summarize(in_sample, params)}")
+        print(f"  樣本外 -> {summarize(data, params, oos_start)}")
+    table.to_csv("optimizer_trials.csv", index=False)
+    print("所有參數組已存為 optimizer_trials.csv")
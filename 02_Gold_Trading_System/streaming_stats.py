@@ -0,0 +1,312 @@
+import math
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+
+# 單次串流統計：資料可以一段一段 (或多個行程各自) 餵入，最後合併，
+# 不需要把整份資料 (例如多年的 tick 資料) 放進記憶體，新 K 線進來時也只需更新一次。
+MAX_BINS = 50          # 同 chart_generator 的 50 個 bin
+COMPRESSION = 200      # t-digest 最多約保留這麼多個 centroid
+
+
+class RunningStats:
+    """ 筆數 / 平均 / 變異數 (Welford，分段以 Chan 公式合併) / 總和 / 最小最大值與其位置；NaN 略過 (同 pandas) """
+
+    def __init__(self):
+        self.rows = 0          # 已餵入的列數 (含 NaN)，沒有 labels 時用來編位置
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self.argmin = None
+        self.argmax = None
+
+    def update(self, values, labels=None):
+        values = np.asarray(values, dtype=np.float64)
+        valid = ~np.isnan(values)
+        if not valid.any():
+            self.rows += len(values)
+            return self
+        x = values[valid]
+        if labels is None:
+            labels = np.arange(self.rows, self.rows + len(values))
+        elif not isinstance(labels, pd.Index):
+            labels = np.asarray(labels)       # pandas Index 保持原樣，argmax 才會是 Timestamp (同 idxmax)
+        labels = labels[valid]
+
+        block = RunningStats()
+        block.rows = len(values)
+        block.count = len(x)
+        block.mean = float(x.mean())
+        block.m2 = float(((x - block.mean) ** 2).sum())
+        block.sum = float(x.sum())
+        i, j = int(x.argmin()), int(x.argmax())
+        block.min, block.argmin = float(x[i]), labels[i]
+        block.max, block.argmax = float(x[j]), labels[j]
+        return self.merge(block)
+
+    def merge(self, other):
+        """ 合併另一段的結果 (同值時保留先出現的位置，同 idxmax / idxmin) """
+        self.rows += other.rows
+        if other.count == 0:
+            return self
+        n = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / n
+        self.m2 += other.m2 + delta ** 2 * self.count * other.count / n
+        self.count = n
+        self.sum += other.sum
+        if other.min < self.min:
+            self.min, self.argmin = other.min, other.argmin
+        if other.max > self.max:
+            self.max, self.argmax = other.max, other.argmax
+        return self
+
+    @property
+    def var(self):
+        return self.m2 / (self.count - 1) if self.count > 1 else math.nan
+
+    @property
+    def std(self):
+        return math.sqrt(self.var)
+
+
+class StreamingHistogram:
+    """
+    自動調整範圍的直方圖：bin 寬度為 2 的次方、邊界對齊 0，
+    範圍超過 max_bins 個 bin 時寬度加倍 (相鄰兩個 bin 相加)，所以任意兩個直方圖都能精確合併。
+    """
+
+    def __init__(self, max_bins=MAX_BINS):
+        self.max_bins = max_bins
+        self.width = None
+        self.start = 0                 # 第一個 bin 的編號 (bin k 涵蓋 [k*width, (k+1)*width))
+        self.counts = np.zeros(0, dtype=np.int64)
+
+    def _rebin(self, width):
+        """ 把寬度放大到 width (2 的次方倍) """
+        factor = int(round(width / self.width))
+        if factor <= 1:
+            return
+        idx = np.arange(self.start, self.start + len(self.counts)) // factor
+        new_start = int(idx[0]) if len(idx) else 0
+        counts = np.zeros(int(idx[-1]) - new_start + 1 if len(idx) else 0, dtype=np.int64)
+        np.add.at(counts, idx - new_start, self.counts)
+        self.width, self.start, self.counts = width, new_start, counts
+
+    def _fit(self, lo_bin, hi_bin):
+        """ 調整寬度直到 [lo_bin, hi_bin] (以目前寬度計) 放得進 max_bins 個 bin """
+        width = self.width
+        lo, hi = lo_bin * self.width, hi_bin * self.width
+        while math.floor(hi / width) - math.floor(lo / width) + 1 > self.max_bins:
+            width *= 2
+        self._rebin(width)
+
+    def update(self, values):
+        x = np.asarray(values, dtype=np.float64)
+        x = x[np.isfinite(x)]
+        if len(x) == 0:
+            return self
+        lo, hi = float(x.min()), float(x.max())
+        if self.width is None:
+            span = max(hi - lo, abs(hi) * 1e-9, 1e-12)
+            self.width = 2.0 ** math.ceil(math.log2(span / self.max_bins))
+        if len(self.counts):
+            lo = min(lo, self.start * self.width)
+            hi = max(hi, (self.start + len(self.counts) - 1) * self.width)
+        self._fit(lo / self.width, hi / self.width)
+
+        k = np.floor(x / self.width).astype(np.int64)
+        first = int(k.min()) if not len(self.counts) else min(int(k.min()), self.start)
+        last = max(int(k.max()), self.start + len(self.counts) - 1)
+        counts = np.zeros(last - first + 1, dtype=np.int64)
+        if len(self.counts):
+            counts[self.start - first:self.start - first + len(self.counts)] = self.counts
+        counts += np.bincount(k - first, minlength=len(counts))
+        self.start, self.counts = first, counts
+        return self
+
+    def merge(self, other):
+        if other.width is None or not len(other.counts):
+            return self
+        if self.width is None or not len(self.counts):
+            self.width, self.start, self.counts = other.width, other.start, other.counts.copy()
+            return self
+        other = other.copy()
+        width = max(self.width, other.width)
+        self._rebin(width)
+        other._rebin(width)
+        first = min(self.start, other.start)
+        last = max(self.start + len(self.counts), other.start + len(other.counts)) - 1
+        counts = np.zeros(last - first + 1, dtype=np.int64)
+        counts[self.start - first:self.start - first + len(self.counts)] += self.counts
+        counts[other.start - first:other.start - first + len(other.counts)] += other.counts
+        self.start, self.counts = first, counts
+        self._fit(first, last)
+        return self
+
+    def copy(self):
+        h = StreamingHistogram(self.max_bins)
+        h.width, h.start, h.counts = self.width, self.start, self.counts.copy()
+        return h
+
+    @property
+    def edges(self):
+        return (self.start + np.arange(len(self.counts) + 1)) * (self.width or 1.0)
+
+
+class TDigest:
+    """
+    t-digest 分位數草圖 (merging 版本)：centroid 依 arcsin 尺度函數合併，
+    兩端 (極小 / 極大分位數) 保留較細的 centroid，誤差主要在中間且很小。
+    """
+
+    def __init__(self, compression=COMPRESSION):
+        self.compression = compression
+        self.means = np.zeros(0)
+        self.weights = np.zeros(0)
+        self.min = math.inf
+        self.max = -math.inf
+
+    @property
+    def count(self):
+        return float(self.weights.sum())
+
+    def _compress(self, means, weights):
+        order = np.argsort(means, kind="stable")
+        means, weights = means[order], weights[order]
+        total = weights.sum()
+        q_left = (np.cumsum(weights) - weights) / total
+        k = self.compression * (np.arcsin(2 * q_left - 1) / np.pi + 0.5)
+        cluster = np.floor(k).astype(np.int64)
+        starts = np.r_[0, np.flatnonzero(np.diff(cluster)) + 1]
+        w = np.add.reduceat(weights, starts)
+        self.means = np.add.reduceat(means * weights, starts) / w
+        self.weights = w
+
+    def update(self, values):
+        x = np.asarray(values, dtype=np.float64)
+        x = x[~np.isnan(x)]
+        if len(x) == 0:
+            return self
+        self.min = min(self.min, float(x.min()))
+        self.max = max(self.max, float(x.max()))
+        self._compress(np.r_[self.means, x], np.r_[self.weights, np.ones(len(x))])
+        return self
+
+    def merge(self, other):
+        if len(other.weights) == 0:
+            return self
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress(np.r_[self.means, other.means], np.r_[self.weights, other.weights])
+        return self
+
+    def _centers(self):
+        return np.cumsum(self.weights) - self.weights / 2
+
+    def quantile(self, q):
+        """ q 可為純量或陣列 (0~1)；以 centroid 中心線性內插，兩端接到實際最小 / 最大值 """
+        if len(self.weights) == 0:
+            return np.full(np.shape(q), np.nan) if np.ndim(q) else math.nan
+        total = self.count
+        xp = np.r_[0.0, self._centers(), total]
+        fp = np.r_[self.min, self.means, self.max]
+        out = np.interp(np.asarray(q, dtype=np.float64) * total, xp, fp)
+        return out if np.ndim(q) else float(out)
+
+    def cdf(self, x):
+        if len(self.weights) == 0:
+            return np.full(np.shape(x), np.nan) if np.ndim(x) else math.nan
+        total = self.count
+        xp = np.r_[self.min, self.means, self.max]
+        fp = np.r_[0.0, self._centers(), total] / total
+        out = np.interp(np.asarray(x, dtype=np.float64), xp, fp)
+        return out if np.ndim(x) else float(out)
+
+
+class ColumnSummary:
+    """ 一個欄位的完整摘要：RunningStats + 直方圖 + 分位數草圖，可逐段更新、可合併 """
+
+    def __init__(self, max_bins=MAX_BINS, compression=COMPRESSION):
+        self.stats = RunningStats()
+        self.histogram = StreamingHistogram(max_bins)
+        self.digest = TDigest(compression)
+
+    def update(self, values, labels=None):
+        values = np.asarray(values, dtype=np.float64)
+        self.stats.update(values, labels)
+        self.histogram.update(values)
+        self.digest.update(values)
+        return self
+
+    def merge(self, other):
+        self.stats.merge(other.stats)
+        self.histogram.merge(other.histogram)
+        self.digest.merge(other.digest)
+        return self
+
+    def __getattr__(self, name):
+        # mean / std / min / max / argmax / sum… 直接取 RunningStats 的值
+        if name in ("stats", "histogram", "digest"):
+            raise AttributeError(name)
+        return getattr(self.stats, name)
+
+    def describe(self):
+        """ 與 Series.describe() 相同的欄位 (分位數為近似值) """
+        q25, q50, q75 = self.digest.quantile([0.25, 0.5, 0.75])
+        return pd.Series({
+            'count': float(self.count), 'mean': self.mean, 'std': self.std, 'min': self.min,
+            '25%': q25, '50%': q50, '75%': q75, 'max': self.max,
+        })
+
+
+def summarize_frame(data, columns, summaries=None):
+    """ 以 index 為位置標籤更新各欄位摘要；summaries 給定時接續更新 (新 K 線進來時) """
+    summaries = summaries or {col: ColumnSummary() for col in columns}
+    for col in columns:
+        summaries[col].update(data[col].to_numpy(), data.index)
+    return summaries
+
+
+def summarize_chunks(chunks, columns):
+    """ chunks 為 DataFrame 的 iterator (例如 pd.read_csv(..., chunksize=...))，記憶體只跟區塊大小有關 """
+    summaries = None
+    for chunk in chunks:
+        summaries = summarize_frame(chunk, columns, summaries)
+    return summaries or {col: ColumnSummary() for col in columns}
+
+
+def merge_summaries(parts, columns=()):
+    """ 依序合併多份摘要；parts 為空時回傳 columns 的空摘要 (count 為 0) """
+    merged = {col: ColumnSummary() for col in columns}
+    for part in parts:
+        for col, summary in part.items():
+            merged.setdefault(col, ColumnSummary()).merge(summary)
+    return merged
+
+
+def _summarize_csv(args):
+    path, columns, chunksize, read_kwargs = args
+    summaries = summarize_chunks(pd.read_csv(path, chunksize=chunksize, **read_kwargs), columns)
+    # 各檔案的列號 (或 index_col) 各自從頭算，加上檔名才能分辨最高最低價在哪個檔案
+    for summary in summaries.values():
+        if summary.count:
+            summary.stats.argmin = (path, summary.stats.argmin)
+            summary.stats.argmax = (path, summary.stats.argmax)
+    return summaries
+
+
+def summarize_csv_files(paths, columns, chunksize=1_000_000, workers=4, **read_kwargs):
+    """
+    多個 CSV (例如每年一個 tick 檔) 由多個行程各自摘要後合併；
+    argmax / argmin 為 (檔案路徑, 檔案內的列號或 index_col 的值)。
+    """
+    paths = list(paths)
+    if not paths:
+        raise ValueError("沒有指定任何 CSV 檔案")
+    jobs = [(path, columns, chunksize, read_kwargs) for path in paths]
+    with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+        return merge_summaries(pool.map(_summarize_csv, jobs), columns)
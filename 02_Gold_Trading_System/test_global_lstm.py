@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("yfinance")
+pytest.importorskip("sklearn")
+pytest.importorskip("tensorflow")
+from global_lstm import FEATURES, SEQ_LENGTH, TRAIN_RATIO, build_panel, fit_scalers, make_features
+
+def ohlcv(n, seed):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    return pd.DataFrame({"Open": close * (1 + rng.normal(0, 0.002, n)), "High": close * 1.01,
+                         "Low": close * 0.99, "Close": close, "Volume": rng.integers(1_000, 5_000, n)},
+                        index=pd.bdate_range("2022-01-03", periods=n))
+
+@pytest.fixture
+def features():
+    return {"A": make_features(ohlcv(300, 0)), "B": make_features(ohlcv(200, 1))}
+
+def test_target_is_next_day_return(features):
+    feat = features["A"]
+    np.testing.assert_allclose(feat["target"].iloc[:-1].to_numpy(), feat["ret"].iloc[1:].to_numpy())
+    assert np.isnan(feat["target"].iloc[-1]) and not feat[FEATURES].isna().any().any()
+
+def test_scalers_only_use_training_rows(features):
+    scalers = fit_scalers(features)
+    changed = {t: f.copy() for t, f in features.items()}
+    split = int(len(changed["A"]) * TRAIN_RATIO)
+    changed["A"].iloc[split:, :] *= 50                  # 測試期的資料不影響標準化參數
+    assert fit_scalers(changed) == scalers
+
+def test_windows_never_cross_assets(features):
+    scalers = fit_scalers(features)
+    panel, asset_ids, train_starts, test_starts = build_panel(features, scalers, ["A", "B"])
+    assert len(panel) == len(asset_ids) == len(features["A"]) + len(features["B"])
+    starts = np.concatenate([train_starts, test_starts])
+    assert len(starts) == len(features["A"]) + len(features["B"]) - 2 * SEQ_LENGTH
+    # 視窗內 (含預測目標那天) 都是同一個資產，且目標不會是 NaN
+    assert (asset_ids[starts] == asset_ids[starts + SEQ_LENGTH - 1]).all()
+    assert not np.isnan(panel[starts + SEQ_LENGTH - 1, len(FEATURES)]).any()
+    # 每個資產的訓練視窗都在測試視窗之前
+    for asset in (0, 1):
+        assert train_starts[asset_ids[train_starts] == asset].max() < test_starts[asset_ids[test_starts] == asset].min()
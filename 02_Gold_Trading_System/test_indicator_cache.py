@@ -0,0 +1,67 @@
+import os
+import time
+import numpy as np
+import pandas as pd
+
+from indicator_cache import IndicatorCache, series_key
+
+def closes(n=500, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.Series(2000 + np.cumsum(rng.normal(0, 5, n)), index=pd.date_range("2024-01-01", periods=n), name="Close")
+
+def sma(series, window):
+    return series.rolling(window).mean()
+
+def test_key_changes_with_values_index_dtype_and_params():
+    s = closes()
+    key = series_key("sma", s, {"window": 20})
+    assert key == series_key("sma", s.copy(), {"window": 20})
+    changed = s.copy()
+    changed.iloc[-1] += 0.01
+    shifted = s.copy()
+    shifted.index = shifted.index + pd.Timedelta("1D")
+    for other in (series_key("sma", changed, {"window": 20}), series_key("sma", shifted, {"window": 20}),
+                  series_key("sma", s.astype(np.float32), {"window": 20}), series_key("sma", s, {"window": 21}),
+                  series_key("ema", s, {"window": 20})):
+        assert other != key
+
+def test_memory_then_disk_hits(tmp_path):
+    s = closes()
+    cache = IndicatorCache(cache_dir=tmp_path)
+    first = cache.get_or_compute("sma", s, sma, window=20)
+    first.iloc[-1] = -1                                  # 修改回傳值不影響快取
+    again = cache.get_or_compute("sma", s, sma, window=20)
+    pd.testing.assert_series_equal(again, sma(s, 20))
+
+    other_process = IndicatorCache(cache_dir=tmp_path)
+    pd.testing.assert_series_equal(other_process.get_or_compute("sma", s, sma, window=20), sma(s, 20))
+    assert cache.stats == {"memory_hits": 1, "disk_hits": 0, "misses": 1, "evicted": 0}
+    assert other_process.stats["disk_hits"] == 1 and other_process.stats["misses"] == 0
+
+def test_memory_lru_is_bounded(tmp_path):
+    cache = IndicatorCache(cache_dir=tmp_path, memory_items=2, disk_bytes=0)
+    s = closes()
+    for w in (5, 10, 20):
+        cache.get_or_compute("sma", s, sma, window=w)
+    cache.get_or_compute("sma", s, sma, window=5)        # 已被擠出記憶體，且硬碟層關閉
+    assert cache.stats["misses"] == 4 and not os.listdir(tmp_path)
+
+def test_disk_layer_evicts_least_recently_used(tmp_path):
+    s = closes(2000)
+    probe = IndicatorCache(cache_dir=tmp_path / "probe")
+    probe.get_or_compute("sma", s, sma, window=5)
+    size = os.path.getsize(next((tmp_path / "probe").iterdir()))
+
+    cache = IndicatorCache(cache_dir=tmp_path / "lru", memory_items=0, disk_bytes=int(size * 3.5))
+    for w in (5, 10, 20):
+        cache.get_or_compute("sma", s, sma, window=w)
+        time.sleep(0.01)
+    cache.get_or_compute("sma", s, sma, window=5)        # 讀取時更新使用時間
+    time.sleep(0.01)
+    cache.get_or_compute("sma", s, sma, window=40)
+    assert cache.stats["evicted"] >= 1
+    cache.stats["misses"] = 0
+    cache.get_or_compute("sma", s, sma, window=5)
+    assert cache.stats["misses"] == 0                     # 最近用過的留下
+    cache.get_or_compute("sma", s, sma, window=10)
+    assert cache.stats["misses"] == 1                     # 最久沒用到的被刪除
@@ -0,0 +1,68 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from pine_interpreter import run_pine, run_pine_file, ta_ema, ta_rma, ta_rsi, ta_valuewhen
+
+def ohlc(n=300, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    return pd.DataFrame({"Open": close, "High": close * 1.01, "Low": close * 0.99, "Close": close},
+                        index=pd.date_range("2024-01-01", periods=n))
+
+# 逐根 K 線的參考實作 (TradingView 的定義)
+def loop_ewm(x, length, alpha):
+    out = np.full(len(x), np.nan)
+    for i in range(length - 1, len(x)):
+        out[i] = x[i - length + 1:i + 1].mean() if np.isnan(out[i - 1]) else alpha * x[i] + (1 - alpha) * out[i - 1]
+    return out
+
+def loop_rsi(x, length):
+    change = np.r_[np.nan, np.diff(x)]
+    up = loop_ewm(np.maximum(change, 0)[1:], length, 1 / length)
+    down = loop_ewm(np.maximum(-change, 0)[1:], length, 1 / length)
+    return np.r_[np.nan, 100 - 100 / (1 + up / down)]
+
+def loop_valuewhen(cond, src, occurrence):
+    out = np.full(len(cond), np.nan)
+    for i in range(len(cond)):
+        hits = [j for j in range(i + 1) if cond[j]]
+        if len(hits) > occurrence:
+            out[i] = src[hits[-1 - occurrence]]
+    return out
+
+def test_indicators_match_bar_by_bar_definition():
+    close = ohlc()["Close"].to_numpy()
+    np.testing.assert_allclose(ta_ema(close, 20), loop_ewm(close, 20, 2 / 21), rtol=1e-12)
+    np.testing.assert_allclose(ta_rma(close, 14), loop_ewm(close, 14, 1 / 14), rtol=1e-12)
+    np.testing.assert_allclose(ta_rsi(close, 14), loop_rsi(close, 14), rtol=1e-10)
+    cond = close > ta_ema(close, 10)
+    np.testing.assert_array_equal(ta_valuewhen(cond, close, 1), loop_valuewhen(cond, close, 1))
+
+def test_history_and_inputs():
+    data = ohlc(50)
+    src = 'n = input.int(3, "Length")\nup = close > close[n]\nprev = close[1]'
+    result = run_pine(src, data, {"Length": 5})
+    close = data["Close"].to_numpy()
+    np.testing.assert_array_equal(result["up"].to_numpy()[5:], close[5:] > close[:-5])
+    assert np.isnan(result["prev"].iloc[0]) and result["prev"].iloc[1] == close[0]
+
+def test_strategy_script_runs():
+    result = run_pine_file(os.path.join(os.path.dirname(__file__), "ema_rsi_strategy.pine"), ohlc(), {"rsiOverbought": 65})
+    assert "buyCondition" in result and len(result) == 300
+
+@pytest.mark.parametrize("src", [
+    # 逐根遞迴 (running max)：向量化會算出錯的值，必須報錯
+    "hh = high\nhh := hh[1] > high ? hh[1] : high",
+    "var float cnt = 0\ncnt := cnt[1] + 1",
+    "x = close\nx = high",
+    'n = input.int(3, "N")\nx = n[1]',
+    "if close > open\n    x = close",
+])
+def test_unsupported_statements_raise(src):
+    with pytest.raises(ValueError):
+        run_pine(src, ohlc(20))
+
+def test_plots_inside_if_are_ignored():
+    result = run_pine('c = close > open\nif c\n    label.new(bar_index, low, "B")', ohlc(20))
+    assert list(result.columns) == ["c"]
@@ -0,0 +1,73 @@
+import math
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("yfinance")
+pytest.importorskip("talib")
+pytest.importorskip("matplotlib")
+import strategy_optimizer as so
+
+def gold_prices(n=1500, seed=1):
+    rng = np.random.default_rng(seed)
+    close = pd.Series(1500 * np.exp(np.cumsum(rng.normal(0.0003, 0.01, n))),
+                      index=pd.date_range("2012-01-02", periods=n, freq="B"))
+    return pd.DataFrame({"Open": close, "High": close * 1.005, "Low": close * 0.995, "Close": close})
+
+@pytest.fixture(autouse=True)
+def cache_in_tmp(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)          # indicator_cache 的硬碟快取寫在目前目錄
+
+def test_from_unit_keeps_parameters_consistent():
+    rng = np.random.default_rng(0)
+    for _ in range(200):
+        p = so.from_unit(rng.random(len(so.SPACE)) * 1.4 - 0.2)
+        assert p["fast_period"] < p["slow_period"]
+        assert p["rsi_target_min"] <= p["rsi_target_max"] <= p["rsi_overbought"]
+        for k, (lo, hi, is_int) in so.SPACE.items():
+            assert lo <= p[k] <= hi + (1 if is_int else 0)
+
+def test_holdout_bars_never_reach_the_optimizer():
+    data = gold_prices()
+    in_sample, start = so.split_holdout(data)
+    assert start == len(in_sample) == len(data) - int(len(data) * so.HOLDOUT_FRAC)
+
+    # 改掉樣本外的價格，最佳化結果必須完全相同
+    changed = data.copy()
+    changed.iloc[start:] *= np.linspace(0.5, 3.0, len(data) - start)[:, None]
+    kwargs = {"method": "random", "n_trials": 12, "workers": 1, "prune": False}
+    a, best_a = so.optimize(data, **kwargs)
+    b, best_b = so.optimize(changed, **kwargs)
+    pd.testing.assert_frame_equal(a, b)
+    assert best_a == best_b
+
+def test_out_of_sample_summary_only_counts_later_entries():
+    data = gold_prices()
+    _, start = so.split_holdout(data)
+    signals = so.strategy_signals(data, so.DEFAULT_PARAMS)
+    entries = np.flatnonzero(signals["Buy_Signal"].to_numpy(dtype=bool))
+    oos = so.trade_returns(signals, start)
+    assert len(oos) <= (entries >= start).sum()
+    assert so.summarize(data, so.DEFAULT_PARAMS, start)["交易次數"] == len(oos)
+
+def test_too_few_trades_scores_minus_infinity(monkeypatch):
+    data = gold_prices(600)
+    result = so.evaluate_params(data, so.DEFAULT_PARAMS)
+    assert result["state"] == "complete" and math.isfinite(result["value"])
+    monkeypatch.setattr(so, "MIN_TRADES", result["trades"] + 1)
+    assert so.evaluate_params(data, so.DEFAULT_PARAMS)["value"] == -math.inf
+    assert so.min_trades(10 * so.BARS_PER_YEAR) == max(so.MIN_TRADES, 10)
+
+def test_pool_matches_serial_for_random_search():
+    data = gold_prices()
+    kwargs = {"method": "random", "n_trials": 10, "prune": False}
+    serial, _ = so.optimize(data, workers=1, **kwargs)
+    pooled, _ = so.optimize(data, workers=2, **kwargs)
+    pd.testing.assert_frame_equal(serial, pooled)
+
+@pytest.mark.parametrize("method", ["tpe", "evolution"])
+def test_samplers_finish_requested_trials(method):
+    table, best = so.optimize(gold_prices(), method=method, n_trials=30, workers=1)
+    assert table["number"].tolist() == list(range(30))
+    assert set(table["state"]) <= {"complete", "pruned"}
+    assert set(best) == set(so.SPACE)
@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from streaming_stats import ColumnSummary, merge_summaries, summarize_chunks, summarize_csv_files, summarize_frame
+
+def prices(n=5000, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 2000 + np.cumsum(rng.normal(0, 5, n))
+    close[rng.integers(0, n, 50)] = np.nan
+    return pd.DataFrame({'Close': close, 'Volume': rng.integers(100, 1000, n).astype(float)},
+                        index=pd.date_range("2024-01-01", periods=n, freq="min"))
+
+def test_chunked_summary_matches_pandas():
+    data = prices()
+    chunks = (data.iloc[i:i + 333] for i in range(0, len(data), 333))
+    summary = summarize_chunks(chunks, ['Close', 'Volume'])['Close']
+    close = data['Close']
+    assert summary.count == close.count()
+    assert summary.mean == pytest.approx(close.mean(), rel=1e-12)
+    assert summary.std == pytest.approx(close.std(), rel=1e-9)
+    assert summary.sum == pytest.approx(close.sum(), rel=1e-12)
+    assert (summary.min, summary.argmin) == (close.min(), close.idxmin())
+    assert (summary.max, summary.argmax) == (close.max(), close.idxmax())
+    # t-digest 近似：四分位數誤差在 0.5% 排名以內
+    for q in (0.25, 0.5, 0.75):
+        assert abs((close < summary.digest.quantile(q)).mean() / (1 - close.isna().mean()) - q) < 0.005
+
+def test_merged_histogram_equals_single_pass():
+    data = prices()
+    whole = ColumnSummary().update(data['Close'])
+    parts = [ColumnSummary().update(data['Close'].iloc[i:i + 700]) for i in range(0, len(data), 700)]
+    merged = parts[0]
+    for part in parts[1:]:
+        merged.merge(part)
+    np.testing.assert_array_equal(merged.histogram.edges, whole.histogram.edges)
+    np.testing.assert_array_equal(merged.histogram.counts, whole.histogram.counts)
+    assert merged.histogram.counts.sum() == data['Close'].count()
+
+def test_incremental_update_continues_summary():
+    data = prices()
+    summaries = summarize_frame(data.iloc[:4000], ['Close'])
+    summaries = summarize_frame(data.iloc[4000:], ['Close'], summaries)
+    assert summaries['Close'].mean == pytest.approx(data['Close'].mean(), rel=1e-12)
+
+def test_csv_files_report_file_and_row(tmp_path):
+    data = prices().reset_index(drop=True)
+    paths = []
+    for k in range(3):
+        path = str(tmp_path / f"{k}.csv")
+        data.iloc[k * 1500:(k + 1) * 1500].reset_index(drop=True).to_csv(path, index=False)
+        paths.append(path)
+    stats = summarize_csv_files(paths, ['Close'], chunksize=400, workers=2)['Close']
+    top, bottom = data['Close'].iloc[:4500].idxmax(), data['Close'].iloc[:4500].idxmin()
+    assert stats.argmax == (paths[top // 1500], top % 1500)
+    assert stats.argmin == (paths[bottom // 1500], bottom % 1500)
+    assert stats.count == data['Close'].iloc[:4500].count()
+
+def test_empty_inputs(tmp_path):
+    with pytest.raises(ValueError, match="沒有指定任何 CSV"):
+        summarize_csv_files([], ['Close'])
+    empty = tmp_path / "empty.csv"
+    empty.write_text("Close\n")
+    stats = summarize_csv_files([str(empty)], ['Close'], workers=1)
+    assert stats['Close'].count == 0 and stats['Close'].argmax is None
+    assert merge_summaries([], ['Close'])['Close'].count == 0
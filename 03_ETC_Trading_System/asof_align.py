@@ -0,0 +1,151 @@
+import numpy as np
+import pandas as pd
+
+# =====================
+# 參數
+# =====================
+# 各來源 K 線「標示時間」到「可以使用的時間」的延遲 (避免看到未來資料)：
+# - ccxt 的 K 線以開盤時間標示，1h K 線要到下一小時才收完
+# - yfinance 日 K 以交易所當地 00:00 標示，收盤後才知道當天的收盤價
+BAR_LAG = {
+    "1h": pd.Timedelta("1h"),
+    "TW_DAILY": pd.Timedelta("13h30min"),      # 台股 13:30 收盤 (Asia/Taipei)
+    "COMEX_DAILY": pd.Timedelta("17h"),        # GC=F / HG=F 17:00 收盤 (America/New_York)
+}
+UNIT_NS = {"s": 1_000_000_000, "ms": 1_000_000, "us": 1_000, "ns": 1}
+
+# =====================
+# 時間轉換
+# =====================
+def to_ns(times, tz=None, unit=None):
+    """
+    任何時間表示 → UTC 的 int64 奈秒陣列 (之後所有對齊都只用這個陣列，不再建 pandas index)。
+    - unit 給定時 times 為整數 epoch，例如 ccxt 的 timestamp (unit="ms")
+    - 有時區的 DatetimeIndex / Series 直接換算成 UTC
+    - 沒有時區的時間視為 tz (預設 UTC，同 ETC.py 的 pd.to_datetime(..., unit="ms"))
+    """
+    if unit is not None:
+        return np.asarray(times, dtype=np.int64) * UNIT_NS[unit]
+    idx = pd.DatetimeIndex(times)
+    if idx.tz is None:
+        idx = idx.tz_localize(tz or "UTC")
+    return idx.as_unit("ns").asi8
+
+def _check_sorted(times, name):
+    if len(times) > 1 and (np.diff(times) < 0).any():
+        raise ValueError(f"{name} 的時間必須由舊到新排序")
+
+# =====================
+# as-of 對齊
+# =====================
+def asof_indexer(left, right, tolerance=None, limit=None, allow_exact=True):
+    """
+    left、right 為已排序的 int64 奈秒陣列。回傳長度同 left 的位置陣列：
+    right 中時間 <= left[i] 的最後一筆 (allow_exact=False 時為 < left[i])，沒有符合的為 -1。
+    - tolerance：最多往回找多久 (奈秒整數或 Timedelta)，超過視為沒有資料
+    - limit：同一筆 right 最多再沿用幾列 left (0 = 只有第一列對到它的 left 使用，同 ffill 的 limit)
+    right 比 left 短時 (例如日 K 對到分 K 時間軸)，改為把 right 二分搜尋進 left 再累加個數 (merge-walk)，
+    成本 O(len(right) · log len(left) + len(left))；否則直接對每個 left 二分搜尋 right。
+    """
+    if len(right) < len(left):
+        # right[j] <= left[i] 等同 i >= p[j]，p[j] 為 left 中第一個 >= right[j] (不含等於時為 >) 的位置
+        p = np.searchsorted(left, right, side="left" if allow_exact else "right")
+        idx = np.cumsum(np.bincount(p, minlength=len(left) + 1)[:len(left)]) - 1
+    else:
+        idx = np.searchsorted(right, left, side="right" if allow_exact else "left") - 1
+    if tolerance is not None:
+        tol = pd.Timedelta(tolerance).value if not isinstance(tolerance, (int, np.integer)) else int(tolerance)
+        found = idx >= 0
+        too_old = np.zeros(len(idx), dtype=bool)
+        too_old[found] = left[found] - right[idx[found]] > tol
+        idx[too_old] = -1
+    if limit is not None and len(idx):
+        # 每段連續對到同一筆 right 的 left，依序編號 0, 1, 2...，超過 limit 的不使用
+        pos = np.arange(len(idx))
+        first = np.r_[True, idx[1:] != idx[:-1]]
+        rank = pos - np.maximum.accumulate(np.where(first, pos, 0))
+        idx[rank > limit] = -1
+    return idx
+
+class AsofSource:
+    """
+    一個要對齊的資料來源：排序好的 UTC 奈秒時間、(筆數 × 欄位) 的數值與欄位名稱
+    (內部以欄位為主存放，每個欄位是連續記憶體)。
+    lag 為資料可用的延遲 (見 BAR_LAG)；tolerance / limit 未指定時使用 build_feature_matrix 的設定。
+    """
+
+    def __init__(self, name, times, values, columns, lag=None, tolerance=None, limit=None):
+        self.name = name
+        self.times = np.asarray(times, dtype=np.int64)
+        if lag is not None:
+            self.times = self.times + pd.Timedelta(lag).value
+        values = np.asarray(values, dtype=np.float64)
+        self.values = np.ascontiguousarray(values.reshape(len(values), len(columns)).T)
+        self.columns = [f"{name}_{c}" for c in columns]
+        self.tolerance = tolerance
+        self.limit = limit
+        if len(self.times) != self.values.shape[1]:
+            raise ValueError(f"{name}: 時間與數值筆數不同")
+        _check_sorted(self.times, name)
+
+    @classmethod
+    def from_frame(cls, name, df, columns=None, time_col=None, unit=None, tz=None, lag=None, **kwargs):
+        """
+        由 DataFrame 建立 (只在這裡轉換一次時間)：
+        time_col 為 None 時使用 index；ccxt 格式可用 time_col="timestamp", unit="ms"。
+        """
+        times = df.index if time_col is None else df[time_col].to_numpy()
+        columns = list(columns) if columns is not None else [c for c in df.columns if c != time_col]
+        return cls(name, to_ns(times, tz=tz, unit=unit), df[columns].to_numpy(dtype=np.float64), columns,
+                   lag=lag, **kwargs)
+
+def build_feature_matrix(grid, sources, tolerance=None, limit=None):
+    """
+    grid：目標時間軸 (排序好的 UTC 奈秒)；sources：AsofSource 清單。
+    每個來源各做一次 as-of 對齊，結果放進同一個 (len(grid) × 總欄位數) float64 矩陣，沒有資料為 NaN。
+    矩陣以欄位為主 (Fortran order)：每個欄位連續寫入，轉成 DataFrame 時也不必重排。
+    回傳 (矩陣, 欄位名稱)。
+    """
+    grid = np.asarray(grid, dtype=np.int64)
+    _check_sorted(grid, "grid")
+    n_cols = sum(len(s.columns) for s in sources)
+    out = np.empty((n_cols, len(grid)))
+    columns = []
+    col = 0
+    for s in sources:
+        tol = s.tolerance if s.tolerance is not None else tolerance
+        lim = s.limit if s.limit is not None else limit
+        idx = asof_indexer(grid, s.times, tol, lim)
+        missing = idx < 0
+        any_missing = missing.any()
+        safe = np.maximum(idx, 0) if any_missing else idx
+        for values in s.values:
+            if len(values):
+                np.take(values, safe, out=out[col])
+            if any_missing:
+                out[col][missing] = np.nan
+            col += 1
+        columns += s.columns
+    return out.T, columns
+
+def to_frame(grid, matrix, columns, tz=None):
+    """ 需要 DataFrame 時才轉換 (tz 給定時把索引換成當地時間) """
+    index = pd.DatetimeIndex(np.asarray(grid, dtype="datetime64[ns]"), name="datetime").tz_localize("UTC")
+    if tz is not None:
+        index = index.tz_convert(tz)
+    return pd.DataFrame(matrix, index=index, columns=columns)
+
+def align_frames(grid, frames, columns=("close",), tolerance=None, limit=None):
+    """
+    方便用法：frames 為 {名稱: (DataFrame, from_frame 的參數 dict)}，
+    例如 {"ETC": (etc_df, {"time_col": "timestamp", "unit": "ms", "lag": BAR_LAG["1h"]}),
+          "GC": (gold_df, {"columns": ["Close"], "lag": BAR_LAG["COMEX_DAILY"]})}。
+    grid 可為任何時間表示 (會轉成 UTC 奈秒)。回傳 DataFrame (UTC 索引)。
+    """
+    grid = grid if isinstance(grid, np.ndarray) and grid.dtype == np.int64 else to_ns(grid)
+    sources = []
+    for name, (df, kwargs) in frames.items():
+        kwargs = {"columns": columns, **kwargs}
+        sources.append(AsofSource.from_frame(name, df, **kwargs))
+    matrix, names = build_feature_matrix(grid, sources, tolerance, limit)
+    return to_frame(grid, matrix, names)
@@ -0,0 +1,218 @@
+import csv
+import time
+import numpy as np
+import pandas as pd
+from strategy import rolling_mean
+from trade_engine import _find_exit
+from performance_metrics import EquityMetrics
+
+# =====================
+# 參數
+# =====================
+DATA_FILE = "ohlcv_1m.csv"       # 欄位同 ETC.py：timestamp, open, high, low, close, volume
+CHUNK_ROWS = 500_000
+INITIAL_CAPITAL = 10000
+RISK_PER_TRADE = 0.01
+TAKE_PROFIT_PCT = 0.02
+RSI_WINDOW = 14
+WARMUP = 59                        # MA60 需要前 59 根收盤價
+
+# =====================
+# 指標 (跨區塊延續狀態)
+# =====================
+def new_indicator_state():
+    return {"tail": np.empty(0), "prev_close": np.nan, "ema_up": None, "ema_dn": None, "nobs": 0}
+
+def _continue_ewm(values, last):
+    """ 接著上一段的結果繼續算 ewm(adjust=False)；把上一段最後的值放在最前面，結果與整段一次算完全相同 """
+    alpha = 1 / RSI_WINDOW
+    if last is None:
+        return pd.Series(values).ewm(alpha=alpha, adjust=False).mean().to_numpy()
+    return pd.Series(np.r_[last, values]).ewm(alpha=alpha, adjust=False).mean().to_numpy()[1:]
+
+def compute_signals(close, st, rsi_long=55, rsi_short=45):
+    """ 與 strategy.apply_strategy 相同的 ma20 / ma60 / rsi / signal，st 為上一個區塊留下的暖機狀態 """
+    n = len(close)
+    buf = np.concatenate([st["tail"], close])
+    ma20 = rolling_mean(buf, 20)[-n:]
+    ma60 = rolling_mean(buf, 60)[-n:]
+
+    # RSI：同 ta.momentum.RSIIndicator (Wilder 平滑，min_periods = 14)
+    diff = close - np.r_[st["prev_close"], close[:-1]]
+    up = np.where(diff > 0, diff, 0.0)
+    dn = -np.where(diff < 0, diff, 0.0)
+    ema_up = _continue_ewm(up, st["ema_up"])
+    ema_dn = _continue_ewm(dn, st["ema_dn"])
+    ready = st["nobs"] + np.arange(n) + 1 >= RSI_WINDOW
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rsi = np.where(ema_dn == 0, 100, 100 - (100 / (1 + ema_up / ema_dn)))
+    rsi = np.where(ready, rsi, np.nan)
+
+    signal = np.zeros(n, dtype=np.int64)
+    signal[(ma20 > ma60) & (rsi > rsi_long)] = 1
+    signal[(ma20 < ma60) & (rsi < rsi_short)] = -1
+
+    st.update({
+        "tail": buf[-WARMUP:],
+        "prev_close": close[-1],
+        "ema_up": ema_up[-1],
+        "ema_dn": ema_dn[-1],
+        "nobs": st["nobs"] + n,
+    })
+    return signal
+
+# =====================
+# 回測 (跨區塊延續持倉)
+# =====================
+def new_backtest_state(capital=INITIAL_CAPITAL):
+    return {"capital": capital, "open": None}
+
+def _close_position(bt, pos, exit_price, risk_per_trade):
+    capital = bt["capital"]
+    risk_amount = capital * risk_per_trade
+    position_size = risk_amount / (pos["entry"] * risk_per_trade)
+    if pos["side"] == 1:
+        pnl = (exit_price - pos["entry"]) * position_size
+    else:
+        pnl = (pos["entry"] - exit_price) * position_size
+    bt["capital"] = capital + pnl
+    bt["open"] = None
+    return {"datetime": pos["datetime"], "type": "LONG" if pos["side"] == 1 else "SHORT",
+            "entry": pos["entry"], "exit": exit_price, "pnl": pnl}
+
+def backtest_chunk(bt, high, low, close, signal, times, last_chunk,
+                   risk_per_trade=RISK_PER_TRADE, take_profit_pct=TAKE_PROFIT_PCT):
+    """ 與 trade_engine.fixed_stop_backtest 相同的規則；區塊結束時還沒出場的部位留到下一個區塊 """
+    n = len(close)
+    trades, equity = [], []
+    active = np.flatnonzero(signal)
+    i = 0
+
+    while True:
+        pos = bt["open"]
+        if pos is None:
+            k = np.searchsorted(active, i)
+            nxt = int(active[k]) if k < len(active) else n
+            equity.extend([bt["capital"]] * (nxt - i))
+            if nxt == n:
+                break
+            i = nxt
+            side = 1 if signal[i] > 0 else -1
+            entry = close[i]
+            if side == 1:
+                stop_loss_price, take_profit_price = entry * (1 - risk_per_trade), entry * (1 + take_profit_pct)
+            else:
+                stop_loss_price, take_profit_price = entry * (1 + risk_per_trade), entry * (1 - take_profit_pct)
+            pos = bt["open"] = {"side": side, "entry": entry, "datetime": times[i],
+                                "stop": stop_loss_price, "target": take_profit_price}
+            i += 1
+
+        j, stop_hit, _ = _find_exit(high, low, i, pos["side"], pos["stop"], pos["target"])
+        if j < 0:
+            if last_chunk:
+                trades.append(_close_position(bt, pos, close[-1], risk_per_trade))
+                equity.append(bt["capital"])
+            break
+        trades.append(_close_position(bt, pos, pos["stop"] if stop_hit else pos["target"], risk_per_trade))
+        equity.append(bt["capital"])
+        i = j + 1
+
+    return trades, equity
+
+# =====================
+# 主流程
+# =====================
+def _read_chunks(path, chunk_rows):
+    for chunk in pd.read_csv(path, chunksize=chunk_rows):
+        if "datetime" in chunk:
+            chunk["datetime"] = pd.to_datetime(chunk["datetime"])
+        else:
+            chunk["datetime"] = pd.to_datetime(chunk["timestamp"], unit="ms")
+        yield chunk
+
+def run_pipeline(chunks, capital=INITIAL_CAPITAL, risk_per_trade=RISK_PER_TRADE, take_profit_pct=TAKE_PROFIT_PCT,
+                 trade_log_path="trade_log_chunked.csv", equity_path=None):
+    """
+    chunks 為依時間排序的 DataFrame 區塊 (可用 _read_chunks 從硬碟串流讀入)。
+    交易紀錄與 (可選的) equity 逐塊寫出，記憶體只跟區塊大小有關。
+    回傳最終資金、交易數與績效指標。
+    """
+    ind = new_indicator_state()
+    bt = new_backtest_state(capital)
+    metrics = EquityMetrics()
+    metrics.update([capital])
+    n_trades = 0
+
+    trade_file = open(trade_log_path, "w", newline="")
+    writer = csv.DictWriter(trade_file, fieldnames=["datetime", "type", "entry", "exit", "pnl"])
+    writer.writeheader()
+    equity_file = open(equity_path, "w") if equity_path else None
+    if equity_file:
+        equity_file.write(f"{float(capital)!r}\n")
+
+    try:
+        chunks = iter(chunks)
+        chunk = next(chunks, None)
+        while chunk is not None:
+            following = next(chunks, None)   # 先讀下一塊才知道是不是最後一塊
+            close = chunk["close"].to_numpy(dtype=np.float64)
+            signal = compute_signals(close, ind)
+            trades, equity = backtest_chunk(
+                bt, chunk["high"].to_numpy(dtype=np.float64), chunk["low"].to_numpy(dtype=np.float64),
+                close, signal, chunk["datetime"].array, following is None, risk_per_trade, take_profit_pct,
+            )
+            writer.writerows(trades)
+            n_trades += len(trades)
+            if equity:
+                metrics.update(equity)
+                if equity_file:
+                    equity_file.writelines(f"{float(v)!r}\n" for v in equity)
+            chunk = following
+    finally:
+        trade_file.close()
+        if equity_file:
+            equity_file.close()
+
+    return {"final_capital": float(bt["capital"]), "trades": n_trades,
+            **{k: v.item() for k, v in metrics.result().items()}}
+
+def replay_latency(df, bars_per_tick=1, capital=INITIAL_CAPITAL,
+                   risk_per_trade=RISK_PER_TRADE, take_profit_pct=TAKE_PROFIT_PCT):
+    """
+    模擬即時行情：每次只送 bars_per_tick 根新 K 線進指標與回測，
+    回傳每次「收到資料 → 完成決策」的延遲 p50 / p99 (ms)、每秒處理 K 線數與交易結果 (與一次回測相同)。
+    """
+    ind = new_indicator_state()
+    bt = new_backtest_state(capital)
+    high = df["high"].to_numpy(dtype=np.float64)
+    low = df["low"].to_numpy(dtype=np.float64)
+    close = df["close"].to_numpy(dtype=np.float64)
+    times = df["datetime"].array
+    n = len(df)
+
+    latencies, trades = [], []
+    started = time.perf_counter()
+    for start in range(0, n, bars_per_tick):
+        end = min(start + bars_per_tick, n)
+        t0 = time.perf_counter()
+        signal = compute_signals(close[start:end], ind)
+        new_trades, _ = backtest_chunk(bt, high[start:end], low[start:end], close[start:end], signal,
+                                       times[start:end], end == n, risk_per_trade, take_profit_pct)
+        latencies.append(time.perf_counter() - t0)
+        trades.extend(new_trades)
+    elapsed = time.perf_counter() - started
+
+    ms = np.asarray(latencies) * 1000
+    return {"bars": n, "seconds": elapsed, "bars_per_sec": n / elapsed if elapsed else float("inf"),
+            "p50_ms": float(np.percentile(ms, 50)) if n else float("nan"),
+            "p99_ms": float(np.percentile(ms, 99)) if n else float("nan"),
+            "trades": len(trades), "final_capital": float(bt["capital"])}
+
+if __name__ == "__main__":
+    result = run_pipeline(_read_chunks(DATA_FILE, CHUNK_ROWS), equity_path="equity_chunked.csv")
+    print("====== ETC 分段回測 ======")
+    print(f"初始資金: {INITIAL_CAPITAL}")
+    print(f"最終資金: {round(result['final_capital'],2)}")
+    print(f"交易次數: {result['trades']}")
+    print(f"最大回撤: {round(result['max_drawdown']*100,2)}%")
+    print("已輸出 trade_log_chunked.csv 與 equity_chunked.csv")
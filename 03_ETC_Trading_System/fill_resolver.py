@@ -0,0 +1,134 @@
+import os
+import ccxt
+import pandas as pd
+
+# =====================
+# 參數
+# =====================
+SYMBOL = "ETC/USDT"
+BAR_TIMEFRAME = "1h"
+FINE_TIMEFRAME = "1m"
+CACHE_DIR = "intrabar_cache"
+
+# =====================
+# 盤中成交順序判定
+# =====================
+class IntrabarResolver:
+    """
+    一根 K 線同時碰到停損與停利時，只對這一根抓更細的 K 線 (例如 1m)，
+    找出實際先碰到哪一個價位。細 K 線依序從記憶體、本地快取、MultiTimeframeStore、交易所取得，
+    抓過的區間會存進 cache_dir，下次回測不必再下載。
+    細 K 線仍無法分辨 (同一根 1m 兩邊都碰到) 時維持保守的「停損先成交」。
+    只有涵蓋整根大 K (第一根與最後一根細 K 都在) 且該根已收盤的結果才寫入快取；
+    空的或不完整的結果 (交易所異常、K 線還在形成) 只用於這次，下次重新取得。
+    """
+
+    def __init__(self, bar_times, symbol=SYMBOL, bar_timeframe=BAR_TIMEFRAME, fine_timeframe=FINE_TIMEFRAME,
+                 cache_dir=CACHE_DIR, store=None, exchange=None):
+        self.bar_times = pd.DatetimeIndex(bar_times)
+        self.symbol = symbol
+        self.bar_delta = pd.Timedelta(ccxt.Exchange.parse_timeframe(bar_timeframe), unit="s")
+        self.fine_timeframe = fine_timeframe
+        self.fine_delta = pd.Timedelta(ccxt.Exchange.parse_timeframe(fine_timeframe), unit="s")
+        self.cache_dir = cache_dir
+        self.store = store
+        self.exchange = exchange
+        self._memory = {}
+        self.stats = {"ambiguous": 0, "stop_first": 0, "target_first": 0, "unresolved": 0, "fetched": 0}
+
+    def __call__(self, index, side, stop_loss_price, take_profit_price):
+        """ 回傳 True 表示停損先成交 """
+        self.stats["ambiguous"] += 1
+        fine = self.load(self.bar_times[index])
+
+        if side == 1:
+            stop_hit = fine["low"].to_numpy() <= stop_loss_price
+            target_hit = fine["high"].to_numpy() >= take_profit_price
+        else:
+            stop_hit = fine["high"].to_numpy() >= stop_loss_price
+            target_hit = fine["low"].to_numpy() <= take_profit_price
+
+        hit = stop_hit | target_hit
+        if not hit.any():
+            self.stats["unresolved"] += 1
+            return True
+        k = hit.argmax()
+        if stop_hit[k] and target_hit[k]:
+            self.stats["unresolved"] += 1
+            return True
+        if stop_hit[k]:
+            self.stats["stop_first"] += 1
+            return True
+        self.stats["target_first"] += 1
+        return False
+
+    # --- 多行程 (sharded_backtest) ---
+    def checkpoint(self):
+        """ 記下目前已取得的細 K 線與統計，之後以 changes_since 取出新增的部分 """
+        return set(self._memory), dict(self.stats)
+
+    def changes_since(self, checkpoint):
+        """ checkpoint 之後新取得的細 K 線與統計增量 (worker 行程交回主行程用) """
+        known, stats = checkpoint
+        memory = {start: fine for start, fine in self._memory.items() if start not in known}
+        return memory, {k: v - stats.get(k, 0) for k, v in self.stats.items()}
+
+    def absorb(self, changes):
+        """ 合併其他行程 changes_since 的結果：細 K 線放進記憶體，統計相加 """
+        memory, stats = changes
+        for start, fine in memory.items():
+            self._memory.setdefault(start, fine)
+        for k, v in stats.items():
+            self.stats[k] = self.stats.get(k, 0) + v
+
+    def _cache_path(self, start):
+        name = f"{self.symbol.replace('/', '')}_{self.fine_timeframe}_{int(start.value // 1_000_000)}.pkl"
+        return os.path.join(self.cache_dir, name)
+
+    def load(self, start):
+        """ 取得 [start, start + 一根大 K) 區間內的細 K 線 """
+        start = pd.Timestamp(start)
+        if start in self._memory:
+            return self._memory[start]
+
+        path = self._cache_path(start)
+        if os.path.exists(path):
+            fine = pd.read_pickle(path)
+        else:
+            fine = self._from_store(start)
+            if fine is None:
+                fine = self._fetch(start)
+            if self._complete(start, fine):
+                os.makedirs(self.cache_dir, exist_ok=True)
+                tmp = f"{path}.{os.getpid()}.tmp"
+                fine.to_pickle(tmp)
+                os.replace(tmp, path)
+
+        self._memory[start] = fine
+        return fine
+
+    def _complete(self, start, fine):
+        """ 細 K 線涵蓋 [start, start + 一根大 K) 的頭尾，且這根大 K 已經收盤 """
+        end = start + self.bar_delta
+        now = pd.Timestamp.now(tz="UTC").tz_localize(None)   # 與 ETC.py 相同，K 線時間為沒有時區的 UTC
+        if len(fine) == 0 or end > now:
+            return False
+        return fine.index[0] <= start and fine.index[-1] >= end - self.fine_delta
+
+    def _from_store(self, start):
+        if self.store is None:
+            return None
+        base = self.store.get(self.fine_timeframe)
+        fine = base[(base.index >= start) & (base.index < start + self.bar_delta)]
+        return fine if len(fine) else None
+
+    def _fetch(self, start):
+        self.exchange = self.exchange or ccxt.binance()
+        limit = int(self.bar_delta / self.fine_delta)
+        rows = self.exchange.fetch_ohlcv(self.symbol, timeframe=self.fine_timeframe,
+                                         since=int(start.value // 1_000_000), limit=limit)
+        self.stats["fetched"] += 1
+
+        fine = pd.DataFrame(rows, columns=["timestamp","open","high","low","close","volume"])
+        fine.index = pd.to_datetime(fine.pop("timestamp"), unit="ms")
+        return fine[fine.index < start + self.bar_delta]
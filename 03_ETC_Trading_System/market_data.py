@@ -0,0 +1,38 @@
+import ccxt
+import pandas as pd
+
+# =====================
+# 參數
+# =====================
+SYMBOL = "ETC/USDT"
+TIMEFRAME = "1h"
+START_DATE = "2024-01-01T00:00:00Z"
+END_DATE = "2025-12-31"
+PAGE_LIMIT = 1000
+
+# =====================
+# 抓資料 (分頁)
+# =====================
+def fetch_ohlcv(symbol=SYMBOL, timeframe=TIMEFRAME, start=START_DATE, end=END_DATE, exchange=None, limit=PAGE_LIMIT):
+    """
+    分頁抓取 start ~ end 的 K 線 (單次 fetch_ohlcv 有筆數上限)，
+    回傳與 ETC.py 相同欄位的 DataFrame：timestamp, open, high, low, close, volume, datetime
+    """
+    exchange = exchange or ccxt.binance()
+    since = exchange.parse8601(start)
+    end_ms = int(pd.Timestamp(end).value // 1_000_000)
+
+    rows = []
+    while since <= end_ms:
+        batch = exchange.fetch_ohlcv(symbol, timeframe=timeframe, since=since, limit=limit)
+        if not batch:
+            break
+        rows.extend(batch)
+        since = batch[-1][0] + 1
+        if len(batch) < limit:
+            break
+
+    df = pd.DataFrame(rows, columns=["timestamp","open","high","low","close","volume"])
+    df = df.drop_duplicates("timestamp").reset_index(drop=True)
+    df["datetime"] = pd.to_datetime(df["timestamp"], unit="ms")
+    return df[df["datetime"] <= end].reset_index(drop=True)
@@ -0,0 +1,117 @@
+import os
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+
+# =====================
+# 參數
+# =====================
+TRADE_LOG = "trade_log.csv"
+INITIAL_CAPITAL = 10000
+N_PATHS = 100_000
+CHUNK_SIZE = 10_000      # 每個區塊的路徑數 (控制記憶體用量)
+BLOCK_LENGTH = 10        # block bootstrap 的區塊長度
+SEED = 42
+METHODS = ("iid", "block", "shuffle")
+
+# =====================
+# 交易報酬
+# =====================
+def trade_returns(trade_log, initial_capital=INITIAL_CAPITAL):
+    """ 把 trade_log 的絕對損益換回每筆交易的報酬率 (pnl / 進場前資金) """
+    pnl = trade_log["pnl"].to_numpy(dtype=np.float64)
+    capital_before = initial_capital + np.concatenate(([0.0], np.cumsum(pnl)[:-1]))
+    return pnl / capital_before
+
+# =====================
+# 重抽樣
+# =====================
+def resample_returns(returns, n_paths, method, rng, block_length=BLOCK_LENGTH):
+    """ 回傳 (n_paths × 交易數) 的報酬矩陣 """
+    n = len(returns)
+    if n == 0:
+        raise ValueError("沒有任何交易，無法重抽樣")
+    if method == "iid":
+        idx = rng.integers(0, n, size=(n_paths, n))
+    elif method == "block":
+        # 環狀 block bootstrap：每條路徑由隨機起點的連續區塊拼成
+        n_blocks = -(-n // block_length)
+        starts = rng.integers(0, n, size=(n_paths, n_blocks, 1))
+        idx = ((starts + np.arange(block_length)) % n).reshape(n_paths, -1)[:, :n]
+    elif method == "shuffle":
+        idx = rng.permuted(np.tile(np.arange(n), (n_paths, 1)), axis=1)
+    else:
+        raise ValueError(f"未知的重抽樣方法: {method}")
+    return returns[idx]
+
+def simulate_chunk(returns, n_paths, method, seed_seq, initial_capital, scale, block_length):
+    """ 產生一個區塊的權益路徑，只回傳期末資金與最大回撤 """
+    rng = np.random.default_rng(seed_seq)
+    sampled = resample_returns(returns, n_paths, method, rng, block_length)
+
+    equity = np.empty((n_paths, sampled.shape[1] + 1))
+    equity[:, 0] = initial_capital
+    np.cumprod(1 + scale * sampled, axis=1, out=equity[:, 1:])
+    equity[:, 1:] *= initial_capital
+
+    peak = np.maximum.accumulate(equity, axis=1)
+    max_dd = ((equity - peak) / peak).min(axis=1)
+    return equity[:, -1], max_dd
+
+def run_monte_carlo(returns, n_paths=N_PATHS, method="iid", seed=SEED, chunk_size=CHUNK_SIZE,
+                    initial_capital=INITIAL_CAPITAL, scale=1.0, block_length=BLOCK_LENGTH, workers=None):
+    """
+    以重抽樣交易報酬產生 n_paths 條權益路徑。
+    scale 為槓桿倍數：每筆交易的報酬乘上 scale (scale=2 即以兩倍資金的部位進場)。
+    注意 ETC.py 的部位是 資金 / 進場價，RISK_PER_TRADE 只改變停損距離、不改變部位大小，
+    改 RISK_PER_TRADE 的效果要重新回測，不能用 scale 模擬。
+    每個區塊使用由 seed 派生的獨立亂數流，結果與 workers 數量無關。
+    """
+    returns = np.asarray(returns, dtype=np.float64)
+    if len(returns) == 0:
+        raise ValueError("沒有任何交易，無法重抽樣")
+    sizes = [min(chunk_size, n_paths - s) for s in range(0, n_paths, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    args = [(returns, size, method, ss, initial_capital, scale, block_length) for size, ss in zip(sizes, seeds)]
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        results = [simulate_chunk(*a) for a in args]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(simulate_chunk, *zip(*args)))
+
+    final = np.concatenate([r[0] for r in results])
+    max_dd = np.concatenate([r[1] for r in results])
+    return final, max_dd
+
+# =====================
+# 報表
+# =====================
+def summarize(final, max_dd, initial_capital=INITIAL_CAPITAL):
+    pct = [1, 5, 25, 50, 75, 95, 99]
+    table = pd.DataFrame({
+        "期末資金": np.percentile(final, pct),
+        "最大回撤(%)": np.percentile(max_dd * 100, pct),
+    }, index=[f"P{p}" for p in pct])
+    stats = {
+        "虧損機率(%)": (final < initial_capital).mean() * 100,
+        "回撤超過 20% 機率(%)": (max_dd < -0.20).mean() * 100,
+        "回撤超過 50% 機率(%)": (max_dd < -0.50).mean() * 100,
+    }
+    return table, stats
+
+if __name__ == "__main__":
+    trade_log = pd.read_csv(TRADE_LOG)
+    returns = trade_returns(trade_log)
+    if len(returns) == 0:
+        print(f"⚠️ {TRADE_LOG} 沒有任何交易，無法模擬")
+    else:
+        print(f"讀入 {len(returns)} 筆交易，模擬 {N_PATHS:,} 條路徑")
+        for method in METHODS:
+            final, max_dd = run_monte_carlo(returns, method=method)
+            table, stats = summarize(final, max_dd)
+            print(f"\n====== Monte Carlo ({method}) ======")
+            print(table.round(2).to_string())
+            for name, value in stats.items():
+                print(f"{name}: {value:.2f}")
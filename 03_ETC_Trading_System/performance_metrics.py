@@ -0,0 +1,129 @@
+import numpy as np
+
+# =====================
+# 權益曲線績效指標 (單次串流計算)
+# =====================
+class EquityMetrics:
+    """
+    逐段餵入權益曲線 (一維，或 (曲線數 × 時間) 的二維陣列)，只保留每條曲線的累計量，
+    不產生 cummax / drawdown 等中間欄位。可一次評分大量參數掃描的結果。
+    """
+
+    def __init__(self, n_curves=1, periods_per_year=None):
+        self.periods_per_year = periods_per_year
+        self.n_seen = 0
+        self.first = np.full(n_curves, np.nan)
+        self.last = np.full(n_curves, np.nan)
+        # 報酬率的平均與平方差 (Chan 合併公式，分段與一次算結果一致)
+        self.n_returns = 0
+        self.mean = np.zeros(n_curves)
+        self.m2 = np.zeros(n_curves)
+        self.downside_sq = np.zeros(n_curves)
+        self.wins = np.zeros(n_curves)
+        self.losses = np.zeros(n_curves)
+        self.gross_profit = np.zeros(n_curves)
+        self.gross_loss = np.zeros(n_curves)
+        # 回撤
+        self.peak = np.full(n_curves, -np.inf)
+        self.max_dd = np.zeros(n_curves)
+        self.last_peak = np.zeros(n_curves, dtype=np.int64)
+        self.max_dd_duration = np.zeros(n_curves, dtype=np.int64)
+
+    def update(self, equity):
+        block = np.atleast_2d(np.asarray(equity, dtype=np.float64))
+        m = block.shape[1]
+        if m == 0:
+            return
+
+        if self.n_seen == 0:
+            self.first = block[:, 0].copy()
+            ext = block
+        else:
+            ext = np.concatenate([self.last[:, None], block], axis=1)
+
+        # 報酬率統計
+        change = np.diff(ext, axis=1)
+        if change.shape[1]:
+            r = change / ext[:, :-1]
+            nb = r.shape[1]
+            mean_b = r.mean(axis=1)
+            m2_b = ((r - mean_b[:, None]) ** 2).sum(axis=1)
+            n = self.n_returns + nb
+            delta = mean_b - self.mean
+            self.mean = self.mean + delta * nb / n
+            self.m2 = self.m2 + m2_b + delta ** 2 * self.n_returns * nb / n
+            self.n_returns = n
+            self.downside_sq += (np.minimum(r, 0) ** 2).sum(axis=1)
+            self.wins += (change > 0).sum(axis=1)
+            self.losses += (change < 0).sum(axis=1)
+            self.gross_profit += np.where(change > 0, change, 0).sum(axis=1)
+            self.gross_loss -= np.where(change < 0, change, 0).sum(axis=1)
+
+        # 回撤與回撤期間 (距離上一個高點幾期)
+        peak = np.maximum.accumulate(np.concatenate([self.peak[:, None], block], axis=1), axis=1)[:, 1:]
+        self.max_dd = np.minimum(self.max_dd, (block / peak - 1).min(axis=1))
+
+        idx = self.n_seen + np.arange(m)
+        at_peak = np.where(block >= peak, idx, -1)
+        last_peak = np.maximum.accumulate(np.concatenate([self.last_peak[:, None], at_peak], axis=1), axis=1)[:, 1:]
+        self.max_dd_duration = np.maximum(self.max_dd_duration, (idx - last_peak).max(axis=1))
+
+        self.peak = peak[:, -1]
+        self.last_peak = last_peak[:, -1]
+        self.last = block[:, -1].copy()
+        self.n_seen += m
+
+    def result(self):
+        ppy = self.periods_per_year
+        annual = np.sqrt(ppy) if ppy else 1.0
+        n = self.n_returns
+        with np.errstate(divide="ignore", invalid="ignore"):
+            std = np.sqrt(self.m2 / (n - 1)) if n > 1 else np.full_like(self.mean, np.nan)
+            downside = np.sqrt(self.downside_sq / n) if n else np.full_like(self.mean, np.nan)
+            out = {
+                "total_return": self.last / self.first - 1,
+                "mean_return": self.mean,
+                "volatility": std * annual,
+                "sharpe": self.mean / std * annual,
+                "sortino": self.mean / downside * annual,
+                "max_drawdown": self.max_dd,
+                "max_drawdown_duration": self.max_dd_duration,
+                "profit_factor": self.gross_profit / self.gross_loss,
+                "win_rate": self.wins / (self.wins + self.losses),
+            }
+            if ppy and n:
+                out["cagr"] = (self.last / self.first) ** (ppy / n) - 1
+        return out
+
+
+def compute_metrics(equity, periods_per_year=None, block_size=4096):
+    """
+    equity 為一維 (單條) 或二維 (曲線數 × 時間) 權益陣列。
+    periods_per_year 給定時 (例如日線 252、小時線 24*365) Sharpe / Sortino / 波動度會年化並多一個 cagr。
+    一維輸入回傳純量，二維回傳每條曲線一個值的陣列。
+    """
+    equity = np.asarray(equity, dtype=np.float64)
+    curves = np.atleast_2d(equity)
+    acc = EquityMetrics(curves.shape[0], periods_per_year)
+    for start in range(0, curves.shape[1], block_size):
+        acc.update(curves[:, start:start + block_size])
+
+    result = acc.result()
+    if equity.ndim == 1:
+        result = {k: v.item() for k, v in result.items()}
+    return result
+
+
+def trade_stats(pnl):
+    """ 以每筆交易損益計算次數、總損益、勝率與獲利因子 """
+    pnl = np.asarray(pnl, dtype=np.float64)
+    profit = pnl[pnl > 0].sum()
+    loss = -pnl[pnl < 0].sum()
+    return {
+        "trades": len(pnl),
+        "total_pnl": pnl.sum(),
+        "win_rate": (pnl > 0).mean() if len(pnl) else np.nan,
+        "profit_factor": profit / loss if loss else np.inf,
+        "avg_win": pnl[pnl > 0].mean() if (pnl > 0).any() else 0.0,
+        "avg_loss": pnl[pnl < 0].mean() if (pnl < 0).any() else 0.0,
+    }
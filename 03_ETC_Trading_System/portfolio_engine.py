@@ -0,0 +1,194 @@
+import numpy as np
+import pandas as pd
+
+# =====================
+# 參數
+# =====================
+INITIAL_CAPITAL = 10000
+RISK_PER_TRADE = 0.01    # 每筆虧損上限 (佔權益比例)，同 ETC.py
+TAKE_PROFIT_PCT = 0.02
+MARGIN_RATE = 0.1        # 保證金比例 (0.1 = 10 倍槓桿)；可用保證金不足時不開新倉
+
+# =====================
+# 持倉簿 (struct-of-arrays)
+# =====================
+class PositionBook:
+    """
+    所有未平倉部位存成平行的 numpy 陣列 (而不是 list of dict)，
+    每根 K 線的停損停利檢查、市值與曝險都是對整個陣列的向量運算。
+    """
+
+    FIELDS = {
+        "symbol": np.int32, "side": np.int8, "entry_bar": np.int64,
+        "entry": np.float64, "size": np.float64, "stop": np.float64,
+        "target": np.float64, "margin": np.float64,
+    }
+
+    def __init__(self, capacity=1024):
+        self.n = 0
+        for name, dtype in self.FIELDS.items():
+            setattr(self, name, np.empty(capacity, dtype=dtype))
+
+    def _grow(self, need):
+        capacity = len(self.side)
+        if need <= capacity:
+            return
+        while capacity < need:
+            capacity *= 2
+        for name in self.FIELDS:
+            old = getattr(self, name)
+            new = np.empty(capacity, dtype=old.dtype)
+            new[:self.n] = old[:self.n]
+            setattr(self, name, new)
+
+    def view(self, name):
+        return getattr(self, name)[:self.n]
+
+    def add(self, **columns):
+        m = len(columns["side"])
+        self._grow(self.n + m)
+        for name in self.FIELDS:
+            getattr(self, name)[self.n:self.n + m] = columns[name]
+        self.n += m
+
+    def remove(self, mask):
+        """ 移除 mask 為 True 的部位，回傳被移除部位的欄位 (dict of arrays) """
+        removed = {name: self.view(name)[mask].copy() for name in self.FIELDS}
+        keep = ~mask
+        k = int(keep.sum())
+        for name in self.FIELDS:
+            arr = getattr(self, name)
+            arr[:k] = arr[:self.n][keep]
+        self.n = k
+        return removed
+
+# =====================
+# 回測
+# =====================
+def entry_signals(signal, pyramid=False):
+    """
+    pyramid=False：只在訊號出現或翻轉的那根進場 (同一段訊號只開一筆)；
+    pyramid=True：每根有訊號的 K 線都開一筆新倉。
+    """
+    signal = np.asarray(signal, dtype=np.int8)
+    if pyramid:
+        return signal
+    prev = np.zeros_like(signal)
+    prev[:, 1:] = signal[:, :-1]
+    return np.where((signal != 0) & (signal != prev), signal, 0).astype(np.int8)
+
+
+def portfolio_backtest(high, low, close, signal, capital=INITIAL_CAPITAL, risk_per_trade=RISK_PER_TRADE,
+                       take_profit_pct=TAKE_PROFIT_PCT, stop_loss_pct=None, margin_rate=MARGIN_RATE,
+                       pyramid=False):
+    """
+    high / low / close / signal 為 (商品 × K 線) 陣列，同時持有任意數量的部位。
+    規則沿用 ETC.py：收盤價進場，從下一根 K 開始檢查，同一根同時碰到停損停利以停損計；
+    部位大小 = 權益 × risk_per_trade / (進場價 × stop_loss_pct) (stop_loss_pct 預設 = risk_per_trade，同 ETC.py)。
+    新倉依商品順序分配可用保證金 (權益 - 已用保證金)，不足的訊號略過。
+    最後一根 K 線以收盤價平掉所有部位。
+    回傳 (trades DataFrame, 每根 K 線的 DataFrame：equity / cash / unrealized / gross / net 曝險 / 保證金 / 持倉數)。
+    """
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    close = np.asarray(close, dtype=np.float64)
+    n_symbols, n_bars = close.shape
+    stop_loss_pct = risk_per_trade if stop_loss_pct is None else stop_loss_pct
+    entries = entry_signals(signal, pyramid)
+    # 缺值 (商品尚未上市 / 停牌) 以前一根收盤價計算市值
+    mark = pd.DataFrame(close.T).ffill().to_numpy().T
+
+    book = PositionBook()
+    cash = float(capital)
+    closed = []
+    per_bar = np.zeros((n_bars, 7))
+
+    for t in range(n_bars):
+        # 1. 停損停利檢查 (只檢查前一根以前進場的部位)
+        if book.n:
+            sym = book.view("symbol")
+            side = book.view("side")
+            h, l = high[sym, t], low[sym, t]
+            long_ = side == 1
+            stop_hit = np.where(long_, l <= book.view("stop"), h >= book.view("stop"))
+            target_hit = np.where(long_, h >= book.view("target"), l <= book.view("target"))
+            hit = (stop_hit | target_hit) & (book.view("entry_bar") < t)
+            if hit.any():
+                exit_price = np.where(stop_hit, book.view("stop"), book.view("target"))[hit]
+                pos = book.remove(hit)
+                pnl = pos["side"] * (exit_price - pos["entry"]) * pos["size"]
+                cash += pnl.sum()
+                closed.append({**pos, "exit_bar": np.full(len(pnl), t), "exit": exit_price, "pnl": pnl})
+
+        # 2. 市值與曝險
+        sym, side, size = book.view("symbol"), book.view("side"), book.view("size")
+        price = mark[sym, t]
+        unrealized = float((side * (price - book.view("entry")) * size).sum())
+        equity = cash + unrealized
+        margin_used = float(book.view("margin").sum())
+
+        # 3. 新倉 (依可用保證金由前往後分配)
+        new = np.flatnonzero(entries[:, t] != 0)
+        if len(new) and equity > 0:
+            entry = close[new, t]
+            ok = ~np.isnan(entry)
+            new, entry = new[ok], entry[ok]
+            new_side = entries[new, t]
+            size_new = equity * risk_per_trade / (entry * stop_loss_pct)
+            margin_new = size_new * entry * margin_rate
+            # 容許浮點誤差：margin_rate=1 時剛好用滿權益的部位仍可開倉
+            fits = np.cumsum(margin_new) <= (equity - margin_used) * (1 + 1e-9)
+            if fits.any():
+                new, entry, new_side = new[fits], entry[fits], new_side[fits]
+                book.add(
+                    symbol=new, side=new_side, entry_bar=np.full(len(new), t), entry=entry,
+                    size=size_new[fits],
+                    stop=np.where(new_side == 1, entry * (1 - stop_loss_pct), entry * (1 + stop_loss_pct)),
+                    target=np.where(new_side == 1, entry * (1 + take_profit_pct), entry * (1 - take_profit_pct)),
+                    margin=margin_new[fits],
+                )
+                margin_used += float(margin_new[fits].sum())
+
+        notional = book.view("size") * mark[book.view("symbol"), t]
+        per_bar[t] = (equity, cash, unrealized, notional.sum(),
+                      (book.view("side") * notional).sum(), margin_used, book.n)
+
+    # 4. 期末以最後收盤價平倉
+    if book.n:
+        pos = book.remove(np.ones(book.n, dtype=bool))
+        exit_price = mark[pos["symbol"], -1]
+        pnl = pos["side"] * (exit_price - pos["entry"]) * pos["size"]
+        cash += pnl.sum()
+        closed.append({**pos, "exit_bar": np.full(len(pnl), n_bars - 1), "exit": exit_price, "pnl": pnl})
+        per_bar[-1] = (cash, cash, 0.0, 0.0, 0.0, 0.0, 0)
+
+    columns = ["symbol", "side", "entry_bar", "exit_bar", "entry", "exit", "size", "pnl"]
+    if closed:
+        trades = pd.DataFrame({c: np.concatenate([blk[c] for blk in closed]) for c in columns})
+        trades = trades.sort_values(["entry_bar", "symbol"], kind="stable").reset_index(drop=True)
+    else:
+        trades = pd.DataFrame(columns=columns)
+    bars = pd.DataFrame(per_bar, columns=["equity", "cash", "unrealized", "gross_exposure",
+                                          "net_exposure", "margin", "open_positions"])
+    bars["open_positions"] = bars["open_positions"].astype(np.int64)
+    return trades, bars
+
+
+def run_portfolio(frames, **kwargs):
+    """
+    frames: {商品: 含 datetime / high / low / close / signal 欄位的 DataFrame (如 apply_strategy 的輸出)}，
+    依 datetime 對齊後執行 portfolio_backtest；trades 的 symbol 換回商品名稱、K 線加上時間。
+    """
+    symbols = list(frames)
+    panel = {col: pd.concat({s: frames[s].set_index("datetime")[col] for s in symbols}, axis=1).sort_index()
+             for col in ("high", "low", "close", "signal")}
+    signal = panel["signal"].fillna(0).to_numpy().T
+    trades, bars = portfolio_backtest(panel["high"].to_numpy().T, panel["low"].to_numpy().T,
+                                      panel["close"].to_numpy().T, signal, **kwargs)
+    times = panel["close"].index
+    bars.index = times
+    trades["symbol"] = np.array(symbols, dtype=object)[trades["symbol"].to_numpy(dtype=np.int64)]
+    trades["type"] = np.where(trades["side"] == 1, "LONG", "SHORT")
+    trades["entry_time"] = times[trades["entry_bar"].to_numpy(dtype=np.int64)]
+    trades["exit_time"] = times[trades["exit_bar"].to_numpy(dtype=np.int64)]
+    return trades, bars
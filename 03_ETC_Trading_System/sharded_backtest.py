@@ -0,0 +1,246 @@
+import os
+import time
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from market_data import fetch_ohlcv
+from strategy import apply_strategy
+from sparse_signal import as_sparse
+from trade_engine import (scan_fixed_stop_trades, replay_capital, equity_from_trades, fixed_stop_backtest,
+                          backtest, entry_signal, scan_signal_exit_trades, replay_all_in, signal_exit_backtest)
+
+# =====================
+# 參數
+# =====================
+SYMBOL = "ETC/USDT"
+TIMEFRAME = "1m"
+START_DATE = "2024-01-01T00:00:00Z"
+END_DATE = "2025-12-31"
+INITIAL_CAPITAL = 10000
+RISK_PER_TRADE = 0.01
+TAKE_PROFIT_PCT = 0.02
+STOP_LOSS = 0.03         # trade_engine.backtest 的停損 / 停利
+TAKE_PROFIT = 0.06
+SHARDS_PER_WORKER = 4    # 每個行程分到幾段 (段數多一點，各段耗時不均時較平均)
+
+# =====================
+# 時間分段平行回測
+# =====================
+# 兩種回測都適用：
+# - 固定停損停利 (ETC.py 規則，trade_engine.scan_fixed_stop_trades)
+# - 訊號出場的全倉回測 (trade_engine.backtest 規則，trade_engine.scan_signal_exit_trades)
+# 兩者的進出場都只跟訊號、價格、進場價與方向有關，資金只決定部位大小，
+# 所以可以把時間軸切成多段，每段都假設「段首空手」各自在行程中掃描交易，之後再依序串接：
+# - 串接時記錄實際的下一個空手檢查位置 r (上一段最後一筆的出場 + 1，或段首)
+# - r 也是該段掃描時空手經過的位置 (不在該段任何一筆交易的持倉期間內)，之後兩者的狀態相同，
+#   直接採用該段進場位置 >= r 的交易
+# - 否則 (上一段的交易跨進來，而 r 落在該段某筆交易持倉中) 從 r 逐筆重掃，直到回到該段空手經過的位置
+# 最後依序套用資金 (replay_capital / replay_all_in)，結果與 fixed_stop_backtest / backtest 逐位元相同。
+#
+# 02_Gold_Trading_System 的 simulate_trading 不需要分段：只做多、買賣都看訊號，
+# 持倉狀態就是「最近一個買賣訊號是不是買」，整段可以直接向量化 (見該檔)。
+#
+# 掃描交易的部分可以分給各核心，資金套用、equity 與 trade_log 仍是單執行緒，加速上限受這部分限制；
+# 只有一個核心時沒有加速，只多了行程、切段與串接的成本。實際效果請以 `python sharded_backtest.py`
+# 在自己的機器上量測 (會印出逐段依序與分段平行的耗時，以及結果是否相同)。
+
+_ARRAYS = None
+
+def plan_shards(signal, n_shards):
+    """
+    把 [0, n) 切成約 n_shards 段，切點移到目標位置之後第一段「無訊號」區間的起點
+    (在那裡空手的機會最大，串接時幾乎不需要重掃)。回傳 [(start, stop), ...]。
+    """
+    signal = as_sparse(signal)
+    n = len(signal)
+    if n == 0:
+        return []
+    flat_starts = signal.starts[signal.values == 0]
+    cuts = [0]
+    for k in range(1, n_shards):
+        target = k * n // n_shards
+        pos = np.searchsorted(flat_starts, target)
+        cut = int(flat_starts[pos]) if pos < len(flat_starts) else target
+        if cut > cuts[-1] and cut < n:
+            cuts.append(cut)
+    cuts.append(n)
+    return list(zip(cuts[:-1], cuts[1:]))
+
+def _init_worker(*arrays):
+    global _ARRAYS
+    _ARRAYS = arrays
+
+def _scan_shard(args):
+    """ worker 行程中掃描一段；resolver 為 IntrabarResolver 時一併交回這段新取得的細 K 線與統計 """
+    scan, start, stop, kwargs = args
+    resolver = kwargs.get("resolver")
+    if not hasattr(resolver, "checkpoint"):
+        return scan(*_ARRAYS, start=start, stop=stop, **kwargs), None
+    checkpoint = resolver.checkpoint()
+    result = scan(*_ARRAYS, start=start, stop=stop, **kwargs)
+    return result, resolver.changes_since(checkpoint)
+
+def _scan_shards(scan, arrays, bounds, workers, **kwargs):
+    """
+    各段以 scan(*arrays, start, stop, **kwargs) 掃描；workers == 1 時在本行程依序執行。
+    各行程的 resolver 是複本，結束時把取得的細 K 線與統計合併回主行程的 resolver
+    (串接時重掃與之後的回測可以直接使用，stats 也包含所有行程)。
+    """
+    args = [(scan, a, b, kwargs) for a, b in bounds]
+    if workers == 1:
+        return [scan(*arrays, start=a, stop=b, **kwargs) for a, b in bounds]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=arrays) as pool:
+        outputs = list(pool.map(_scan_shard, args))
+    for _, changes in outputs:
+        if changes is not None:
+            kwargs["resolver"].absorb(changes)
+    return [result for result, _ in outputs]
+
+def stitch_shards(bounds, results, signal, scan_one):
+    """
+    依序串接各段的 (entries, exits, ..., next)：前兩個陣列是進出場位置，其餘陣列跟著一起串接。
+    scan_one(r, stop) 從空手位置 r 掃描進場位置 < stop 的交易 (重掃用，回傳格式相同)。
+    回傳串接後的各陣列與重掃的交易筆數。
+    """
+    signal = as_sparse(signal)
+    parts = []
+    repaired = 0
+    r = 0
+    for (a, b), result in zip(bounds, results):
+        arrays = result[:-1]
+        entries, exits = arrays[0], arrays[1]
+        if r >= b:                      # 上一筆交易跨過整段
+            continue
+        # 對齊：r 落在本段某筆交易的持倉期間 (entry < r <= exit) 時從 r 逐筆重掃
+        while r > a:
+            m = np.searchsorted(entries, r, side="left") - 1
+            if m < 0 or exits[m] < r:
+                break
+            e = signal.next_active(r)
+            if e >= b:
+                r = b
+                break
+            one = scan_one(r, e + 1)
+            parts.append(one[:-1])
+            repaired += 1
+            r = int(one[1][-1]) + 1
+            if r >= b:
+                break
+        if r >= b:
+            continue
+        keep = entries >= r
+        if keep.any():
+            parts.append(tuple(x[keep] for x in arrays))
+            r = max(int(exits[keep][-1]) + 1, b)
+        else:
+            r = b
+
+    if not parts:
+        return tuple(x[:0] for x in results[0][:-1]) + (0,)
+    return tuple(np.concatenate([p[k] for p in parts]) for k in range(len(parts[0]))) + (repaired,)
+
+def sharded_scan(high, low, close, signal, risk_per_trade=RISK_PER_TRADE, take_profit_pct=TAKE_PROFIT_PCT,
+                 workers=None, n_shards=None, resolver=None):
+    """
+    與 scan_fixed_stop_trades 相同的結果 (entries, exits, sides, exit_prices)，
+    各段在行程池中平行掃描；另回傳 info (段數、重掃的交易筆數)。
+    resolver 需可 pickle，各行程各自持有一份；IntrabarResolver 的細 K 線與 stats 會合併回傳入的 resolver。
+    """
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    close = np.asarray(close, dtype=np.float64)
+    signal = as_sparse(signal)
+    workers = workers or os.cpu_count() or 1
+    bounds = plan_shards(signal, n_shards or workers * SHARDS_PER_WORKER)
+    if not bounds:
+        return (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int8),
+                np.zeros(0, dtype=np.float64), {"shards": 0, "repaired_trades": 0})
+    results = _scan_shards(scan_fixed_stop_trades, (high, low, close, signal), bounds, workers,
+                           risk_per_trade=risk_per_trade, take_profit_pct=take_profit_pct, resolver=resolver)
+
+    def scan_one(start, stop):
+        return scan_fixed_stop_trades(high, low, close, signal, risk_per_trade, take_profit_pct,
+                                      start=start, stop=stop, resolver=resolver)
+
+    entries, exits, sides, exit_prices, repaired = stitch_shards(bounds, results, signal, scan_one)
+    return entries, exits, sides, exit_prices, {"shards": len(bounds), "repaired_trades": repaired}
+
+def sharded_fixed_stop_backtest(df, capital=INITIAL_CAPITAL, risk_per_trade=RISK_PER_TRADE,
+                                take_profit_pct=TAKE_PROFIT_PCT, resolver=None, signal=None,
+                                workers=None, n_shards=None):
+    """ trade_engine.fixed_stop_backtest 的平行版本，回傳相同的 (trades, equity) """
+    high = df["high"].to_numpy(dtype=np.float64)
+    low = df["low"].to_numpy(dtype=np.float64)
+    close = df["close"].to_numpy(dtype=np.float64)
+    if signal is None:
+        signal = df["signal"].to_numpy() if "signal" in df else np.zeros(len(df), dtype=np.int8)
+
+    entries, exits, sides, exit_prices, _ = sharded_scan(
+        high, low, close, signal, risk_per_trade, take_profit_pct, workers, n_shards, resolver
+    )
+    pnls, capitals = replay_capital(close, entries, sides, exit_prices, capital, risk_per_trade)
+
+    trades = [{
+        "datetime": df["datetime"].iloc[e],
+        "type": "LONG" if s == 1 else "SHORT",
+        "entry": close[e],
+        "exit": x,
+        "pnl": p
+    } for e, s, x, p in zip(entries, sides, exit_prices, pnls)]
+
+    return trades, equity_from_trades(len(df), entries, exits, capitals)
+
+def sharded_signal_exit_scan(close, signal, sl=STOP_LOSS, tp=TAKE_PROFIT, workers=None, n_shards=None):
+    """
+    與 scan_signal_exit_trades 相同的結果 (entries, exits, sides)，各段在行程池中平行掃描；
+    signal 為 entry_signal() 的結果。另回傳 info (段數、重掃的交易筆數)。
+    """
+    close = np.asarray(close, dtype=np.float64)
+    sparse = as_sparse(signal)
+    workers = workers or os.cpu_count() or 1
+    bounds = plan_shards(sparse, n_shards or workers * SHARDS_PER_WORKER)
+    if not bounds:
+        return (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int8),
+                {"shards": 0, "repaired_trades": 0})
+    results = _scan_shards(scan_signal_exit_trades, (close, signal), bounds, workers, sl=sl, tp=tp, sparse=sparse)
+
+    def scan_one(start, stop):
+        return scan_signal_exit_trades(close, signal, sl, tp, start=start, stop=stop, sparse=sparse)
+
+    entries, exits, sides, repaired = stitch_shards(bounds, results, sparse, scan_one)
+    return entries, exits, sides, {"shards": len(bounds), "repaired_trades": repaired}
+
+def sharded_signal_exit_backtest(df, capital=INITIAL_CAPITAL, sl=STOP_LOSS, tp=TAKE_PROFIT,
+                                 workers=None, n_shards=None):
+    """ trade_engine.backtest 的平行版本，回傳相同的 (trades, equity_curve) 並寫出 trade_log.csv """
+    close = df["close"].to_numpy(dtype=np.float64)
+    signal = entry_signal(df["signal"].to_numpy())
+    entries, exits, sides, _ = sharded_signal_exit_scan(close, signal, sl, tp, workers, n_shards)
+    result = replay_all_in(close, df["datetime"].tolist(), entries, exits, sides, capital)
+    if result is None:                  # 部位為 0 的全倉進場，原迴圈視為仍空手：改用原迴圈
+        return backtest(df, capital, sl, tp)
+    trades, equity_curve, trade_log = result
+    pd.DataFrame(trade_log).to_csv("trade_log.csv", index=False)
+    return trades, equity_curve
+
+if __name__ == "__main__":
+    df = apply_strategy(fetch_ohlcv(SYMBOL, TIMEFRAME, START_DATE, END_DATE))
+    print(f"資料筆數: {len(df)}")
+
+    t0 = time.perf_counter()
+    serial = fixed_stop_backtest(df, INITIAL_CAPITAL, RISK_PER_TRADE, TAKE_PROFIT_PCT)
+    t1 = time.perf_counter()
+    sharded = sharded_fixed_stop_backtest(df)
+    t2 = time.perf_counter()
+
+    print(f"[固定停損停利] 逐段依序: {t1 - t0:.2f} 秒，分段平行 ({os.cpu_count()} 核心): {t2 - t1:.2f} 秒")
+    print(f"交易筆數: {len(sharded[0])}，最終資金: {round(sharded[1][-1], 2)}，結果相同: {sharded == serial}")
+
+    t0 = time.perf_counter()
+    serial = signal_exit_backtest(df, INITIAL_CAPITAL, STOP_LOSS, TAKE_PROFIT)
+    t1 = time.perf_counter()
+    sharded = sharded_signal_exit_backtest(df)
+    t2 = time.perf_counter()
+
+    print(f"[訊號出場全倉] 逐段依序: {t1 - t0:.2f} 秒，分段平行 ({os.cpu_count()} 核心): {t2 - t1:.2f} 秒")
+    print(f"交易筆數: {len(sharded[0])}，最終權益: {round(sharded[1][-1], 2)}，結果相同: {sharded == serial}")
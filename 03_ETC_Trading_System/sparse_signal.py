@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+
+# =====================
+# 稀疏訊號：只記錄狀態改變的位置
+# =====================
+class SparseSignal:
+    """
+    逐根 K 線的訊號 (1=多, -1=空, 0=無) 大多與前一根相同，
+    這裡只保存「從第幾根開始變成什麼狀態」，記憶體與走訪成本只跟狀態改變次數有關。
+    starts[0] 一定是 0，第 k 段涵蓋 starts[k] ~ starts[k+1]-1，值為 values[k]。
+    """
+
+    def __init__(self, length, starts, values):
+        self.length = int(length)
+        self.starts = np.asarray(starts, dtype=np.int64)
+        self.values = np.asarray(values, dtype=np.int8)
+        if self.length and (len(self.starts) == 0 or self.starts[0] != 0):
+            raise ValueError("starts 必須從 0 開始")
+        # 非 0 的段 (走訪進場點用)
+        self._active_runs = np.flatnonzero(self.values)
+
+    @classmethod
+    def from_dense(cls, signal):
+        signal = np.asarray(signal)
+        n = len(signal)
+        if n == 0:
+            return cls(0, [], [])
+        starts = np.r_[0, np.flatnonzero(signal[1:] != signal[:-1]) + 1]
+        return cls(n, starts, signal[starts])
+
+    @classmethod
+    def from_changes(cls, length, positions, values, initial=0):
+        """ 由 (位置, 新狀態) 建立；相同狀態的連續紀錄會合併 """
+        positions = np.r_[0, np.asarray(positions, dtype=np.int64)]
+        values = np.r_[initial, np.asarray(values, dtype=np.int8)]
+        # 同一個位置有多筆時取最後一筆
+        last = np.r_[positions[1:] != positions[:-1], True]
+        positions, values = positions[last], values[last]
+        keep = np.r_[True, values[1:] != values[:-1]]
+        return cls(length, positions[keep], values[keep])
+
+    def to_dense(self, dtype=np.int8):
+        lengths = np.diff(np.r_[self.starts, self.length])
+        return np.repeat(self.values, lengths).astype(dtype, copy=False)
+
+    def to_series(self, index):
+        return pd.Series(self.to_dense(np.int64), index=index, name="signal")
+
+    def __len__(self):
+        return self.length
+
+    @property
+    def n_changes(self):
+        return len(self.starts)
+
+    def runs(self):
+        """ 依序產生 (開始, 結束(不含), 狀態) """
+        ends = np.r_[self.starts[1:], self.length]
+        return zip(self.starts.tolist(), ends.tolist(), self.values.tolist())
+
+    def value_at(self, i):
+        return int(self.values[np.searchsorted(self.starts, i, side="right") - 1])
+
+    def next_active(self, i):
+        """ 第 i 根 (含) 之後第一根訊號不為 0 的位置，沒有則回傳 length """
+        if i >= self.length:
+            return self.length
+        r = np.searchsorted(self.starts, i, side="right") - 1
+        if self.values[r] != 0:
+            return int(i)
+        k = np.searchsorted(self._active_runs, r, side="right")
+        return int(self.starts[self._active_runs[k]]) if k < len(self._active_runs) else self.length
+
+    def slice(self, start, stop=None):
+        """ 第 start ~ stop-1 根，位置重新從 0 起算 """
+        stop = self.length if stop is None else min(stop, self.length)
+        if stop <= start:
+            return SparseSignal(0, [], [])
+        lo = np.searchsorted(self.starts, start, side="right") - 1
+        hi = np.searchsorted(self.starts, stop, side="left")
+        starts = self.starts[lo:hi] - start
+        starts[0] = 0
+        return SparseSignal(stop - start, starts, self.values[lo:hi])
+
+
+def as_sparse(signal):
+    """ 已經是 SparseSignal 就直接回傳，否則由逐根陣列轉換 """
+    return signal if isinstance(signal, SparseSignal) else SparseSignal.from_dense(signal)
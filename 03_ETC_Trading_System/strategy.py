@@ -1,21 +1,34 @@
+import numpy as np
 import ta
 
-def apply_strategy(df):
-    df["ma20"] = df["close"].rolling(20).mean()
-    df["ma60"] = df["close"].rolling(60).mean()
+def rolling_mean(values, window):
+    """ 移動平均：每個值都以相同順序加總視窗內的收盤價，分段 (chunked_pipeline) 與整段計算結果完全一致 """
+    values = np.asarray(values, dtype=np.float64)
+    out = np.full(len(values), np.nan)
+    m = len(values) - window + 1
+    if m > 0:
+        acc = values[:m].copy()
+        for j in range(1, window):
+            acc += values[j:j + m]
+        out[window - 1:] = acc / window
+    return out
+
+def apply_strategy(df, rsi_long=55, rsi_short=45):
+    df["ma20"] = rolling_mean(df["close"], 20)
+    df["ma60"] = rolling_mean(df["close"], 60)
     df["rsi"] = ta.momentum.RSIIndicator(df["close"], 14).rsi()
 
     df["signal"] = 0
 
     # 多單
     df.loc[
-        (df["ma20"] > df["ma60"]) & (df["rsi"] > 55),
+        (df["ma20"] > df["ma60"]) & (df["rsi"] > rsi_long),
         "signal"
     ] = 1
 
     # 空單
     df.loc[
-        (df["ma20"] < df["ma60"]) & (df["rsi"] < 45),
+        (df["ma20"] < df["ma60"]) & (df["rsi"] < rsi_short),
         "signal"
     ] = -1
 
@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import asof_align as aa
+
+def merge_asof_values(left, right, values, tolerance=None, allow_exact=True):
+    return pd.merge_asof(pd.DataFrame({"t": left}), pd.DataFrame({"t": right, "v": values}), on="t",
+                         tolerance=tolerance, allow_exact_matches=allow_exact)["v"].to_numpy()
+
+def take(values, idx):
+    return np.where(idx >= 0, values[np.maximum(idx, 0)], np.nan)
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("n_left,n_right", [(2000, 300), (300, 2000), (1000, 1000)])
+@pytest.mark.parametrize("tolerance", [None, 500])
+@pytest.mark.parametrize("allow_exact", [True, False])
+def test_matches_merge_asof(seed, n_left, n_right, tolerance, allow_exact):
+    # 兩邊都有重複時間，也有 left 早於 / 晚於所有 right 的部分；短 right 走 merge-walk，長 right 走二分搜尋
+    rng = np.random.default_rng(seed)
+    right = np.sort(rng.integers(0, 20_000, n_right))
+    left = np.sort(rng.integers(-1_000, 21_000, n_left))
+    values = rng.normal(size=n_right)
+    idx = aa.asof_indexer(left, right, tolerance, allow_exact=allow_exact)
+    expected = merge_asof_values(left, right, values, tolerance, allow_exact)
+    np.testing.assert_array_equal(take(values, idx), expected)
+
+def test_limit_matches_ffill_limit():
+    right = np.array([10, 20, 50])
+    left = np.arange(0, 80, 5)
+    values = np.array([1.0, 2.0, 3.0])
+    expected = pd.Series(values, index=right).reindex(left).ffill(limit=2).to_numpy()
+    np.testing.assert_array_equal(take(values, aa.asof_indexer(left, right, limit=2)), expected)
+
+def test_lag_hides_bars_until_they_close():
+    # 台股日 K 以當地 00:00 標示，13:30 收盤後才能使用
+    tw = pd.DataFrame({"Close": [1.0, 2.0]}, index=pd.DatetimeIndex(["2024-01-02", "2024-01-03"]).tz_localize("Asia/Taipei"))
+    grid = pd.DatetimeIndex(["2024-01-02 05:00", "2024-01-02 05:30", "2024-01-03 05:29", "2024-01-03 05:30"], tz="UTC")
+    frame = aa.align_frames(grid, {"TW": (tw, {"columns": ["Close"], "lag": aa.BAR_LAG["TW_DAILY"]})})
+    np.testing.assert_array_equal(frame["TW_Close"].to_numpy(), [np.nan, 1.0, 1.0, 2.0])
+
+def test_feature_matrix_matches_merge_asof_per_source():
+    rng = np.random.default_rng(7)
+    grid = np.arange(5000, dtype=np.int64) * 60_000_000_000
+    sources, expected = [], []
+    for k in range(3):
+        times = np.sort(rng.integers(0, grid[-1], 400 * (k + 1)))
+        values = rng.normal(size=(len(times), 2))
+        sources.append(aa.AsofSource(f"s{k}", times, values, ["a", "b"], tolerance=pd.Timedelta("30min")))
+        tol = pd.Timedelta("30min").value
+        expected += [merge_asof_values(grid, times, values[:, c], tol) for c in range(2)]
+    sources.append(aa.AsofSource("empty", [], np.zeros((0, 1)), ["a"]))
+    expected.append(np.full(len(grid), np.nan))
+
+    matrix, columns = aa.build_feature_matrix(grid, sources)
+    assert columns == ["s0_a", "s0_b", "s1_a", "s1_b", "s2_a", "s2_b", "empty_a"]
+    np.testing.assert_array_equal(matrix, np.column_stack(expected))
+
+def test_unsorted_times_are_rejected():
+    with pytest.raises(ValueError, match="排序"):
+        aa.AsofSource("x", [2, 1], [[1.0], [2.0]], ["a"])
@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import chunked_pipeline as cp
+from strategy import apply_strategy
+from trade_engine import fixed_stop_backtest
+
+def minute_bars(n, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 20 * np.exp(np.cumsum(rng.normal(0, 0.002, n)))
+    open_ = np.r_[close[0], close[:-1]]
+    df = pd.DataFrame({
+        "timestamp": 1_704_067_200_000 + np.arange(n) * 60_000,
+        "open": open_,
+        "high": np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.002, n))),
+        "low": np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.002, n))),
+        "close": close,
+        "volume": rng.random(n),
+    })
+    df["datetime"] = pd.to_datetime(df["timestamp"], unit="ms")
+    return df
+
+def run_chunked(df, rows, tmp_path):
+    chunks = [df.iloc[i:i + rows].reset_index(drop=True) for i in range(0, len(df), rows)]
+    trade_log, equity = tmp_path / f"trades_{rows}.csv", tmp_path / f"equity_{rows}.csv"
+    result = cp.run_pipeline(chunks, trade_log_path=trade_log, equity_path=equity)
+    return result, pd.read_csv(trade_log, float_precision="round_trip"), np.loadtxt(equity)
+
+def test_signals_match_apply_strategy():
+    df = minute_bars(3000)
+    expected = apply_strategy(df.copy())["signal"].to_numpy()
+    state = cp.new_indicator_state()
+    signal = np.concatenate([cp.compute_signals(df["close"].to_numpy()[i:i + 37], state) for i in range(0, len(df), 37)])
+    np.testing.assert_array_equal(signal, expected)
+
+@pytest.mark.parametrize("rows", [1, 59, 60, 333, 5000])
+def test_chunked_run_matches_single_pass(tmp_path, rows):
+    df = minute_bars(5000, seed=1)
+    trades, equity = fixed_stop_backtest(apply_strategy(df.copy()))
+    result, log, equity_file = run_chunked(df, rows, tmp_path)
+
+    assert result["trades"] == len(log) == len(trades) > 0
+    np.testing.assert_array_equal(log["pnl"].to_numpy(), [t["pnl"] for t in trades])
+    np.testing.assert_array_equal(equity_file, equity)
+    assert result["final_capital"] == equity[-1]
+
+def test_chunk_size_does_not_change_metrics(tmp_path):
+    df = minute_bars(4000, seed=2)
+    whole, _, _ = run_chunked(df, len(df), tmp_path)
+    chunked, _, _ = run_chunked(df, 250, tmp_path)
+    assert chunked.keys() == whole.keys()
+    for key, value in whole.items():
+        assert chunked[key] == pytest.approx(value, rel=1e-12, nan_ok=True)
+
+def test_replay_latency_trades_match_single_pass():
+    df = minute_bars(2000, seed=3)
+    trades, equity = fixed_stop_backtest(apply_strategy(df.copy()))
+    result = cp.replay_latency(df, bars_per_tick=7)
+    assert result["trades"] == len(trades) and result["final_capital"] == equity[-1]
@@ -0,0 +1,50 @@
+import os
+import pandas as pd
+import pytest
+
+pytest.importorskip("ccxt")
+from fill_resolver import IntrabarResolver
+
+class FakeExchange:
+    """ 回傳 [since, since + rows 分鐘) 的 1m K 線；每根最高 11、最低 9，第 k 根可另外設定 """
+    def __init__(self, rows, bars=None):
+        self.rows = rows
+        self.bars = bars or {}
+        self.calls = 0
+
+    def fetch_ohlcv(self, symbol, timeframe, since, limit):
+        self.calls += 1
+        return [[since + k * 60_000, 10, *self.bars.get(k, (11, 9)), 10, 1] for k in range(min(limit, self.rows))]
+
+def test_complete_closed_bar_is_cached(tmp_path):
+    start = pd.Timestamp("2024-01-01 00:00")
+    exchange = FakeExchange(60)
+    IntrabarResolver([start], cache_dir=tmp_path, exchange=exchange).load(start)
+    assert len(os.listdir(tmp_path)) == 1
+    IntrabarResolver([start], cache_dir=tmp_path, exchange=exchange).load(start)
+    assert exchange.calls == 1
+
+@pytest.mark.parametrize("rows", [0, 30])
+def test_empty_or_partial_fetch_is_not_cached(tmp_path, rows):
+    # 交易所異常或資料不完整：這次照用，但不寫入快取，下次重新抓
+    start = pd.Timestamp("2024-01-01 00:00")
+    exchange = FakeExchange(rows)
+    IntrabarResolver([start], cache_dir=tmp_path, exchange=exchange).load(start)
+    IntrabarResolver([start], cache_dir=tmp_path, exchange=exchange).load(start)
+    assert exchange.calls == 2
+    assert not os.path.exists(tmp_path) or os.listdir(tmp_path) == []
+
+def test_bar_still_forming_is_not_cached(tmp_path):
+    start = pd.Timestamp.now(tz="UTC").tz_localize(None).floor("h")
+    IntrabarResolver([start], cache_dir=tmp_path, exchange=FakeExchange(60)).load(start)
+    assert not os.path.exists(tmp_path) or os.listdir(tmp_path) == []
+
+def test_resolves_which_level_was_hit_first(tmp_path):
+    start = pd.Timestamp("2024-01-01 00:00")
+    # 多單：第 10 根先碰到停利 12，第 20 根才碰到停損 8
+    exchange = FakeExchange(60, {10: (12.5, 9), 20: (11, 7.5)})
+    resolver = IntrabarResolver([start], cache_dir=tmp_path, exchange=exchange)
+    assert resolver(0, 1, 8.0, 12.0) is False
+    # 空單：停損 12 先碰到
+    assert resolver(0, -1, 12.0, 8.0) is True
+    assert resolver.stats["target_first"] == 1 and resolver.stats["stop_first"] == 1
@@ -0,0 +1,35 @@
+import numpy as np
+import pandas as pd
+import pytest
+from monte_carlo import trade_returns, resample_returns, run_monte_carlo
+
+def test_trade_returns_uses_capital_before_each_trade():
+    log = pd.DataFrame({"pnl": [100.0, -202.0, 50.0]})
+    np.testing.assert_allclose(trade_returns(log, 1000), [0.1, -202 / 1100, 50 / 898])
+
+def test_empty_trade_log_raises():
+    returns = trade_returns(pd.DataFrame({"pnl": []}))
+    with pytest.raises(ValueError):
+        run_monte_carlo(returns, n_paths=10, workers=1)
+    with pytest.raises(ValueError):
+        resample_returns(returns, 10, "iid", np.random.default_rng(0))
+
+@pytest.mark.parametrize("method", ["iid", "block", "shuffle"])
+def test_result_independent_of_workers(method):
+    returns = np.random.default_rng(1).normal(0.001, 0.02, 37)
+    one = run_monte_carlo(returns, n_paths=250, chunk_size=60, method=method, workers=1)
+    two = run_monte_carlo(returns, n_paths=250, chunk_size=60, method=method, workers=2)
+    np.testing.assert_array_equal(one[0], two[0])
+    np.testing.assert_array_equal(one[1], two[1])
+
+def test_shuffle_keeps_final_capital():
+    # 打亂順序不改變複利後的期末資金，只改變回撤
+    returns = np.array([0.1, -0.05, 0.02, -0.2, 0.07])
+    final, max_dd = run_monte_carlo(returns, n_paths=50, method="shuffle", workers=1)
+    np.testing.assert_allclose(final, 10000 * np.prod(1 + returns))
+    assert (max_dd <= 0).all()
+
+def test_scale_is_leverage_on_each_trade():
+    returns = np.array([0.1, -0.1])
+    final, _ = run_monte_carlo(returns, n_paths=20, method="shuffle", scale=2.0, workers=1)
+    np.testing.assert_allclose(final, 10000 * 1.2 * 0.8)
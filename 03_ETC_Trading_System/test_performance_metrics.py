@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from performance_metrics import EquityMetrics, compute_metrics, trade_stats
+
+def equity_curves(n_curves=4, n=3000, seed=0):
+    rng = np.random.default_rng(seed)
+    return 10000 * np.exp(np.cumsum(rng.normal(0.0002, 0.01, (n_curves, n)), axis=1))
+
+def pandas_metrics(equity, periods_per_year):
+    """ 直接用 pandas 的 cummax / pct_change 計算 (對照用) """
+    s = pd.Series(equity)
+    r = s.pct_change().dropna()
+    peak = s.cummax()
+    since_peak = s.index.to_series() - s.index.to_series().where(s >= peak).ffill()
+    change = s.diff().dropna()
+    return {
+        "total_return": s.iloc[-1] / s.iloc[0] - 1,
+        "mean_return": r.mean(),
+        "volatility": r.std() * np.sqrt(periods_per_year),
+        "sharpe": r.mean() / r.std() * np.sqrt(periods_per_year),
+        "sortino": r.mean() / np.sqrt((np.minimum(r, 0) ** 2).mean()) * np.sqrt(periods_per_year),
+        "max_drawdown": (s / peak - 1).min(),
+        "max_drawdown_duration": since_peak.max(),
+        "profit_factor": change[change > 0].sum() / -change[change < 0].sum(),
+        "win_rate": (change > 0).sum() / (change != 0).sum(),
+        "cagr": (s.iloc[-1] / s.iloc[0]) ** (periods_per_year / len(r)) - 1,
+    }
+
+def test_matches_pandas_reference():
+    equity = equity_curves(1)[0]
+    got = compute_metrics(equity, periods_per_year=252, block_size=100)
+    expected = pandas_metrics(equity, 252)
+    assert got.keys() == expected.keys()
+    for key, value in expected.items():
+        assert got[key] == pytest.approx(value, rel=1e-9), key
+
+@pytest.mark.parametrize("block_size", [1, 7, 4096])
+def test_block_size_and_batch_do_not_change_results(block_size):
+    curves = equity_curves()
+    batch = compute_metrics(curves, periods_per_year=24 * 365, block_size=block_size)
+    for k, curve in enumerate(curves):
+        single = compute_metrics(curve, periods_per_year=24 * 365)
+        for key, value in single.items():
+            assert batch[key][k] == pytest.approx(value, rel=1e-9), key
+
+def test_empty_blocks_are_ignored():
+    equity = equity_curves(1)[0]
+    acc = EquityMetrics()
+    acc.update([])
+    acc.update(equity[:10])
+    acc.update(np.zeros((1, 0)))
+    acc.update(equity[10:])
+    assert acc.result()["max_drawdown"][0] == pytest.approx(compute_metrics(equity)["max_drawdown"])
+
+def test_trade_stats():
+    stats = trade_stats([10.0, -5.0, 20.0, -5.0])
+    assert stats["trades"] == 4 and stats["total_pnl"] == 20.0
+    assert stats["win_rate"] == 0.5 and stats["profit_factor"] == 3.0
+    assert stats["avg_win"] == 15.0 and stats["avg_loss"] == -5.0
+    assert np.isnan(trade_stats([])["win_rate"])
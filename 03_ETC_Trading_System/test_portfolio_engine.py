@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from portfolio_engine import PositionBook, entry_signals, portfolio_backtest, run_portfolio
+
+def panel(n_symbols=3, n_bars=800, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 20 * np.exp(np.cumsum(rng.normal(0, 0.006, (n_symbols, n_bars)), axis=1))
+    high = close * (1 + np.abs(rng.normal(0, 0.004, close.shape)))
+    low = close * (1 - np.abs(rng.normal(0, 0.004, close.shape)))
+    runs = rng.integers(1, 15, n_bars)
+    signal = np.stack([np.repeat(rng.choice([0, 0, 1, -1], n_bars), runs)[:n_bars] for _ in range(n_symbols)])
+    return high, low, close, signal.astype(np.int8)
+
+def reference_backtest(high, low, close, signal, capital, risk, tp, margin_rate, pyramid):
+    """ 逐筆部位的 list of dict 版本 (對照用)，規則同 portfolio_backtest 的說明 """
+    entries = entry_signals(signal, pyramid)
+    positions, trades, equity_curve = [], [], []
+    cash = capital
+    n_symbols, n_bars = close.shape
+    for t in range(n_bars):
+        still_open = []
+        for p in positions:
+            h, l = high[p["symbol"], t], low[p["symbol"], t]
+            stop = l <= p["stop"] if p["side"] == 1 else h >= p["stop"]
+            target = h >= p["target"] if p["side"] == 1 else l <= p["target"]
+            if p["entry_bar"] < t and (stop or target):
+                price = p["stop"] if stop else p["target"]
+                pnl = p["side"] * (price - p["entry"]) * p["size"]
+                cash += pnl
+                trades.append((p["entry_bar"], p["symbol"], t, pnl))
+            else:
+                still_open.append(p)
+        positions = still_open
+        equity = cash + sum(p["side"] * (close[p["symbol"], t] - p["entry"]) * p["size"] for p in positions)
+        free = equity - sum(p["margin"] for p in positions)
+        for s in range(n_symbols):
+            side = entries[s, t]
+            if side == 0 or equity <= 0:
+                continue
+            entry = close[s, t]
+            size = equity * risk / (entry * risk)
+            margin = size * entry * margin_rate
+            if margin > free * (1 + 1e-9):
+                break
+            free -= margin
+            positions.append({"symbol": s, "side": side, "entry_bar": t, "entry": entry, "size": size,
+                              "margin": margin, "stop": entry * (1 - side * risk), "target": entry * (1 + side * tp)})
+        equity_curve.append(equity)
+    for p in positions:
+        pnl = p["side"] * (close[p["symbol"], -1] - p["entry"]) * p["size"]
+        cash += pnl
+        trades.append((p["entry_bar"], p["symbol"], n_bars - 1, pnl))
+    equity_curve[-1] = cash
+    return sorted(trades), np.array(equity_curve)
+
+@pytest.mark.parametrize("pyramid", [False, True])
+@pytest.mark.parametrize("margin_rate", [0.1, 0.5])
+def test_matches_position_by_position_loop(pyramid, margin_rate):
+    high, low, close, signal = panel()
+    trades, bars = portfolio_backtest(high, low, close, signal, margin_rate=margin_rate, pyramid=pyramid)
+    expected_trades, expected_equity = reference_backtest(high, low, close, signal, 10000, 0.01, 0.02,
+                                                          margin_rate, pyramid)
+    got = sorted(zip(trades["entry_bar"], trades["symbol"], trades["exit_bar"], trades["pnl"]))
+    assert len(got) == len(expected_trades) > 0
+    for a, b in zip(got, expected_trades):
+        assert a[:3] == b[:3] and a[3] == pytest.approx(b[3], rel=1e-9)
+    np.testing.assert_allclose(bars["equity"], expected_equity, rtol=1e-9)
+    assert bars["equity"].iloc[-1] == pytest.approx(10000 + trades["pnl"].sum(), rel=1e-12)
+
+def test_position_book_grows_and_removes():
+    book = PositionBook(capacity=2)
+    for k in range(5):
+        book.add(symbol=[k], side=[1], entry_bar=[k], entry=[1.0], size=[1.0], stop=[0.9], target=[1.1], margin=[0.1])
+    removed = book.remove(np.array([True, False, True, False, False]))
+    np.testing.assert_array_equal(removed["symbol"], [0, 2])
+    np.testing.assert_array_equal(book.view("symbol"), [1, 3, 4])
+
+def test_run_portfolio_aligns_symbols_by_time():
+    high, low, close, signal = panel(2, 300)
+    times = pd.date_range("2024-01-01", periods=300, freq="h")
+    frames = {name: pd.DataFrame({"datetime": times, "high": high[k], "low": low[k], "close": close[k], "signal": signal[k]})
+              for k, name in enumerate(["ETC", "BTC"])}
+    frames["BTC"] = frames["BTC"].iloc[50:]          # 較晚上市：前 50 根沒有資料
+    trades, bars = run_portfolio(frames)
+    assert bars.index.equals(pd.DatetimeIndex(times, name="datetime"))
+    assert set(trades["symbol"]) <= {"ETC", "BTC"}
+    assert (trades.loc[trades["symbol"] == "BTC", "entry_time"] >= times[50]).all()
+    assert trades["type"].isin(["LONG", "SHORT"]).all()
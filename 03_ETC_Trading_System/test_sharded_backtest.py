@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("ccxt")
+import sharded_backtest as sb
+from fill_resolver import IntrabarResolver
+from trade_engine import backtest, fixed_stop_backtest, signal_exit_backtest
+
+def synthetic_bars(n, seed=0, dense=False):
+    rng = np.random.default_rng(seed)
+    close = 20 * np.exp(np.cumsum(rng.normal(0, 0.002, n)))
+    if dense:
+        signal = rng.choice([-1, 1], n)
+    else:
+        runs = rng.integers(1, 200, n // 50)
+        signal = np.repeat(rng.choice([0, 0, 0, 1, -1], len(runs)), runs)[:n]
+        signal = np.r_[signal, np.zeros(n - len(signal), dtype=int)]
+    return pd.DataFrame({
+        "datetime": pd.date_range("2024-01-01", periods=n, freq="h"),
+        "high": close * (1 + np.abs(rng.normal(0, 0.004, n))),
+        "low": close * (1 - np.abs(rng.normal(0, 0.004, n))),
+        "close": close,
+        "signal": signal,
+    })
+
+class FakeExchange:
+    """ 每根大 K 回傳 60 根 1m：第 10 根碰到上緣、第 20 根碰到下緣 (多單停利先成交) """
+    def __init__(self):
+        self.calls = 0
+
+    def fetch_ohlcv(self, symbol, timeframe, since, limit):
+        self.calls += 1
+        return [[since + k * 60_000, 1, 1e9 if k == 10 else 1, 0 if k == 20 else 1, 1, 1] for k in range(limit)]
+
+@pytest.mark.parametrize("dense", [False, True])
+@pytest.mark.parametrize("n_shards,workers", [(1, 1), (7, 1), (50, 1), (997, 1), (7, 2), (50, 2)])
+def test_fixed_stop_matches_serial(dense, n_shards, workers):
+    df = synthetic_bars(20_000, dense=dense)
+    assert sb.sharded_fixed_stop_backtest(df, workers=workers, n_shards=n_shards) == fixed_stop_backtest(df)
+
+@pytest.mark.parametrize("n_shards,workers", [(1, 1), (13, 1), (200, 1), (13, 2)])
+def test_signal_exit_matches_serial(tmp_path, monkeypatch, n_shards, workers):
+    monkeypatch.chdir(tmp_path)          # 兩者都會寫出 trade_log.csv
+    df = synthetic_bars(5_000, seed=1)
+    assert sb.sharded_signal_exit_backtest(df, workers=workers, n_shards=n_shards) == signal_exit_backtest(df)
+
+def test_zero_capital_falls_back_to_original_loop(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    df = synthetic_bars(500, seed=2)
+    assert sb.sharded_signal_exit_backtest(df, capital=0, workers=1, n_shards=4) == backtest(df, capital=0)
+
+def test_plan_shards_cuts_on_flat_runs():
+    signal = np.array([0, 1, 1, 0, 0, 1, 0, 0, -1, -1, 0, 0])
+    bounds = sb.plan_shards(signal, 3)
+    assert bounds[0][0] == 0 and bounds[-1][1] == len(signal)
+    assert all(signal[a] == 0 for a, _ in bounds[1:])
+    assert sb.plan_shards(np.zeros(0), 3) == []
+
+def test_worker_resolver_results_are_merged(tmp_path):
+    df = synthetic_bars(3_000, seed=3)
+    df["high"] = df["close"] * 1.2         # 每根都同時碰到停損與停利，全部交給 resolver 判定
+    df["low"] = df["close"] * 0.8
+
+    def make_resolver(path):
+        return IntrabarResolver(df["datetime"], cache_dir=str(path), exchange=FakeExchange())
+
+    serial = make_resolver(tmp_path / "serial")
+    expected = fixed_stop_backtest(df, resolver=serial)
+    resolver = make_resolver(tmp_path / "sharded")
+    assert sb.sharded_fixed_stop_backtest(df, resolver=resolver, workers=2, n_shards=8) == expected
+    # 各段掃描可能多判定幾根 (串接時捨棄的交易)，但不會少於依序回測
+    for key in ("ambiguous", "target_first", "stop_first", "fetched"):
+        assert resolver.stats[key] >= serial.stats[key]
+    assert serial.stats["fetched"] > 0
+    assert resolver.checkpoint()[0] >= serial.checkpoint()[0]
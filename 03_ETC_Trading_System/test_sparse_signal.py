@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from sparse_signal import SparseSignal, as_sparse
+from trade_engine import scan_fixed_stop_trades
+
+def random_signal(n, seed=0):
+    rng = np.random.default_rng(seed)
+    runs = rng.integers(1, 30, n)
+    return np.repeat(rng.choice([0, 0, 1, -1], len(runs)), runs)[:n].astype(np.int8)
+
+@pytest.mark.parametrize("seed", range(5))
+def test_round_trip_and_lookups_match_dense(seed):
+    dense = random_signal(2000, seed)
+    sparse = SparseSignal.from_dense(dense)
+    np.testing.assert_array_equal(sparse.to_dense(), dense)
+    assert sparse.n_changes == 1 + (dense[1:] != dense[:-1]).sum()
+
+    active = np.flatnonzero(dense)
+    for i in range(0, len(dense) + 3, 7):
+        k = np.searchsorted(active, i)
+        assert sparse.next_active(i) == (active[k] if k < len(active) else len(dense))
+        if i < len(dense):
+            assert sparse.value_at(i) == dense[i]
+
+@pytest.mark.parametrize("start,stop", [(0, 10), (17, 500), (499, 2000), (1999, 2000), (5, 5), (100, None)])
+def test_slice_matches_dense_slice(start, stop):
+    dense = random_signal(2000, 1)
+    np.testing.assert_array_equal(SparseSignal.from_dense(dense).slice(start, stop).to_dense(), dense[start:stop])
+
+def test_from_changes_merges_repeated_states():
+    sparse = SparseSignal.from_changes(10, [2, 4, 4, 6, 8], [1, 1, -1, -1, 0])
+    np.testing.assert_array_equal(sparse.to_dense(), [0, 0, 1, 1, -1, -1, -1, -1, 0, 0])
+    assert sparse.n_changes == 4
+
+def test_empty_and_invalid_inputs():
+    assert len(SparseSignal.from_dense([])) == 0
+    with pytest.raises(ValueError):
+        SparseSignal(5, [1], [1])
+
+def test_fixed_stop_scan_accepts_sparse_signal():
+    rng = np.random.default_rng(4)
+    n = 5000
+    close = 20 * np.exp(np.cumsum(rng.normal(0, 0.003, n)))
+    high, low = close * 1.004, close * 0.996
+    dense = random_signal(n, 4)
+    expected = scan_fixed_stop_trades(high, low, close, dense, 0.01, 0.02)
+    got = scan_fixed_stop_trades(high, low, close, as_sparse(dense), 0.01, 0.02)
+    for a, b in zip(got, expected):
+        np.testing.assert_array_equal(a, b)
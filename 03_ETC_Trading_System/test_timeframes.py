@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("ccxt")
+from timeframes import MultiTimeframeStore, resample_ohlcv
+
+def minute_bars(n, seed=0, start="2024-01-01"):
+    rng = np.random.default_rng(seed)
+    close = 20 + np.cumsum(rng.normal(0, 0.05, n))
+    return pd.DataFrame({
+        "open": close + rng.normal(0, 0.01, n),
+        "high": close + 0.1,
+        "low": close - 0.1,
+        "close": close,
+        "volume": rng.random(n),
+    }, index=pd.date_range(start, periods=n, freq="1min"))
+
+def assert_matches_full_resample(store):
+    for tf, rule in (("5m", "5min"), ("1h", "1h"), ("1d", "1D")):
+        pd.testing.assert_frame_equal(store.get(tf), resample_ohlcv(store.base, rule), check_freq=False)
+
+def test_append_in_order_updates_cached_timeframes():
+    bars = minute_bars(3000)
+    store = MultiTimeframeStore(bars.iloc[:2000])
+    store.get_many("5m", "1h", "1d")
+    store.append(bars.iloc[2000:])
+    pd.testing.assert_frame_equal(store.base, bars, check_freq=False)
+    assert_matches_full_resample(store)
+
+def test_append_into_the_middle_keeps_later_bars():
+    bars = minute_bars(3000)
+    gap = bars.index[1000:1200]
+    store = MultiTimeframeStore(bars.drop(gap))
+    store.get_many("5m", "1h", "1d")
+    # 補進中間缺的區段：之後的 K 線與聚合 K 線都要保留
+    store.append(bars.loc[gap])
+    pd.testing.assert_frame_equal(store.base, bars, check_freq=False)
+    assert_matches_full_resample(store)
+
+def test_append_overwrites_same_timestamp():
+    bars = minute_bars(600)
+    store = MultiTimeframeStore(bars)
+    store.get("1h")
+    revised = bars.iloc[[100, 599]].copy()
+    revised["close"] += 1.0
+    store.append(revised)
+    assert len(store.base) == 600
+    np.testing.assert_array_equal(store.base["close"].iloc[[100, 599]], revised["close"])
+    assert_matches_full_resample(store)
@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("ccxt")
+import walk_forward as wf
+from strategy import apply_strategy
+
+def synthetic_ohlcv(n, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 20 * np.exp(np.cumsum(rng.normal(0, 0.006, n)))
+    open_ = np.r_[close[0], close[:-1]]
+    df = pd.DataFrame({
+        "open": open_,
+        "high": np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.004, n))),
+        "low": np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.004, n))),
+        "close": close,
+        "volume": rng.random(n) * 1000,
+    })
+    df["datetime"] = pd.date_range("2024-01-01", periods=n, freq="h")
+    return apply_strategy(df)
+
+@pytest.fixture(scope="module")
+def df():
+    return synthetic_ohlcv(24 * 200)
+
+def test_out_of_sample_segments_are_contiguous():
+    folds = wf.make_folds(1000, in_sample=300, out_sample=100)
+    assert folds[0] == (0, 300, 400)
+    for (_, _, end), (_, start, _) in zip(folds, folds[1:]):
+        assert end == start
+    assert folds[-1][2] == 1000
+
+def test_stitched_equity_compounds_fold_returns(df):
+    report, equity = wf.walk_forward(df, workers=1)
+    assert len(report) == len(wf.make_folds(len(df)))
+    expected = wf.INITIAL_CAPITAL * np.prod(1 + report["oos_return"].to_numpy())
+    assert equity.iloc[0] == wf.INITIAL_CAPITAL
+    assert equity.iloc[-1] == pytest.approx(expected, rel=1e-12)
+
+def test_same_result_with_process_pool(df):
+    serial = wf.walk_forward(df, workers=1)
+    pooled = wf.walk_forward(df, workers=2)
+    pd.testing.assert_frame_equal(serial[0], pooled[0])
+    pd.testing.assert_series_equal(serial[1], pooled[1])
+
+def test_folds_without_qualifying_parameters_are_nan_rows(df, monkeypatch):
+    # 沒有任何參數組達到 MIN_TRADES：報表欄位仍完整，參數為 NaN，樣本外不交易
+    monkeypatch.setattr(wf, "MIN_TRADES", 10**9)
+    report, equity = wf.walk_forward(df, workers=1)
+    assert report["sl"].isna().all() and report["tp"].isna().all()
+    assert (report["oos_trades"] == 0).all() and (report["oos_return"] == 0).all()
+    assert (equity == wf.INITIAL_CAPITAL).all()
@@ -0,0 +1,101 @@
+import pandas as pd
+from market_data import fetch_ohlcv
+
+# =====================
+# 參數
+# =====================
+# 週期名稱 → pandas resample 規則 (K 線以區間起點標示，左閉右開)
+TIMEFRAMES = {
+    "1m": "1min",
+    "5m": "5min",
+    "15m": "15min",
+    "1h": "1h",
+    "4h": "4h",
+    "1d": "1D",
+    "1M": "MS",
+}
+
+OHLCV_AGG = {"open": "first", "high": "max", "low": "min", "close": "last", "volume": "sum"}
+
+# =====================
+# 聚合
+# =====================
+def resample_ohlcv(bars, rule):
+    """ 把較細的 K 線聚合成 rule 週期：開盤取第一根、最高取最大、最低取最小、收盤取最後一根、成交量加總 """
+    offset = pd.tseries.frequencies.to_offset(rule)
+    kwargs = {"origin": "epoch"} if isinstance(offset, pd.offsets.Tick) else {}
+    out = bars.resample(offset, closed="left", label="left", **kwargs).agg(OHLCV_AGG)
+    return out[out["open"].notna()]
+
+def bucket_start(ts, rule):
+    """ ts 所屬 K 線的起點 """
+    probe = pd.DataFrame({k: [0.0] for k in OHLCV_AGG}, index=pd.DatetimeIndex([ts]))
+    return resample_ohlcv(probe, rule).index[0]
+
+def to_etc_frame(bars):
+    """ 轉回 ETC.py / apply_strategy 使用的格式 (timestamp, open..volume, datetime) """
+    df = bars.reset_index(names="datetime")
+    df.insert(0, "timestamp", df["datetime"].astype("datetime64[ms]").astype("int64"))
+    return df[["timestamp", "open", "high", "low", "close", "volume", "datetime"]]
+
+# =====================
+# 多週期資料
+# =====================
+class MultiTimeframeStore:
+    """
+    只保存最細的基礎 K 線 (例如 1m)，其他週期由基礎 K 線聚合並快取；
+    新的基礎 K 線進來時，只重算受影響的最後幾根聚合 K 線。
+    """
+
+    def __init__(self, base, base_timeframe="1m"):
+        self.base_timeframe = base_timeframe
+        self.base = self._normalize(base)
+        self._cache = {}
+
+    @staticmethod
+    def _normalize(bars):
+        bars = bars.rename(columns=str.lower)
+        if "datetime" in bars.columns:
+            bars = bars.set_index("datetime")
+        bars = bars[list(OHLCV_AGG)]
+        return bars[~bars.index.duplicated(keep="last")].sort_index()
+
+    @classmethod
+    def from_exchange(cls, symbol, start, end, base_timeframe="1m", exchange=None):
+        return cls(fetch_ohlcv(symbol, base_timeframe, start, end, exchange), base_timeframe)
+
+    @classmethod
+    def load(cls, path, base_timeframe="1m"):
+        return cls(pd.read_pickle(path), base_timeframe)
+
+    def save(self, path):
+        self.base.to_pickle(path)
+
+    def get(self, timeframe):
+        """ 取得某個週期的 OHLCV (index 為 K 線起點)；回傳快取本身，請勿直接修改 """
+        if timeframe == self.base_timeframe:
+            return self.base
+        if timeframe not in self._cache:
+            self._cache[timeframe] = resample_ohlcv(self.base, TIMEFRAMES.get(timeframe, timeframe))
+        return self._cache[timeframe]
+
+    def get_many(self, *timeframes):
+        return {tf: self.get(tf) for tf in timeframes}
+
+    def append(self, new_bars):
+        """
+        加入基礎 K 線：時間相同的會覆蓋 (例如尚未收完的最後一根)，其餘的舊 K 線保留，
+        所以也可以補進中間缺少的區段。已快取的週期從受影響的第一根聚合 K 線開始重算。
+        """
+        new_bars = self._normalize(new_bars)
+        if new_bars.empty:
+            return
+        first = new_bars.index[0]
+        merged = pd.concat([self.base, new_bars])
+        self.base = merged[~merged.index.duplicated(keep="last")].sort_index()
+
+        for timeframe, cached in self._cache.items():
+            rule = TIMEFRAMES.get(timeframe, timeframe)
+            start = bucket_start(first, rule)
+            fresh = resample_ohlcv(self.base[self.base.index >= start], rule)
+            self._cache[timeframe] = pd.concat([cached[cached.index < start], fresh])
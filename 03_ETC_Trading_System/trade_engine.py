@@ -1,4 +1,6 @@
+import numpy as np
 import pandas as pd
+from sparse_signal import as_sparse
 
 def backtest(df, capital=10000, sl=0.03, tp=0.06):
     position = 0
@@ -65,3 +67,263 @@ def backtest(df, capital=10000, sl=0.03, tp=0.06):
 
     pd.DataFrame(trade_log).to_csv("trade_log.csv", index=False)
     return trades, equity_curve
+
+
+# =====================
+# 訊號出場回測 (backtest 規則) 的向量化版本
+# =====================
+# backtest 的進出場只跟訊號、價格、進場價與方向有關：空手時有訊號就全倉進場，
+# 持倉中碰到停損 / 停利 / 反向訊號就出場。資金只決定部位大小，
+# 所以先找出所有交易的位置，再依序套用資金 (replay_all_in)。
+def entry_signal(signal):
+    """ backtest 看的訊號：1 / -1 以外視為 0，第 0 根不檢查 (迴圈從第 1 根開始) """
+    signal = np.asarray(signal)
+    trig = np.zeros(len(signal), dtype=np.int8)
+    trig[signal == 1] = 1
+    trig[signal == -1] = -1
+    trig[:1] = 0
+    return trig
+
+
+def _find_signal_exit(close, signal, start, side, lower, upper):
+    """ 從 start 往後找第一根收盤價 <= lower、>= upper 或出現反向訊號的 K 線，沒有則回傳 -1 """
+    n = len(close)
+    block = 64
+    i = start
+    while i < n:
+        end = min(i + block, n)
+        price = close[i:end]
+        hit = (price <= lower) | (price >= upper) | (signal[i:end] == -side)
+        if hit.any():
+            return i + int(hit.argmax())
+        i = end
+        block *= 2
+    return -1
+
+
+def scan_signal_exit_trades(close, signal, sl, tp, start=0, stop=None, sparse=None):
+    """
+    依 backtest 的規則找出所有交易 (與資金無關)。
+    signal: entry_signal() 的結果；sparse: 同一個訊號的 SparseSignal (沒給時轉換一次)。
+    stop: 下一個進場位置 >= stop 時停止 (分段回測用)。
+    回傳 entries, exits (到最後一根仍持倉時為 n), sides 與下一個「空手」的檢查位置。
+    """
+    n = len(close)
+    stop = n if stop is None else stop
+    sparse = as_sparse(signal) if sparse is None else sparse
+
+    entries, exits, sides = [], [], []
+    i = start
+    while True:
+        nxt = sparse.next_active(i)
+        if nxt >= min(stop, n):
+            break
+        i = nxt
+        side = int(signal[i])
+        entry_price = close[i]
+        if side == 1:
+            lower, upper = entry_price * (1 - sl), entry_price * (1 + tp)
+        else:
+            lower, upper = entry_price * (1 - tp), entry_price * (1 + sl)
+
+        j = _find_signal_exit(close, signal, i + 1, side, lower, upper)
+        if j < 0:
+            j = n
+
+        entries.append(i)
+        exits.append(j)
+        sides.append(side)
+        i = j + 1
+
+    return (np.array(entries, dtype=np.int64), np.array(exits, dtype=np.int64),
+            np.array(sides, dtype=np.int8), max(i, stop))
+
+
+def replay_all_in(close, times, entries, exits, sides, capital):
+    """
+    依序以全部資金進出場，還原 backtest 的 (trades, equity_curve, trade_log)。
+    equity 與原迴圈相同：進場那根為 0，持倉中為未實現損益，出場後為資金。
+    進場時部位算出來是 0 (資金為 0 等)，原迴圈會當成仍然空手，與上面的交易位置不同：回傳 None。
+    """
+    n = len(close)
+    equity = np.empty(n, dtype=np.float64)
+    trades, trade_log = [], []
+    flat_from = 0
+    for entry, exit_, side in zip(entries.tolist(), exits.tolist(), sides.tolist()):
+        equity[flat_from:entry] = capital
+        entry_price = close[entry]
+        position = capital / entry_price if side == 1 else -capital / entry_price
+        if position == 0:
+            return None
+        equity[entry] = 0
+
+        held = close[entry + 1:exit_]
+        if side == 1:
+            equity[entry + 1:exit_] = 0 + (held - entry_price) * position
+        else:
+            equity[entry + 1:exit_] = 0 + (entry_price - held) * abs(position)
+        if exit_ >= n:
+            flat_from = n
+            break
+
+        price = close[exit_]
+        pnl = (price - entry_price) * position if side == 1 else (entry_price - price) * abs(position)
+        capital = abs(position) * price
+        trades.append(pnl)
+        trade_log.append({
+            "time": times[exit_],
+            "type": "LONG" if side == 1 else "SHORT",
+            "entry_price": entry_price,
+            "exit_price": price,
+            "pnl": pnl
+        })
+        equity[exit_] = capital
+        flat_from = exit_ + 1
+    equity[flat_from:] = capital
+    return trades, equity[1:].tolist(), trade_log
+
+
+def signal_exit_backtest(df, capital=10000, sl=0.03, tp=0.06):
+    """ 與 backtest 相同的 (trades, equity_curve) 與 trade_log.csv，不逐根走訪 DataFrame """
+    close = df["close"].to_numpy(dtype=np.float64)
+    signal = entry_signal(df["signal"].to_numpy())
+    entries, exits, sides, _ = scan_signal_exit_trades(close, signal, sl, tp)
+    result = replay_all_in(close, df["datetime"].tolist(), entries, exits, sides, capital)
+    if result is None:
+        return backtest(df, capital, sl, tp)
+    trades, equity_curve, trade_log = result
+    pd.DataFrame(trade_log).to_csv("trade_log.csv", index=False)
+    return trades, equity_curve
+
+
+# =====================
+# 固定停損停利回測 (ETC.py 規則)
+# =====================
+def _find_exit(high, low, start, side, stop_loss_price, take_profit_price):
+    """ 從 start 往後找第一根觸及停損或停利的 K 線，回傳 (index, 觸及停損, 觸及停利)；都沒觸及回傳 (-1, False, False) """
+    n = len(high)
+    block = 64
+    i = start
+    while i < n:
+        end = min(i + block, n)
+        if side == 1:
+            stop_hit = low[i:end] <= stop_loss_price
+            target_hit = high[i:end] >= take_profit_price
+        else:
+            stop_hit = high[i:end] >= stop_loss_price
+            target_hit = low[i:end] <= take_profit_price
+        hit = stop_hit | target_hit
+        if hit.any():
+            k = int(hit.argmax())
+            return i + k, bool(stop_hit[k]), bool(target_hit[k])
+        i = end
+        block *= 2
+    return -1, False, False
+
+
+def scan_fixed_stop_trades(high, low, close, signal, risk_per_trade, take_profit_pct, start=0, stop=None, resolver=None):
+    """
+    依 ETC.py 的規則找出所有交易：有訊號就以收盤價進場，從下一根 K 開始檢查，
+    同一根同時碰到停損與停利時以停損計，都沒碰到則以最後收盤價出場，出場後從下一根繼續。
+    交易的進出場位置與資金無關，所以這裡只處理價格。
+    stop: 下一個進場位置 >= stop 時停止 (分段回測用)。
+    resolver: 同一根同時碰到停損與停利時呼叫 resolver(index, side, 停損價, 停利價)，
+              回傳 True 表示停損先成交 (見 fill_resolver.py)。
+    signal 可以是逐根陣列或 SparseSignal，只會走訪訊號改變的位置。
+    回傳 entries, exits, sides, exit_prices 與下一個「空手」的檢查位置。
+    """
+    n = len(close)
+    stop = n if stop is None else stop
+    signal = as_sparse(signal)
+
+    entries, exits, sides, exit_prices = [], [], [], []
+    i = start
+    while True:
+        nxt = signal.next_active(i)
+        if nxt >= min(stop, n):
+            break
+        i = nxt
+        side = 1 if signal.value_at(i) > 0 else -1
+        entry_price = close[i]
+        if side == 1:
+            stop_loss_price = entry_price * (1 - risk_per_trade)
+            take_profit_price = entry_price * (1 + take_profit_pct)
+        else:
+            stop_loss_price = entry_price * (1 + risk_per_trade)
+            take_profit_price = entry_price * (1 - take_profit_pct)
+
+        j, stop_hit, target_hit = _find_exit(high, low, i + 1, side, stop_loss_price, take_profit_price)
+        if j < 0:
+            j = n - 1
+            exit_price = close[-1]
+        else:
+            if stop_hit and target_hit and resolver is not None:
+                stop_hit = resolver(j, side, stop_loss_price, take_profit_price)
+            exit_price = stop_loss_price if stop_hit else take_profit_price
+
+        entries.append(i)
+        exits.append(j)
+        sides.append(side)
+        exit_prices.append(exit_price)
+        i = j + 1
+
+    return (np.array(entries, dtype=np.int64), np.array(exits, dtype=np.int64),
+            np.array(sides, dtype=np.int8), np.array(exit_prices, dtype=np.float64), max(i, stop))
+
+
+def replay_capital(close, entries, sides, exit_prices, capital, risk_per_trade):
+    """ 依序套用每筆交易的損益，回傳每筆 pnl 與每筆交易後的資金 (第 0 個為初始資金) """
+    pnls = []
+    capitals = [capital]
+    for entry, side, exit_price in zip(entries, sides, exit_prices):
+        entry_price = close[entry]
+        risk_amount = capital * risk_per_trade
+        position_size = risk_amount / (entry_price * risk_per_trade)  # 假設用1%價差計算
+        if side == 1:
+            pnl = (exit_price - entry_price) * position_size
+        else:
+            pnl = (entry_price - exit_price) * position_size
+        capital += pnl
+        pnls.append(pnl)
+        capitals.append(capital)
+    return pnls, capitals
+
+
+def equity_from_trades(n, entries, exits, capitals):
+    """
+    還原 ETC.py 的 equity 序列：初始資金 + 每根「空手時檢查到」的 K 線一筆
+    (沒訊號記目前資金，有訊號記該筆交易後的資金)。
+    """
+    inside = np.zeros(n + 1, dtype=np.int64)
+    np.add.at(inside, entries + 1, 1)
+    np.add.at(inside, exits + 1, -1)
+    visited = np.flatnonzero(np.cumsum(inside)[:n] == 0)
+    done = np.searchsorted(entries, visited, side="right")
+    return [capitals[0]] + np.asarray(capitals, dtype=np.float64)[done].tolist()
+
+
+def fixed_stop_backtest(df, capital=10000, risk_per_trade=0.01, take_profit_pct=0.02, resolver=None, signal=None):
+    """
+    ETC.py 的固定停損停利回測，回傳 (trades, equity)，與原本逐根 K 線的迴圈結果相同。
+    signal 可直接傳入 SparseSignal；沒給時使用 df["signal"] 欄位。
+    """
+    high = df["high"].to_numpy(dtype=np.float64)
+    low = df["low"].to_numpy(dtype=np.float64)
+    close = df["close"].to_numpy(dtype=np.float64)
+    if signal is None:
+        signal = df["signal"].to_numpy() if "signal" in df else np.zeros(len(df), dtype=np.int8)
+
+    entries, exits, sides, exit_prices, _ = scan_fixed_stop_trades(
+        high, low, close, signal, risk_per_trade, take_profit_pct, resolver=resolver
+    )
+    pnls, capitals = replay_capital(close, entries, sides, exit_prices, capital, risk_per_trade)
+
+    trades = [{
+        "datetime": df["datetime"].iloc[e],
+        "type": "LONG" if s == 1 else "SHORT",
+        "entry": close[e],
+        "exit": x,
+        "pnl": p
+    } for e, s, x, p in zip(entries, sides, exit_prices, pnls)]
+
+    return trades, equity_from_trades(len(df), entries, exits, capitals)
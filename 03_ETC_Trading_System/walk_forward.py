@@ -0,0 +1,146 @@
+import os
+import itertools
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+from concurrent.futures import ProcessPoolExecutor
+from market_data import fetch_ohlcv
+from strategy import apply_strategy
+from trade_engine import scan_fixed_stop_trades, replay_capital, equity_from_trades
+
+# =====================
+# 參數
+# =====================
+SYMBOL = "ETC/USDT"
+TIMEFRAME = "1h"
+START_DATE = "2024-01-01T00:00:00Z"
+END_DATE = "2025-12-31"
+INITIAL_CAPITAL = 10000
+
+IN_SAMPLE_BARS = 24 * 90      # 樣本內 90 天
+OUT_SAMPLE_BARS = 24 * 30     # 樣本外 30 天 (每次往前滾動一段樣本外)
+MIN_TRADES = 5                # 樣本內交易數太少的參數不採用
+
+# 搜尋網格：停損 (= RISK_PER_TRADE)、停利、RSI 多/空門檻
+SL_GRID = [0.005, 0.01, 0.015, 0.02, 0.03]
+TP_GRID = [0.01, 0.02, 0.03, 0.04, 0.06]
+RSI_GRID = [(50, 50), (55, 45), (60, 40), (65, 35)]
+
+# =====================
+# 切分視窗
+# =====================
+def make_folds(n, in_sample=IN_SAMPLE_BARS, out_sample=OUT_SAMPLE_BARS):
+    """ 回傳 [(is_start, is_end, oos_end), ...]，樣本外區間首尾相接 """
+    folds = []
+    start = 0
+    while start + in_sample < n:
+        folds.append((start, start + in_sample, min(start + in_sample + out_sample, n)))
+        start += out_sample
+    return folds
+
+def make_signal(ma20, ma60, rsi, rsi_long, rsi_short):
+    """ 與 strategy.apply_strategy 相同的訊號規則，直接用預先算好的指標 """
+    signal = np.zeros(len(rsi), dtype=np.int8)
+    signal[(ma20 > ma60) & (rsi > rsi_long)] = 1
+    signal[(ma20 < ma60) & (rsi < rsi_short)] = -1
+    return signal
+
+def run_window(arrays, signal, sl, tp, capital=INITIAL_CAPITAL):
+    """ 在一段資料上跑固定停損停利回測 (區間結束時強制以最後收盤價出場) """
+    high, low, close = arrays
+    entries, exits, sides, exit_prices, _ = scan_fixed_stop_trades(high, low, close, signal, sl, tp)
+    pnls, capitals = replay_capital(close, entries, sides, exit_prices, capital, sl)
+    return len(entries), capitals[-1], equity_from_trades(len(close), entries, exits, capitals)
+
+# =====================
+# 單一 fold：樣本內搜尋 → 樣本外驗證
+# =====================
+def optimize_fold(fold_id, prices, ma20, ma60, rsi, split):
+    """ prices = (high, low, close)，已切成此 fold 的 [is_start, oos_end)；split 為樣本內長度 """
+    is_prices = tuple(p[:split] for p in prices)
+    oos_prices = tuple(p[split:] for p in prices)
+
+    best = None
+    for rsi_long, rsi_short in RSI_GRID:
+        # 同一組 RSI 門檻的訊號給所有停損停利組合共用
+        signal = make_signal(ma20, ma60, rsi, rsi_long, rsi_short)
+        is_signal = signal[:split]
+        for sl, tp in itertools.product(SL_GRID, TP_GRID):
+            n_trades, final, _ = run_window(is_prices, is_signal, sl, tp)
+            if n_trades < MIN_TRADES:
+                continue
+            score = final / INITIAL_CAPITAL - 1
+            # 分數相同時保留網格中較前面的組合，確保結果固定
+            if best is None or score > best["is_return"]:
+                best = {"sl": sl, "tp": tp, "rsi_long": rsi_long, "rsi_short": rsi_short,
+                        "is_return": score, "is_trades": n_trades}
+
+    if best is None:
+        # 沒有參數組達到 MIN_TRADES：此 fold 不交易 (參數欄位為 NaN，報表欄位維持一致)
+        return {"fold": fold_id, "sl": np.nan, "tp": np.nan, "rsi_long": np.nan, "rsi_short": np.nan,
+                "is_return": np.nan, "is_trades": 0, "oos_return": 0.0, "oos_trades": 0,
+                "oos_equity": [INITIAL_CAPITAL]}
+
+    signal = make_signal(ma20, ma60, rsi, best["rsi_long"], best["rsi_short"])
+    n_trades, final, equity = run_window(oos_prices, signal[split:], best["sl"], best["tp"])
+    return {"fold": fold_id, **best, "oos_return": final / INITIAL_CAPITAL - 1,
+            "oos_trades": n_trades, "oos_equity": equity}
+
+def walk_forward(df, workers=None):
+    """ df 需已套用 apply_strategy (有 ma20/ma60/rsi 欄位)；回傳每個 fold 的結果與串接後的樣本外權益 """
+    prices = [df[c].to_numpy(dtype=np.float64) for c in ("high", "low", "close")]
+    ma20, ma60, rsi = (df[c].to_numpy(dtype=np.float64) for c in ("ma20", "ma60", "rsi"))
+
+    folds = make_folds(len(df))
+    args = []
+    for k, (a, b, c) in enumerate(folds):
+        args.append((k, tuple(p[a:c] for p in prices), ma20[a:c], ma60[a:c], rsi[a:c], b - a))
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        results = [optimize_fold(*x) for x in args]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(optimize_fold, *zip(*args)))
+
+    # 串接樣本外權益：下一段從上一段的期末資金接著算
+    stitched = [float(INITIAL_CAPITAL)]
+    for r in results:
+        growth = np.asarray(r.pop("oos_equity")[1:]) / INITIAL_CAPITAL
+        stitched.extend((stitched[-1] * growth).tolist())
+
+    report = pd.DataFrame(results)
+    report["oos_start"] = [df["datetime"].iloc[b] for _, b, _ in folds]
+    return report, pd.Series(stitched)
+
+if __name__ == "__main__":
+    df = fetch_ohlcv(SYMBOL, TIMEFRAME, START_DATE, END_DATE)
+    df = apply_strategy(df)
+    print(f"資料筆數: {len(df)}，fold 數: {len(make_folds(len(df)))}，每個 fold 網格: {len(SL_GRID) * len(TP_GRID) * len(RSI_GRID)} 組")
+
+    report, equity = walk_forward(df)
+    report.to_csv("walk_forward_folds.csv", index=False)
+    skipped = int(report["sl"].isna().sum())
+
+    rolling_max = equity.cummax()
+    max_dd = ((equity - rolling_max) / rolling_max).min() * 100
+
+    print("====== Walk-Forward 樣本外績效 ======")
+    print(report[["oos_start", "sl", "tp", "rsi_long", "rsi_short", "is_return", "oos_return", "oos_trades"]].round(4).to_string(index=False))
+    if skipped == len(report):
+        print(f"\n⚠️ 沒有任何 fold 的參數組在樣本內達到 {MIN_TRADES} 筆交易，樣本外全部不交易")
+    elif skipped:
+        print(f"\n⚠️ {skipped} 個 fold 沒有參數組在樣本內達到 {MIN_TRADES} 筆交易，該段樣本外不交易")
+    print(f"\n初始資金: {INITIAL_CAPITAL}")
+    print(f"最終資金: {round(equity.iloc[-1],2)}")
+    print(f"最大回撤: {round(max_dd,2)}%")
+
+    plt.figure(figsize=(10,5))
+    plt.plot(equity)
+    plt.title("ETC Walk-Forward OOS Equity")
+    plt.xlabel("Time")
+    plt.ylabel("Equity")
+    plt.grid(True)
+    plt.savefig("walk_forward_equity.png")
+    plt.close()
+    print("\n已輸出 walk_forward_folds.csv 與 walk_forward_equity.png")
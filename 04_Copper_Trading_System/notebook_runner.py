@@ -0,0 +1,235 @@
+import os
+import re
+import json
+import time
+import base64
+import hashlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timedelta
+import pandas as pd
+import yfinance as yf
+import nbformat
+from nbclient import NotebookClient
+from nbclient.exceptions import CellExecutionError
+
+# 研究 notebook 的批次執行器：
+# - 同一份 notebook (預設 copper_trading_notebook.ipynb) 對多個標的各開一個 kernel 平行執行
+# - 在 tag 為 "parameters" 的格子之後插入該標的的參數 (TICKER / ASSET_NAME / DATA_FILE)
+# - 資料先下載成 CSV 交給 notebook 讀取，CSV 的內容雜湊是快取 key 的起點；
+#   已有 data.csv 時沿用 (refresh=True 才重新下載)，否則每天下載的區間都不同，快取永遠不會命中
+# - 每個 code cell 的 key = hash(前一格的 key + 本格原始碼)，任何上游的程式或資料改變，之後的 key 都會變
+# - 快取是「全有或全無」：所有 code cell 都命中時不啟動 kernel，直接組回上次的輸出；
+#   kernel 的變數狀態無法從快取還原，只要有一格未命中 (例如只改了最後一格)，整份 notebook 都會重新執行
+# - 每個標的輸出到 OUTPUT_DIR/<標的>/：執行後的 notebook、data.csv、figures/*.png
+
+NOTEBOOK = "copper_trading_notebook.ipynb"
+OUTPUT_DIR = "notebook_runs"
+CACHE_DIR = os.path.join(OUTPUT_DIR, ".cell_cache")
+KERNEL_NAME = "python3"
+CELL_TIMEOUT = 600       # 秒
+YEARS = 5
+CACHE_VERSION = 1
+
+# 預設研究的 20 個商品 (代號: 圖表名稱)
+ASSETS = {
+    "HG=F": "Copper", "GC=F": "Gold", "GLD": "Gold ETF", "SI=F": "Silver", "PL=F": "Platinum",
+    "PA=F": "Palladium", "ALI=F": "Aluminum", "CL=F": "Crude Oil", "BZ=F": "Brent Crude",
+    "NG=F": "Natural Gas", "HO=F": "Heating Oil", "RB=F": "Gasoline", "ZC=F": "Corn",
+    "ZW=F": "Wheat", "ZS=F": "Soybeans", "KC=F": "Coffee", "SB=F": "Sugar", "CC=F": "Cocoa",
+    "CT=F": "Cotton", "LE=F": "Live Cattle",
+}
+
+def safe_name(ticker):
+    """ 代號轉成資料夾名稱，例如 HG=F -> HG_F """
+    return re.sub(r"[^A-Za-z0-9]+", "_", ticker).strip("_")
+
+def download_asset(ticker, path, years=YEARS, refresh=False):
+    """ 下載日 K 存成單層欄位的 CSV (notebook 以 pd.read_csv 讀取)；檔案已存在且 refresh=False 時直接沿用 """
+    if os.path.exists(path) and not refresh:
+        return path
+    end_date = datetime.now()
+    start_date = end_date - timedelta(days=365 * years)
+    data = yf.download(ticker, start=start_date, end=end_date, progress=False)
+    if isinstance(data.columns, pd.MultiIndex):
+        data.columns = data.columns.get_level_values(0)
+    if data.empty:
+        raise ValueError(f"{ticker} 沒有資料")
+    tmp = f"{path}.{os.getpid()}.tmp"
+    data.to_csv(tmp)
+    os.replace(tmp, path)
+    return path
+
+def file_hash(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+# =====================
+# 參數與快取 key
+# =====================
+def inject_parameters(nb, params):
+    """ 在 tag 為 parameters 的格子之後插入參數格 (找不到時放在最前面)，回傳插入的位置 """
+    pos = 0
+    for i, cell in enumerate(nb.cells):
+        if "parameters" in cell.get("metadata", {}).get("tags", []):
+            pos = i + 1
+            break
+    source = "# 由 notebook_runner.py 插入的參數\n" + "\n".join(f"{k} = {v!r}" for k, v in params.items())
+    cell = nbformat.v4.new_code_cell(source, metadata={"tags": ["injected-parameters"]})
+    nb.cells.insert(pos, cell)
+    return pos
+
+def cell_keys(nb, seed):
+    """ 每個 code cell 的串鏈雜湊 (markdown 為 None) """
+    key = hashlib.sha256(f"{CACHE_VERSION}|{KERNEL_NAME}|{seed}".encode()).hexdigest()
+    keys = []
+    for cell in nb.cells:
+        if cell.cell_type != "code":
+            keys.append(None)
+            continue
+        key = hashlib.sha256(f"{key}|{cell.source}".encode()).hexdigest()
+        keys.append(key)
+    return keys
+
+class CellCache:
+    """ 一個 code cell 一個 JSON 檔 (輸出與 execution_count)，多個行程同時寫入時以換名避免半寫檔 """
+
+    def __init__(self, cache_dir=CACHE_DIR):
+        self.cache_dir = cache_dir
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key):
+        try:
+            with open(self._path(key), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def put(self, key, cell):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._path(key)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"outputs": cell.outputs, "execution_count": cell.execution_count}, f, ensure_ascii=False)
+        os.replace(tmp, path)
+
+# =====================
+# 執行
+# =====================
+def save_figures(nb, figure_dir):
+    """ 把所有 image/png 輸出存成檔案 (先清掉上次的圖)，回傳路徑清單 """
+    os.makedirs(figure_dir, exist_ok=True)
+    for fname in os.listdir(figure_dir):
+        if fname.endswith(".png"):
+            os.remove(os.path.join(figure_dir, fname))
+    paths = []
+    for i, cell in enumerate(nb.cells):
+        if cell.cell_type != "code":
+            continue
+        n = 0
+        for output in cell.get("outputs", []):
+            png = output.get("data", {}).get("image/png")
+            if png is None:
+                continue
+            n += 1
+            path = os.path.join(figure_dir, f"cell{i:02d}_{n}.png")
+            with open(path, "wb") as f:
+                f.write(base64.b64decode(png))
+            paths.append(path)
+    return paths
+
+def run_notebook(ticker, name=None, notebook=NOTEBOOK, output_dir=OUTPUT_DIR, cache_dir=CACHE_DIR,
+                 years=YEARS, timeout=CELL_TIMEOUT, kernel_name=KERNEL_NAME, refresh=False):
+    """
+    對單一標的執行 notebook，回傳摘要 dict：
+    ticker / status (cached / executed / failed) / cells / cached_cells / seconds / notebook / figures / error
+    所有 code cell 都命中快取才直接組回輸出，否則整份重新執行 (cached_cells 只是統計)。
+    refresh=True 時重新下載 data.csv，資料有變時之後的快取 key 全部跟著變。
+    """
+    started = time.perf_counter()
+    asset_dir = os.path.abspath(os.path.join(output_dir, safe_name(ticker)))
+    os.makedirs(asset_dir, exist_ok=True)
+    data_file = download_asset(ticker, os.path.join(asset_dir, "data.csv"), years, refresh)
+
+    nb = nbformat.read(notebook, as_version=4)
+    inject_parameters(nb, {"TICKER": ticker, "ASSET_NAME": name or ticker, "YEARS": years, "DATA_FILE": data_file})
+    keys = cell_keys(nb, file_hash(data_file))
+    cache = CellCache(cache_dir)
+    hits = {k: cache.get(k) for k in keys if k is not None}
+    n_cells = len(hits)
+    n_cached = sum(v is not None for v in hits.values())
+
+    status, error = "executed", None
+    if n_cached == n_cells:
+        status = "cached"
+        for cell, key in zip(nb.cells, keys):
+            if key is not None:
+                cell.outputs = [nbformat.from_dict(o) for o in hits[key]["outputs"]]
+                cell.execution_count = hits[key]["execution_count"]
+    else:
+        client = NotebookClient(nb, timeout=timeout, kernel_name=kernel_name,
+                                resources={"metadata": {"path": asset_dir}})
+        try:
+            client.execute()
+        except CellExecutionError as e:
+            status, error = "failed", re.sub(r"\x1b\[[0-9;]*m", "", str(e)).strip().splitlines()[-1]
+        if status == "executed":
+            for cell, key in zip(nb.cells, keys):
+                if key is not None:
+                    cache.put(key, cell)
+
+    out_path = os.path.join(asset_dir, os.path.basename(notebook))
+    nbformat.write(nb, out_path)
+    figures = save_figures(nb, os.path.join(asset_dir, "figures"))
+    return {
+        "ticker": ticker, "status": status, "cells": n_cells, "cached_cells": n_cached,
+        "seconds": round(time.perf_counter() - started, 2), "notebook": out_path,
+        "figures": len(figures), "error": error,
+    }
+
+def _run_one(args):
+    ticker, name, kwargs = args
+    try:
+        return run_notebook(ticker, name, **kwargs)
+    except Exception as e:       # 下載失敗等，不影響其他標的
+        return {"ticker": ticker, "status": "failed", "error": f"{type(e).__name__}: {e}"}
+
+def run_assets(assets=ASSETS, workers=None, callback=None, **kwargs):
+    """
+    assets: {代號: 名稱} 或代號清單。每個標的一個行程 (各自的 kernel)，
+    預設同時執行的標的數不超過 CPU 核心數 (每個 kernel 都是獨立行程)。回傳摘要 DataFrame。
+    """
+    if not isinstance(assets, dict):
+        assets = {t: ASSETS.get(t, t) for t in assets}
+    jobs = [(ticker, name, kwargs) for ticker, name in assets.items()]
+    results = []
+    workers = workers or max(1, min(len(jobs), os.cpu_count() or 1))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for future in as_completed([pool.submit(_run_one, job) for job in jobs]):
+            result = future.result()
+            results.append(result)
+            if callback is not None:
+                callback(result)
+    order = {t: i for i, t in enumerate(assets)}
+    results.sort(key=lambda r: order[r["ticker"]])
+    return pd.DataFrame(results)
+
+if __name__ == "__main__":
+    tickers_str = input("👉 請輸入代號，以逗號分隔 (直接 Enter 執行預設 20 個商品): ").strip()
+    tickers = [t.strip().upper() for t in tickers_str.split(",") if t.strip()] or list(ASSETS)
+    refresh = input("👉 是否重新下載最新資料? (y/N): ").strip().lower() == "y"
+
+    def report(result):
+        mark = {"cached": "♻️", "executed": "✅"}.get(result["status"], "❌")
+        detail = result.get("error") or f"{result['seconds']}s，快取 {result['cached_cells']}/{result['cells']} 格"
+        print(f"{mark} {result['ticker']:<8} {detail}")
+
+    started = time.perf_counter()
+    summary = run_assets(tickers, callback=report, refresh=refresh)
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    summary.to_csv(os.path.join(OUTPUT_DIR, "summary.csv"), index=False)
+    print(f"\n完成 {len(summary)} 個標的，耗時 {time.perf_counter() - started:.1f} 秒；結果在 {OUTPUT_DIR}/")
@@ -0,0 +1,80 @@
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("yfinance")
+pytest.importorskip("ipykernel")
+import nbformat
+import notebook_runner as nr
+
+class FakeYahoo:
+    """ 代替 yfinance：每次下載都記錄次數，回傳固定的日 K """
+    def __init__(self):
+        self.calls = 0
+
+    def download(self, ticker, start, end, progress=False):
+        self.calls += 1
+        index = pd.bdate_range("2024-01-01", periods=30, name="Date")
+        close = 4 + np.arange(30) / 100
+        return pd.DataFrame({"Open": close, "High": close, "Low": close, "Close": close, "Volume": 1.0}, index=index)
+
+def write_notebook(path, last_cell="print(len(df))"):
+    nb = nbformat.v4.new_notebook()
+    nb.cells = [
+        nbformat.v4.new_code_cell("DATA_FILE = None", metadata={"tags": ["parameters"]}),
+        nbformat.v4.new_markdown_cell("# 測試"),
+        nbformat.v4.new_code_cell("import pandas as pd\ndf = pd.read_csv(DATA_FILE)"),
+        nbformat.v4.new_code_cell(last_cell),
+    ]
+    nbformat.write(nb, str(path))
+    return str(path)
+
+def test_cell_keys_chain_only_changes_downstream():
+    nb = nbformat.v4.new_notebook()
+    nb.cells = [nbformat.v4.new_code_cell(src) for src in ("a = 1", "b = 2", "c = 3")]
+    before = nr.cell_keys(nb, "seed")
+    nb.cells[1].source = "b = 20"
+    after = nr.cell_keys(nb, "seed")
+    assert before[0] == after[0] and before[1] != after[1] and before[2] != after[2]
+    assert nr.cell_keys(nb, "other seed")[0] != after[0]
+
+def test_second_run_is_served_from_cache_without_download(tmp_path, monkeypatch):
+    fake = FakeYahoo()
+    monkeypatch.setattr(nr, "yf", fake)
+    notebook = write_notebook(tmp_path / "nb.ipynb")
+    kwargs = {"notebook": notebook, "output_dir": str(tmp_path / "runs"), "cache_dir": str(tmp_path / "cache")}
+
+    first = nr.run_notebook("HG=F", **kwargs)
+    assert first["status"] == "executed" and first["cells"] == 4
+    second = nr.run_notebook("HG=F", **kwargs)
+    assert second["status"] == "cached" and second["cached_cells"] == 4
+    assert fake.calls == 1
+    out = nbformat.read(second["notebook"], as_version=4)
+    assert out.cells[-1].outputs[0]["text"].strip() == "30"
+
+    # 重新下載但資料沒變：快取 key 不變
+    assert nr.run_notebook("HG=F", refresh=True, **kwargs)["status"] == "cached"
+    assert fake.calls == 2
+
+    # 改最後一格：全有或全無，整份重新執行
+    write_notebook(tmp_path / "nb.ipynb", "print(df['Close'].iloc[-1])")
+    changed = nr.run_notebook("HG=F", **kwargs)
+    assert changed["status"] == "executed" and changed["cached_cells"] == 3
+
+def test_workers_are_capped_at_cpu_count(monkeypatch):
+    seen = []
+
+    class RecordingPool(ThreadPoolExecutor):
+        def __init__(self, max_workers):
+            seen.append(max_workers)
+            super().__init__(max_workers)
+
+    monkeypatch.setattr(nr, "ProcessPoolExecutor", RecordingPool)
+    monkeypatch.setattr(nr, "run_notebook", lambda ticker, name, **kwargs: {"ticker": ticker, "status": "cached"})
+    monkeypatch.setattr(nr.os, "cpu_count", lambda: 2)
+    summary = nr.run_assets(list(nr.ASSETS))
+    assert seen == [2]
+    assert list(summary["ticker"]) == list(nr.ASSETS)
+    nr.run_assets(["HG=F"], workers=8)
+    assert seen == [2, 8]